@@ -10,14 +10,16 @@ import os
 import pytest
 import shutil
 
+from src.control_center.commands import export_runs
 from src.core.api.keyboard.keyboard_api import check_keyboard_state
 from src.core.util import cleanup
 from src.core.util.app_loader import get_app_test_directory
 from src.core.util.arg_parser import parse_args
-from src.core.util.json_utils import create_target_json
+from src.core.util.json_utils import create_target_json, recover_unfinished_runs
 from src.core.util.local_web_server import LocalWebServer
 from src.core.util.logger_manager import initialize_logger
 from src.core.util.path_manager import PathManager
+from src.core.util.sharded_runner import run_shards, sharding_available
 from src.core.util.system import check_7zip, fix_terminal_encoding, init_tesseract_path, reset_terminal_encoding
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,8 @@ def main():
     args = parse_args()
     initialize_logger()
     if verify_config(args):
+        if args.shard is None:
+            recover_unfinished_runs()
         user_result = None
         if show_control_center():
             init_control_center()
@@ -35,6 +39,10 @@ def main():
             # parse user_result to extract desired target and parameters,
             # and pass parameters to target
         if user_result is not 'cancel':
+            if args.shards > 1 and args.shard is None and sharding_available():
+                initialize_platform(args)
+                run_shards(args)
+                return
             target_plugin = get_target(args.application)
             pytest_args = get_test_params(args.application)
             initialize_platform(args)
@@ -52,7 +60,7 @@ def show_control_center():
     # TODO
     # expand logic to display Control Center only when no target specified,
     # or if -k argument is explicitly used
-    if parse_args().control:
+    if parse_args().control and parse_args().shard is None:
         return True
     else:
         return False
@@ -128,6 +136,7 @@ def init_control_center():
                 logger.warning('Could not find icon file for target: %s' % target)
         break
     create_target_json()
+    export_runs()
 
 
 def launch_control_center():
@@ -159,3 +168,7 @@ class ShutdownTasks(cleanup.CleanUp):
         # TBD:
         # terminate subprocesses
         # remove temp folder(s)
+
+
+if __name__ == '__main__':
+    main()
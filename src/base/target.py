@@ -9,9 +9,14 @@ import pytest
 
 import logging
 from targets.firefox.parse_args import parse_args
-from src.core.util.json_utils import update_run_index, create_run_log
+from src.core.api.finder.match_hints import clear_match_hints, get_match_hints
+from src.core.api.finder.ocr_cache import get_ocr_cache
+from src.core.api.save_debug_image.debug_image_writer import flush_debug_images, wait_for_debug_images
+from src.core.util.json_utils import update_run_index, create_run_log, record_test_result, start_run_log
+from src.core.util.path_manager import PathManager
 from src.core.util.test_assert import create_result_object
 from src.core.util.run_report import create_footer
+from src.core.util.test_scheduler import balance_shards, load_test_history, order_tests
 from targets.firefox.firefox_app.fx_collection import FX_Collection
 from targets.firefox.firefox_app.fx_browser import FirefoxApp
 
@@ -45,6 +50,7 @@ class BaseTarget:
         logger.info(', '.join(settings_list))
         logger.info('\n')
         update_run_index(self, False)
+        start_run_log(self)
 
     def pytest_sessionfinish(self, session):
         """ called after whole test run finished, right before returning the exit status to the system.
@@ -57,12 +63,36 @@ class BaseTarget:
         update_run_index(self, True)
         footer = create_footer(self)
         footer.print_report_footer()
+        flush_debug_images()
         create_run_log(self)
+        get_match_hints().log_stats()
+        get_ocr_cache().log_stats()
 
         logger.info("** Test session {} complete **".format(session.name))
 
+    def pytest_collection_modifyitems(self, session, config, items):
+        """Orders the tests by expected duration and, when running as a shard worker, keeps only the tests of the
+        current shard."""
+        history = load_test_history(PathManager.get_root_working_dir())
+        ordered = order_tests(items, history, args.fail_first)
+        if args.shard is not None and args.shards > 1:
+            selected = balance_shards(ordered, history, args.shards)[args.shard]
+            logger.info('Shard %s/%s: running %s of %s tests.'
+                        % (args.shard + 1, args.shards, len(selected), len(items)))
+            selected_ids = set(id(item) for item in selected)
+            config.hook.pytest_deselected(items=[item for item in items if id(item) not in selected_ids])
+            ordered = selected
+        items[:] = ordered
+
+    def add_test_result(self, test_result):
+        """Adds a finished test to the completed tests and saves its result in the result store."""
+        self.completed_tests.append(test_result)
+        wait_for_debug_images()
+        record_test_result(test_result)
+
     def pytest_runtest_setup(self, item):
         os.environ['CURRENT_TEST'] = str(item.__dict__.get('fspath'))
+        clear_match_hints()
 
     def pytest_runtest_teardown(self, item):
         pass
@@ -119,7 +149,7 @@ class BaseTarget:
 
             test_result = create_result_object(assert_object, call.start, call.stop)
 
-            self.completed_tests.append(test_result)
+            self.add_test_result(test_result)
 
         elif call.when == "call" and call.excinfo is None:
             outcome = 'PASSED'
@@ -127,7 +157,7 @@ class BaseTarget:
 
             test_result = create_result_object(test_instance, call.start, call.stop)
 
-            self.completed_tests.append(test_result)
+            self.add_test_result(test_result)
 
         elif call.when == "setup" and item._skipped_by_mark:
             outcome = 'SKIPPED'
@@ -135,7 +165,7 @@ class BaseTarget:
 
             test_result = create_result_object(test_instance, call.start, call.stop)
 
-            self.completed_tests.append(test_result)
+            self.add_test_result(test_result)
 
 
 def reason_for_failure(report):
@@ -8,11 +8,16 @@ import logging
 import os
 import shutil
 
+from urllib.parse import parse_qs
+
 from src.core.util.path_manager import PathManager
+from src.core.util.run_index import get_run_index
 
 
 logger = logging.getLogger(__name__)
 COMMANDS = ['delete', 'go', 'cancel']
+# Matched on the whole path, since run directories are served from /runs/<run id>/.
+RUN_INDEX_COMMAND = '/run_index'
 
 
 def is_command(request):
@@ -22,7 +27,7 @@ def is_command(request):
     # First verify that the request is local, for security reasons.
     if server_host == client_host:
         # Then examine the path for command keywords
-        found = False
+        found = _is_run_index_command(request.path)
         for command in COMMANDS:
             if request.path.startswith('/%s' % command):
                 found = True
@@ -32,7 +37,9 @@ def is_command(request):
 
 def do_command(request):
     logger.debug('Parsing command from path: %s ' % request.path)
-    if 'delete' in request.path:
+    if _is_run_index_command(request.path):
+        runs(request)
+    elif 'delete' in request.path:
         try:
             delete(request.path.split('?')[1])
         except KeyError:
@@ -47,27 +54,19 @@ def do_command(request):
     return True
 
 
+def _is_run_index_command(path: str) -> bool:
+    return path.split('?')[0] == RUN_INDEX_COMMAND
+
+
 def delete(args):
-    # Load run log JSON, find entry that matches the argument and delete it.
-    # Then, write new run log file.
+    # Mark the entry that matches the argument as deleted in the run index.
+    # Then, export the run list read by the control center.
     logger.debug('Received delete command with arguments: %s ' % args)
-    run_file = os.path.join(PathManager.get_working_dir(), 'data', 'all_runs.json')
-    if os.path.exists(run_file):
-        logger.debug('Deleting entry %s from run file: %s' % (args, run_file))
-        with open(run_file, 'r') as data:
-            run_file_data = json.load(data)
-        found = False
-        for run in run_file_data['runs']:
-            if run['id'] == args:
-                run_file_data['runs'].remove(run)
-                found = True
-        if found:
-            with open(run_file, 'w') as data:
-                json.dump(run_file_data, data, sort_keys=True, indent=True)
-        else:
-            logger.error('Entry for run %s not found in run log file.' % args)
+    run_index = get_run_index()
+    if run_index.delete(args):
+        export_runs()
     else:
-        logger.error('Run file not found.')
+        logger.error('Entry for run %s not found in run index.' % args)
 
     # Remove run directory on disk.
     target_run = os.path.join(PathManager.get_working_dir(), 'runs', args)
@@ -98,3 +97,29 @@ def cancel(request):
     request.set_result('cancel')
     request.stop_server()
     return
+
+
+def runs(request):
+    """
+    Return a page of the run history as JSON, newest runs first.
+    Query parameters: offset (default 0) and limit (default 50).
+    """
+    query = parse_qs(request.path.split('?')[1] if '?' in request.path else '')
+    try:
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['50'])[0])
+    except ValueError:
+        logger.error('Malformed run_index command: %s' % request.path)
+        offset, limit = 0, 50
+    page = get_run_index().page(max(offset, 0), max(limit, 0))
+    request.send_response(200)
+    request.send_header('Content-Type', 'application/json')
+    request.end_headers()
+    request.wfile.write(json.dumps(page, sort_keys=True).encode('utf-8'))
+
+
+def export_runs():
+    """
+    Write the newest runs of the run index to the runs.json file read by the control center.
+    """
+    get_run_index().export(os.path.join(PathManager.get_working_dir(), 'data', 'runs.json'))
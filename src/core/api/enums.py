@@ -60,6 +60,14 @@ class Color(Enum):
     WHITE = 'white'
 
 
+class DebugImagePolicy(Enum):
+    ALL = 'all'
+    LAST_PER_WAIT = 'last_per_wait'
+    FAILURES = 'failures'
+    EVERY_NTH = 'every_nth'
+    NONE = 'none'
+
+
 class LanguageCode(Enum):
     AFRIKAANS = 'afr'
     AMHARIC = 'amh'
@@ -188,6 +196,12 @@ class MatchTemplateType(Enum):
     MULTIPLE = 1
 
 
+class ObserveEventType(Enum):
+    APPEAR = 'appear'
+    VANISH = 'vanish'
+    CHANGE = 'change'
+
+
 class OSPlatform(str, Enum):
     WINDOWS = 'win'
     LINUX = 'linux'
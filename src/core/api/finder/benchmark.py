@@ -0,0 +1,125 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import os
+import time
+
+import cv2
+
+from src.core.api.enums import MatchTemplateType
+from src.core.api.finder.image_search import _brute_force_search, _pyramid_search
+from src.core.api.finder.pattern import Pattern
+from src.core.api.rectangle import Rectangle
+from src.core.api.screen.capture_backends import BACKENDS, time_backend
+from src.core.api.screen.display import DisplayCollection
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+LOCATION_TOLERANCE = 2
+
+
+def _load_screenshots(screenshot_dir: str) -> list:
+    """Returns a list of (file name, gray array) pairs for all the recorded screenshots of a directory."""
+    screenshots = []
+    for file_name in sorted(os.listdir(screenshot_dir)):
+        if file_name.lower().endswith(SCREENSHOT_EXTENSIONS):
+            gray_array = cv2.imread(os.path.join(screenshot_dir, file_name), cv2.IMREAD_GRAYSCALE)
+            if gray_array is not None:
+                screenshots.append((file_name, gray_array))
+    return screenshots
+
+
+def _time_search(search, haystack, needle, precision, match_type, repeat):
+    """Returns the best duration in milliseconds and the result of a search function."""
+    best = None
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = search(haystack, needle, precision, match_type)
+        duration = (time.perf_counter() - start) * 1000
+        best = duration if best is None else min(best, duration)
+    return best, result
+
+
+def _same_locations(expected: list, actual: list, tolerance: int) -> bool:
+    """Checks that every expected location has a counterpart within tolerance pixels and vice versa."""
+    def covered(points, others):
+        return all(any(abs(x - o_x) <= tolerance and abs(y - o_y) <= tolerance
+                       for o_x, o_y in zip(others['x'], others['y']))
+                   for x, y in zip(points['x'], points['y']))
+
+    return covered(expected, actual) and covered(actual, expected)
+
+
+def benchmark_pyramid_search(screenshot_dir: str, pattern_paths: list, repeat: int = 3,
+                             tolerance: int = LOCATION_TOLERANCE) -> list:
+    """Compares pyramid search with the brute-force search on recorded screenshots.
+
+    Run from the command line with: python -m src.core.api.finder.run_benchmark pyramid SCREENSHOT_DIR PATTERN...
+
+    :param screenshot_dir: Directory with recorded screenshots (ex: the debug_images folder of a previous run).
+    :param pattern_paths: List of paths to pattern images.
+    :param repeat: Number of times each search is timed, the best duration is kept.
+    :param tolerance: Maximum distance in pixels between locations reported by the two search modes.
+    :return: List of dictionaries with the durations and the outcome of each comparison.
+    """
+    report = []
+    patterns = [Pattern(os.path.basename(path), from_path=path) for path in pattern_paths]
+    for screenshot_name, haystack in _load_screenshots(screenshot_dir):
+        for pattern in patterns:
+            needle = pattern.get_gray_array()
+            if needle.shape[0] > haystack.shape[0] or needle.shape[1] > haystack.shape[1]:
+                continue
+            for match_type in MatchTemplateType:
+                brute_ms, expected = _time_search(_brute_force_search, haystack, needle, pattern.similarity,
+                                                  match_type, repeat)
+                pyramid_ms, actual = _time_search(_pyramid_search, haystack, needle, pattern.similarity,
+                                                  match_type, repeat)
+                row = {'screenshot': screenshot_name, 'pattern': pattern.get_filename(),
+                       'match_type': match_type.name, 'brute_force_ms': round(brute_ms, 2),
+                       'pyramid_ms': round(pyramid_ms, 2), 'matches': len(expected),
+                       'same_result': _same_locations(expected, actual, tolerance)}
+                report.append(row)
+                logger.info('%(screenshot)s / %(pattern)s [%(match_type)s]: brute force %(brute_force_ms)s ms, '
+                            'pyramid %(pyramid_ms)s ms, same result: %(same_result)s' % row)
+
+    if len(report) > 0:
+        brute_total = sum(row['brute_force_ms'] for row in report)
+        pyramid_total = sum(row['pyramid_ms'] for row in report)
+        mismatches = len([row for row in report if not row['same_result']])
+        logger.info('Total: brute force %.2f ms, pyramid %.2f ms, speedup %.2fx, %s mismatch(es) out of %s.'
+                    % (brute_total, pyramid_total, brute_total / max(pyramid_total, 0.001), mismatches, len(report)))
+    return report
+
+
+def benchmark_capture_backends(region: Rectangle = None, repeat: int = 20) -> list:
+    """Measures the per-capture latency of each screen capture backend.
+
+    Run from the command line with: python -m src.core.api.finder.run_benchmark capture
+
+    :param region: Captured region. By default the first display.
+    :param repeat: Number of captures per backend, the best duration is kept.
+    :return: List of dictionaries with the duration of each working backend.
+    """
+    if region is None:
+        region = DisplayCollection[0].bounds
+
+    report = []
+    for backend_class in BACKENDS.values():
+        backend = backend_class()
+        if not backend.is_available():
+            logger.info('%s: not available' % backend.name)
+            continue
+        try:
+            duration = time_backend(backend, region, repeat)
+        except Exception as e:
+            logger.info('%s: failed (%s)' % (backend.name, e))
+            continue
+        row = {'backend': backend.name, 'capture_ms': round(duration, 2)}
+        report.append(row)
+        logger.info('%(backend)s: %(capture_ms)s ms per capture' % row)
+    return report
@@ -8,7 +8,8 @@ import time
 from src.core.api.enums import Color
 from src.core.api.enums import MatchTemplateType
 from src.core.api.errors import FindError
-from src.core.api.finder.image_search import image_find, match_template, image_vanish
+from src.core.api.finder.image_search import image_find, image_find_many, match_template, match_templates, \
+    image_vanish
 from src.core.api.finder.pattern import Pattern
 from src.core.api.finder.text_search import text_find, text_find_all
 from src.core.api.highlight.screen_highlight import ScreenHighlight, HighlightRectangle
@@ -163,6 +164,43 @@ def exists(ps: Pattern or str, timeout: float = None, region: Rectangle = None)
         return False
 
 
+def find_many(patterns: list, region: Rectangle = None, parallel: bool = False) -> list:
+    """Look for a single match of several Patterns, using a single screen capture.
+
+    :param patterns: List of Patterns.
+    :param region: Rectangle object in order to minimize the area.
+    :param parallel: If True, patterns are matched in a thread pool.
+    :return: List with a Location object for each found Pattern and None for the others.
+    """
+    images_found = match_templates(patterns, region, MatchTemplateType.SINGLE, parallel)
+    return [locations[0] if len(locations) > 0 else None for locations in images_found]
+
+
+def exists_any(patterns: list, timeout: float = None, region: Rectangle = None, parallel: bool = False) -> bool:
+    """Check if at least one of several Patterns exists. Each poll captures the screen only once.
+
+    :param patterns: List of Patterns.
+    :param timeout: Number as maximum waiting time in seconds.
+    :param region: Rectangle object in order to minimize the area.
+    :param parallel: If True, patterns are matched in a thread pool.
+    :return: True if any Pattern is found.
+    """
+    return any(location is not None for location in image_find_many(patterns, timeout, region, False, parallel))
+
+
+def exists_all(patterns: list, timeout: float = None, region: Rectangle = None, parallel: bool = False) -> bool:
+    """Check if all of several Patterns exist. Each poll captures the screen only once and only searches for the
+    Patterns that were not found yet.
+
+    :param patterns: List of Patterns.
+    :param timeout: Number as maximum waiting time in seconds.
+    :param region: Rectangle object in order to minimize the area.
+    :param parallel: If True, patterns are matched in a thread pool.
+    :return: True if all the Patterns are found.
+    """
+    return all(location is not None for location in image_find_many(patterns, timeout, region, True, parallel))
+
+
 def wait_vanish(pattern: Pattern, timeout: float = None, region: Rectangle = None) -> bool or FindError:
     """Wait until a Pattern disappears.
 
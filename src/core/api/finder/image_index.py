@@ -0,0 +1,230 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import logging
+import os
+import sys
+import time
+
+from src.core.api.settings import Settings
+from src.core.util.arg_parser import parse_args
+from src.core.util.path_manager import PathManager
+
+try:
+    import Image
+except ImportError:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = 'image_index.json'
+INDEX_VERSION = 2
+EXCLUDED_DIRECTORIES = {'.git', '__pycache__', '.pytest_cache', 'node_modules'}
+CASE_INSENSITIVE_NAMES = sys.platform.startswith(('win', 'darwin'))
+_image_index = None
+
+
+def parse_name(full_name: str) -> (str, int):
+    """Detects the scale factor in image name.
+
+    :param str full_name: Image full name. Valid format name@[scale_factor]x.png.
+    Examples: google_search@2x.png, amazon_logo@2.5x.png
+
+    :return: Pair of image name and scale factor.
+    """
+    start_symbol = '@'
+    end_symbol = 'x.'
+    if start_symbol not in full_name:
+        return full_name, 1
+    else:
+        try:
+            start_index = full_name.index(start_symbol)
+            end_index = full_name.index(end_symbol, start_index)
+            scale_factor = float(full_name[start_index + 1:end_index])
+            image_name = full_name[0:start_index] + full_name[end_index + 1:len(full_name)]
+            return image_name, scale_factor
+        except ValueError:
+            logger.warning('Invalid file name format: "%s".' % full_name)
+            return full_name, 1
+
+
+def _is_image_file(file_name: str) -> bool:
+    return file_name.lower().endswith('.png')
+
+
+def _get_name_key(name: str) -> str:
+    """Returns the key of an image name in the index.
+
+    File names are not case sensitive on Windows and macOS, so images are looked up the same way there. The case is
+    folded explicitly, since os.path.normcase leaves it unchanged on macOS.
+    """
+    if CASE_INSENSITIVE_NAMES:
+        return os.path.normcase(name).lower()
+    return name
+
+
+def _convert_hi_res_images():
+    """Function resizes all the project's hi-resolution images."""
+    for root, dirs, files in os.walk(PathManager.get_module_dir()):
+        for file_name in files:
+            if file_name.endswith('.png'):
+                if 'images' in root or 'local_web' in root:
+                    if '@' in file_name:
+                        logger.debug('Found hi-resolution image at: %s' % os.path.join(root, file_name))
+                        temp = file_name.split('@')
+                        name = temp[0]
+                        scale = int(temp[1].split('x')[0])
+                        new_name = '%s.png' % name
+                        img = Image.open(os.path.join(root, file_name))
+                        logger.debug('Resizing image from %sx scale' % scale)
+                        new_img = img.resize((img.width / scale, img.height / scale), Image.ANTIALIAS)
+                        logger.debug('Creating newly converted image file at: %s' % os.path.join(root, new_name))
+                        new_img.save(os.path.join(root, new_name))
+                        logger.debug('Removing unused image at: %s' % os.path.join(root, file_name))
+                        os.remove(os.path.join(root, file_name))
+
+
+class ImageIndex:
+    """Index of all the project's images.
+
+    Images placed in an 'images' folder are mapped by (module directory, platform folder, locale, name, scale). The
+    platform folder is either an OS version (ex: linux, win7) or 'common', and the locale is empty for images placed
+    directly in the platform folder. Every image is also kept in a flat list, used when an image is not found relative
+    to its caller.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.entries = {}
+        self.all_images = []
+        self.directories = []
+        self.source = None
+        self.build_time = 0
+
+    def add(self, directory: str, file_name: str):
+        """Adds an image file to the index."""
+        name, scale = parse_name(file_name)
+        path = os.path.join(directory, file_name)
+        self.all_images.append({'name': name, 'key': _get_name_key(name), 'path': path, 'scale': scale,
+                                'root': directory})
+
+        parts = directory.split(os.sep)
+        if 'images' in parts:
+            images_index = len(parts) - 1 - parts[::-1].index('images')
+            sub_folders = parts[images_index + 1:]
+            if 1 <= len(sub_folders) <= 2:
+                module_dir = os.sep.join(parts[:images_index])
+                folder = sub_folders[0]
+                locale = sub_folders[1] if len(sub_folders) == 2 else ''
+                self.entries.setdefault((module_dir, folder, locale, _get_name_key(name), scale), path)
+
+    def get(self, module_dir: str, folder: str, locale: str, file_name: str) -> str or None:
+        """Returns the path of an image, or None if it is not in the index."""
+        name, scale = parse_name(file_name)
+        return self.entries.get((module_dir, folder, locale, _get_name_key(name), scale))
+
+    def find_by_name(self, name: str, application: str) -> list:
+        """Returns all the project-wide images with a given name that belong to an application."""
+        key = _get_name_key(name)
+        return [x for x in self.all_images if x['key'] == key and application in x['root'] and
+                (PathManager.get_images_path() in x['root'] or 'common' in x['root'])]
+
+    def get_tree_mtime(self) -> float or None:
+        """Returns the latest modification time of the indexed directories, or None if one of them is missing."""
+        try:
+            return max(os.stat(directory).st_mtime for directory in self.directories)
+        except (OSError, ValueError):
+            return None
+
+    def build(self):
+        """Walks the project tree and indexes all the .png files."""
+        start = time.time()
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRECTORIES]
+            self.directories.append(root)
+            for file_name in files:
+                if _is_image_file(file_name):
+                    self.add(root, file_name)
+        self.source = 'tree'
+        self.build_time = time.time() - start
+
+    def save(self, index_file: str):
+        """Saves the index to disk, keyed by the tree modification time."""
+        data = {'version': INDEX_VERSION, 'root': self.root, 'tree_mtime': self.get_tree_mtime(),
+                'directories': self.directories,
+                'images': [[x['root'], os.path.basename(x['path'])] for x in self.all_images]}
+        temp_file = '%s.%s.tmp' % (index_file, os.getpid())
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_file, index_file)
+        except (IOError, OSError) as e:
+            logger.debug('Unable to save image index %s: %s' % (index_file, e))
+
+    @staticmethod
+    def load(root: str, index_file: str):
+        """Loads an index from disk. Returns None if the file is missing, invalid or out of date."""
+        start = time.time()
+        try:
+            with open(index_file, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if data.get('version') != INDEX_VERSION or data.get('root') != root:
+            return None
+
+        index = ImageIndex(root)
+        index.directories = data.get('directories', [])
+        tree_mtime = index.get_tree_mtime()
+        if tree_mtime is None or tree_mtime != data.get('tree_mtime'):
+            logger.debug('Image index %s is out of date.' % index_file)
+            return None
+
+        for directory, file_name in data.get('images', []):
+            index.add(directory, file_name)
+        index.source = index_file
+        index.build_time = time.time() - start
+        return index
+
+    def log_stats(self):
+        """Logs the index build statistics."""
+        logger.debug('Image index loaded from %s in %.3f seconds: %s directories, %s images, %s image locations.'
+                     % (self.source, self.build_time, len(self.directories), len(self.all_images), len(self.entries)))
+
+
+def _get_index_file() -> str:
+    return os.path.join(parse_args().workdir, 'data', INDEX_FILE_NAME)
+
+
+def get_image_index(rebuild: bool = False) -> ImageIndex:
+    """Returns the project image index, building it on first call.
+
+    :param rebuild: If True, the index is built again from the project tree.
+    :return: ImageIndex object.
+    """
+    global _image_index
+    if _image_index is not None and not rebuild:
+        return _image_index
+
+    if parse_args().resize:
+        _convert_hi_res_images()
+
+    root = PathManager.get_module_dir()
+    index = None
+    if Settings.persist_image_index and not rebuild:
+        index = ImageIndex.load(root, _get_index_file())
+
+    if index is None:
+        index = ImageIndex(root)
+        index.build()
+        if Settings.persist_image_index:
+            if os.path.isdir(os.path.dirname(_get_index_file())):
+                index.save(_get_index_file())
+
+    index.log_stats()
+    _image_index = index
+    return _image_index
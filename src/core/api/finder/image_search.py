@@ -3,8 +3,10 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-import datetime
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
@@ -17,9 +19,11 @@ except ImportError:
 
 from src.core.api.enums import MatchTemplateType
 from src.core.api.errors import ScreenshotError
+from src.core.api.finder.match_hints import get_match_hints
+from src.core.api.finder.matches import Matches, find_peaks, suppress_overlaps, to_matches
 from src.core.api.finder.pattern import Pattern
-from src.core.api.location import Location
 from src.core.api.rectangle import Rectangle
+from src.core.api.save_debug_image.debug_image_writer import debug_image_wait
 from src.core.api.save_debug_image.save_image import save_debug_image
 from src.core.api.screen.display import DisplayCollection
 from src.core.api.screen.screenshot_image import ScreenshotImage
@@ -29,6 +33,11 @@ from src.core.api.settings import Settings
 logger = logging.getLogger(__name__)
 
 FIND_METHOD = cv2.TM_CCOEFF_NORMED
+PYRAMID_MIN_NEEDLE_SIZE = 8
+PYRAMID_SIMILARITY_SLACK = 0.15
+WAIT_REMATCH_INTERVAL = 1.0
+_executor = None
+_last_wait_stats = None
 
 
 def _is_pattern_size_correct(pattern, region):
@@ -54,42 +63,226 @@ def match_template(pattern: Pattern, region: Rectangle = None,
     :param Pattern pattern: Image details
     :param Region region: Region object.
     :param MatchTemplateType match_type: Type of match_template (single or multiple)
-    :return: Location.
+    :return: List of Location objects.
     """
     if region is None:
         region = DisplayCollection[0].bounds
 
-    locations_list = []
-    save_img_location_list = []
     logger.debug('Searching for pattern: %s' % pattern.get_filename())
     if not isinstance(match_type, MatchTemplateType):
         logger.warning('%s should be an instance of `%s`' % (match_type, MatchTemplateType))
         return []
     try:
         stack_image = ScreenshotImage(region=region, screen_id=_region_in_display_list(region))
-        precision = pattern.similarity
+    except ScreenshotError:
+        logger.warning('Screenshot failed.')
+        return []
 
-        res = cv2.matchTemplate(stack_image.get_gray_array(), pattern.get_gray_array(), FIND_METHOD)
-        if match_type is MatchTemplateType.SINGLE:
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-            if max_val >= precision:
-                locations_list.append(Location(max_loc[0] + region.x, max_loc[1] + region.y))
-                save_img_location_list.append(Location(max_loc[0], max_loc[1]))
-        elif match_type is MatchTemplateType.MULTIPLE:
-            loc = np.where(res >= precision)
-            for pt in zip(*loc[::-1]):
-                save_img_location = Location(pt[0], pt[1])
-                location = Location(pt[0] + region.x, pt[1] + region.y)
-                save_img_location_list.append(save_img_location)
-                locations_list.append(location)
-
-        save_debug_image(pattern, stack_image, save_img_location_list)
+    return _match_pattern(pattern, stack_image, region, match_type).to_list()
+
+
+def match_templates(patterns: list, region: Rectangle = None,
+                    match_type: MatchTemplateType = MatchTemplateType.SINGLE, parallel: bool = False) -> list:
+    """Find several patterns in a Region or full screen, using a single screen capture.
+
+    :param list patterns: List of Pattern objects.
+    :param Region region: Region object.
+    :param MatchTemplateType match_type: Type of match_template (single or multiple)
+    :param bool parallel: If True, patterns are matched in a thread pool.
+    :return: List with the list of Location objects found for each pattern, in the same order as patterns.
+    """
+    if region is None:
+        region = DisplayCollection[0].bounds
 
+    if not isinstance(match_type, MatchTemplateType):
+        logger.warning('%s should be an instance of `%s`' % (match_type, MatchTemplateType))
+        return [[] for _ in patterns]
+    try:
+        stack_image = ScreenshotImage(region=region, screen_id=_region_in_display_list(region))
     except ScreenshotError:
         logger.warning('Screenshot failed.')
-        return []
+        return [[] for _ in patterns]
+
+    return [matches.to_list() for matches in _match_patterns(patterns, stack_image, region, match_type, parallel)]
 
-    return locations_list
+
+def _match_patterns(patterns: list, stack_image: ScreenshotImage, region: Rectangle, match_type: MatchTemplateType,
+                    parallel: bool = False) -> list:
+    """Find several patterns in an already captured screenshot.
+
+    :return: List with the Matches object of each pattern, in the same order as patterns.
+    """
+    def match(pattern):
+        logger.debug('Searching for pattern: %s' % pattern.get_filename())
+        return _match_pattern(pattern, stack_image, region, match_type)
+
+    if parallel and len(patterns) > 1:
+        return list(_get_executor().map(match, patterns))
+    return [match(pattern) for pattern in patterns]
+
+
+def _match_pattern(pattern: Pattern, stack_image: ScreenshotImage, region: Rectangle,
+                   match_type: MatchTemplateType) -> Matches:
+    """Find a pattern in an already captured screenshot.
+
+    :param Pattern pattern: Image details
+    :param ScreenshotImage stack_image: Screenshot of the region.
+    :param Region region: Region object.
+    :param MatchTemplateType match_type: Type of match_template (single or multiple)
+    :return: Matches object, behaving like a list of Location objects.
+    """
+    screen_id = None
+    if match_type is MatchTemplateType.SINGLE and Settings.match_hints:
+        screen_id = _region_in_display_list(region)
+
+    matches = None
+    if screen_id is not None:
+        matches = _search_hint(pattern, stack_image, region, screen_id)
+    if matches is None:
+        matches = search_array(stack_image.get_gray_array(), pattern, match_type)
+        if screen_id is not None:
+            if len(matches) > 0:
+                get_match_hints().set(pattern, screen_id, Matches(matches, region.x, region.y)[0])
+            else:
+                get_match_hints().invalidate(pattern, screen_id)
+
+    save_debug_image(pattern, stack_image, Matches(matches))
+    return Matches(matches, region.x, region.y)
+
+
+def _search_hint(pattern: Pattern, stack_image: ScreenshotImage, region: Rectangle, screen_id: int):
+    """Searches a pattern in a small window around its last match location.
+
+    :return: Structured array with the match relative to the region, or None if there is no usable hint or the pattern
+    is not found around it.
+    """
+    hint = get_match_hints().get(pattern, screen_id)
+    if hint is None:
+        return None
+
+    haystack = stack_image.get_gray_array()
+    needle = pattern.get_gray_array()
+    n_height, n_width = needle.shape
+    padding = Settings.match_hint_padding
+    x_start = max(int(hint.x - region.x) - padding, 0)
+    y_start = max(int(hint.y - region.y) - padding, 0)
+    x_end = min(int(hint.x - region.x) + n_width + padding, haystack.shape[1])
+    y_end = min(int(hint.y - region.y) + n_height + padding, haystack.shape[0])
+    if x_end - x_start < n_width or y_end - y_start < n_height:
+        return None
+
+    matches = _brute_force_search(haystack[y_start:y_end, x_start:x_end], needle, pattern.similarity,
+                                  MatchTemplateType.SINGLE)
+    get_match_hints().count(len(matches) > 0)
+    if len(matches) == 0:
+        return None
+    matches['x'] += x_start
+    matches['y'] += y_start
+    return matches
+
+
+def search_array(haystack, pattern: Pattern, match_type: MatchTemplateType = MatchTemplateType.SINGLE):
+    """Find a pattern in a gray array, using the search mode selected in Settings.
+
+    :param haystack: Gray array of the searched image.
+    :param Pattern pattern: Image details
+    :param MatchTemplateType match_type: Type of match_template (single or multiple)
+    :return: Structured array of matches relative to the haystack, with x, y and score fields.
+    """
+    if Settings.pyramid_search:
+        return _pyramid_search(haystack, pattern.get_gray_array(), pattern.similarity, match_type)
+    return _brute_force_search(haystack, pattern.get_gray_array(), pattern.similarity, match_type)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool used to match several patterns at once. OpenCV releases the GIL while matching, so
+    patterns are effectively matched in parallel."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=multiprocessing.cpu_count())
+    return _executor
+
+
+def _brute_force_search(haystack, needle, precision: float, match_type: MatchTemplateType):
+    """Runs a full resolution template match over the whole haystack.
+
+    :param haystack: Gray array of the searched image.
+    :param needle: Gray array of the pattern.
+    :param precision: Minimum similarity of a match.
+    :param MatchTemplateType match_type: Type of match_template (single or multiple)
+    :return: Structured array of matches relative to the haystack, with x, y and score fields.
+    """
+    res = cv2.matchTemplate(haystack, needle, FIND_METHOD)
+    if match_type is MatchTemplateType.SINGLE:
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
+        if max_val >= precision:
+            return to_matches([max_loc[0]], [max_loc[1]], [max_val])
+        return to_matches([], [], [])
+    return suppress_overlaps(find_peaks(res, precision, needle.shape), needle.shape, Settings.max_matches)
+
+
+def _pyramid_search(haystack, needle, precision: float, match_type: MatchTemplateType) -> list:
+    """Coarse-to-fine template match.
+
+    The haystack and the needle are downsampled together, candidate areas are found at the coarse level and only small
+    neighbourhoods around them are confirmed at full resolution. Falls back to _brute_force_search when the needle is
+    too small to be downsampled.
+
+    :param haystack: Gray array of the searched image.
+    :param needle: Gray array of the pattern.
+    :param precision: Minimum similarity of a match.
+    :param MatchTemplateType match_type: Type of match_template (single or multiple)
+    :return: Structured array of matches relative to the haystack, with x, y and score fields.
+    """
+    coarse_haystack = haystack
+    coarse_needle = needle
+    level = 0
+    while level < Settings.pyramid_levels and min(coarse_needle.shape) // 2 >= PYRAMID_MIN_NEEDLE_SIZE:
+        coarse_haystack = cv2.pyrDown(coarse_haystack)
+        coarse_needle = cv2.pyrDown(coarse_needle)
+        level += 1
+
+    if level == 0:
+        return _brute_force_search(haystack, needle, precision, match_type)
+
+    factor = 2 ** level
+    n_height, n_width = needle.shape
+    h_height, h_width = haystack.shape
+
+    coarse_res = cv2.matchTemplate(coarse_haystack, coarse_needle, FIND_METHOD)
+    candidates = (coarse_res >= precision - PYRAMID_SIMILARITY_SLACK).astype(np.uint8)
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(candidates)
+
+    best_val = -1
+    best_loc = None
+    matches = []
+    for x, y, width, height, area in stats[1:]:
+        x_start = max(x * factor - factor, 0)
+        y_start = max(y * factor - factor, 0)
+        x_end = min((x + width) * factor + factor + n_width, h_width)
+        y_end = min((y + height) * factor + factor + n_height, h_height)
+        if x_end - x_start < n_width or y_end - y_start < n_height:
+            continue
+
+        res = cv2.matchTemplate(haystack[y_start:y_end, x_start:x_end], needle, FIND_METHOD)
+        if match_type is MatchTemplateType.SINGLE:
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
+            if max_val > best_val:
+                best_val = max_val
+                best_loc = (max_loc[0] + x_start, max_loc[1] + y_start)
+        else:
+            window_matches = find_peaks(res, precision, needle.shape)
+            window_matches['x'] += x_start
+            window_matches['y'] += y_start
+            matches.append(window_matches)
+
+    if match_type is MatchTemplateType.SINGLE:
+        if best_val >= precision:
+            return to_matches([best_loc[0]], [best_loc[1]], [best_val])
+        return to_matches([], [], [])
+    if len(matches) == 0:
+        return to_matches([], [], [])
+    return suppress_overlaps(np.concatenate(matches), needle.shape, Settings.max_matches)
 
 
 def _region_in_display_list(region=None):
@@ -108,6 +301,94 @@ def _region_in_display_list(region=None):
             return index
 
 
+class WaitStats:
+    """Statistics of a wait operation.
+
+    polls           -   The number of screen captures.
+    skipped_frames  -   The number of captures that were not searched, because they did not change since the previous
+                        searched capture.
+    match_time      -   The time spent searching for patterns (seconds).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.polls = 0
+        self.skipped_frames = 0
+        self.match_time = 0
+
+    def __repr__(self):
+        return '%s(%r, polls=%r, skipped_frames=%r, match_time=%.3f)' % (self.__class__.__name__, self.name, self.polls,
+                                                                         self.skipped_frames, self.match_time)
+
+
+def get_last_wait_stats() -> WaitStats or None:
+    """Returns the statistics of the last wait operation."""
+    return _last_wait_stats
+
+
+def _is_frame_changed(previous, current) -> bool:
+    """Checks if enough pixels changed between two captures of the same region."""
+    if previous is None or previous.shape != current.shape:
+        return True
+    return cv2.countNonZero(cv2.absdiff(previous, current)) >= Settings.observe_min_changed_pixels
+
+
+def _wait_for(name: str, region: Rectangle, timeout: float, on_frame):
+    """Change-aware polling engine used by all the wait operations.
+
+    The region is captured Settings.wait_scan_rate times per second. Captures that did not change since the last
+    searched capture are skipped, since searching them would give the same result. Changes smaller than
+    Settings.observe_min_changed_pixels are not detected, so captures are searched at least once every
+    WAIT_REMATCH_INTERVAL seconds even if they did not change.
+
+    :param name: Description of the wait operation, used in logs.
+    :param Region region: Region object.
+    :param timeout: Number as maximum waiting time in seconds.
+    :param on_frame: Function called with each changed ScreenshotImage. Returns a (done, result) pair.
+    :return: The last result returned by on_frame.
+    """
+    global _last_wait_stats
+    stats = WaitStats(name)
+    screen_id = _region_in_display_list(region)
+    previous_array = None
+    last_match_time = None
+    result = None
+    end_time = time.time() + timeout
+
+    with debug_image_wait():
+        while True:
+            poll_start = time.time()
+            stats.polls += 1
+            try:
+                stack_image = ScreenshotImage(region=region, screen_id=screen_id)
+            except ScreenshotError:
+                logger.warning('Screenshot failed.')
+                stack_image = None
+
+            if stack_image is not None:
+                if last_match_time is None or poll_start - last_match_time >= WAIT_REMATCH_INTERVAL or \
+                        _is_frame_changed(previous_array, stack_image.get_gray_array()):
+                    previous_array = stack_image.get_gray_array()
+                    match_start = last_match_time = time.time()
+                    done, result = on_frame(stack_image)
+                    stats.match_time += time.time() - match_start
+                    if done:
+                        break
+                else:
+                    stats.skipped_frames += 1
+
+            now = time.time()
+            if now >= end_time:
+                break
+            if Settings.wait_scan_rate > 0:
+                time.sleep(max(0, min(1.0 / Settings.wait_scan_rate - (now - poll_start), end_time - now)))
+
+    logger.debug('%s: %s polls, %s skipped frames, %.3f seconds matching.'
+                 % (name, stats.polls, stats.skipped_frames, stats.match_time))
+    _last_wait_stats = stats
+    return result
+
+
 def image_find(pattern, timeout=None, region=None):
     """ Search for an image in a Region or full screen.
 
@@ -116,24 +397,20 @@ def image_find(pattern, timeout=None, region=None):
     :param Region region: Region object.
     :return: Location.
     """
-    # if not _is_pattern_size_correct(pattern, region):
-    #     return None
-
     if timeout is None:
         timeout = Settings.auto_wait_timeout
 
-    start_time = datetime.datetime.now()
-    end_time = start_time + datetime.timedelta(seconds=timeout)
-
-    while start_time < end_time:
-        time_remaining = end_time - start_time
-        logger.debug("Searching for image %s - %s seconds remaining" % (pattern.get_filename(), time_remaining))
-        pos = match_template(pattern, region, MatchTemplateType.SINGLE)
-        start_time = datetime.datetime.now()
+    if region is None:
+        region = DisplayCollection[0].bounds
 
+    def on_frame(stack_image):
+        pos = _match_pattern(pattern, stack_image, region, MatchTemplateType.SINGLE)
         if len(pos) == 1:
-            return pos[0]
-    return None
+            return True, pos[0]
+        return False, None
+
+    logger.debug('Searching for image %s - %s seconds timeout' % (pattern.get_filename(), timeout))
+    return _wait_for('Find %s' % pattern.get_filename(), region, timeout, on_frame)
 
 
 def image_vanish(pattern: Pattern, timeout: float = None, region: Rectangle = None) -> None or bool:
@@ -142,22 +419,56 @@ def image_vanish(pattern: Pattern, timeout: float = None, region: Rectangle = No
     :param Pattern pattern: Name of the searched image.
     :param timeout: Number as maximum waiting time in seconds.
     :param Region region: Region object.
-    :return: Location.
+    :return: True if the image vanished, otherwise None.
     """
+    if timeout is None:
+        timeout = Settings.auto_wait_timeout
+
+    if region is None:
+        region = DisplayCollection[0].bounds
+
     if not _is_pattern_size_correct(pattern, region):
         return None
 
-    pattern_found = True
+    def on_frame(stack_image):
+        vanished = len(_match_pattern(pattern, stack_image, region, MatchTemplateType.SINGLE)) == 0
+        return vanished, vanished
 
-    start_time = datetime.datetime.now()
-    end_time = start_time + datetime.timedelta(seconds=timeout)
+    return True if _wait_for('Vanish %s' % pattern.get_filename(), region, timeout, on_frame) else None
 
-    while pattern_found is True and start_time < end_time:
-        image_found = match_template(pattern, region, MatchTemplateType.SINGLE)
-        if len(image_found) == 0:
-            pattern_found = True
-        else:
-            pattern_found = False
-        start_time = datetime.datetime.now()
 
-    return None if pattern_found else True
+def image_find_many(patterns: list, timeout: float = None, region: Rectangle = None, find_all: bool = False,
+                    parallel: bool = False) -> list:
+    """ Search for several images in a Region or full screen, using one screen capture per poll.
+
+    :param list patterns: List of Pattern objects.
+    :param timeout: Number as maximum waiting time in seconds.
+    :param Region region: Region object.
+    :param bool find_all: If True, search until all the patterns are found, otherwise until any pattern is found.
+    :param bool parallel: If True, patterns are matched in a thread pool.
+    :return: List with the Location of each pattern, or None for the patterns that were not found.
+    """
+    if timeout is None:
+        timeout = Settings.auto_wait_timeout
+
+    if region is None:
+        region = DisplayCollection[0].bounds
+
+    if len(patterns) == 0:
+        return []
+
+    results = [None] * len(patterns)
+
+    def on_frame(stack_image):
+        pending = [index for index, result in enumerate(results) if result is None]
+        found = _match_patterns([patterns[index] for index in pending], stack_image, region,
+                                MatchTemplateType.SINGLE, parallel)
+        for index, locations in zip(pending, found):
+            if len(locations) > 0:
+                results[index] = locations[0]
+
+        found_count = len([result for result in results if result is not None])
+        return (find_all and found_count == len(patterns)) or (not find_all and found_count > 0), results
+
+    _wait_for('Find %s patterns' % len(patterns), region, timeout, on_frame)
+    return results
@@ -0,0 +1,77 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import threading
+
+from src.core.api.finder.pattern import Pattern
+from src.core.api.location import Location
+from src.core.api.screen.display import DisplayCollection
+
+logger = logging.getLogger(__name__)
+
+
+class MatchHintCache:
+    """Cache of the last match location of each pattern.
+
+    Hints are keyed by pattern image and display. The display bounds and scale are part of the key, so hints recorded
+    on a different display layout are never used. Hits and misses are counted for the whole run.
+    """
+
+    def __init__(self):
+        self.hints = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(pattern: Pattern, screen_id: int):
+        display = DisplayCollection[screen_id]
+        bounds = display.bounds
+        return (pattern.image_path, pattern.scale_factor, screen_id, bounds.x, bounds.y, bounds.width, bounds.height,
+                display.scale)
+
+    def get(self, pattern: Pattern, screen_id: int) -> Location or None:
+        """Returns the last match location of a pattern on a display, or None if there is no hint."""
+        with self._lock:
+            return self.hints.get(self._get_key(pattern, screen_id))
+
+    def set(self, pattern: Pattern, screen_id: int, location: Location):
+        """Records the match location of a pattern on a display."""
+        with self._lock:
+            self.hints[self._get_key(pattern, screen_id)] = location
+
+    def invalidate(self, pattern: Pattern, screen_id: int):
+        """Removes the hint of a pattern on a display."""
+        with self._lock:
+            self.hints.pop(self._get_key(pattern, screen_id), None)
+
+    def count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        """Removes all the hints. Called when the window layout changes."""
+        with self._lock:
+            self.hints.clear()
+
+    def log_stats(self):
+        logger.debug('Match hints: %s hints, %s hits, %s misses.' % (len(self.hints), self.hits, self.misses))
+
+
+_match_hints = MatchHintCache()
+
+
+def get_match_hints() -> MatchHintCache:
+    """Returns the global match hint cache."""
+    return _match_hints
+
+
+def clear_match_hints():
+    """Removes all the match hints, for example after the browser window is moved or resized."""
+    _match_hints.clear()
@@ -0,0 +1,118 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import cv2
+import numpy as np
+
+from src.core.api.location import Location
+
+MATCH_DTYPE = np.dtype([('x', np.int32), ('y', np.int32), ('score', np.float32)])
+
+
+def to_matches(xs, ys, scores):
+    """Returns a structured array of matches, with x, y and score fields."""
+    matches = np.empty(len(scores), dtype=MATCH_DTYPE)
+    matches['x'] = xs
+    matches['y'] = ys
+    matches['score'] = scores
+    return matches
+
+
+def find_peaks(res, precision: float, needle_shape: tuple):
+    """Returns the local maxima of a matchTemplate result that are above precision.
+
+    A point is a local maximum if no point within half the needle size has a higher score.
+
+    :param res: matchTemplate result.
+    :param precision: Minimum similarity of a match.
+    :param needle_shape: (height, width) of the needle.
+    :return: Structured array of matches.
+    """
+    above = res >= precision
+    if not above.any():
+        return np.empty(0, dtype=MATCH_DTYPE)
+
+    radius_y, radius_x = _get_radius(needle_shape)
+    kernel = np.ones((2 * radius_y + 1, 2 * radius_x + 1), dtype=np.uint8)
+    peaks = above & (res >= cv2.dilate(res, kernel))
+    ys, xs = np.nonzero(peaks)
+    return to_matches(xs, ys, res[ys, xs])
+
+
+def suppress_overlaps(matches, needle_shape: tuple, max_matches: int):
+    """Non-maximum suppression of matches.
+
+    Matches are kept by decreasing score, dropping the ones whose position is within half the needle size of an
+    already kept match, until max_matches matches are kept.
+
+    :param matches: Structured array of matches.
+    :param needle_shape: (height, width) of the needle.
+    :param max_matches: Maximum number of kept matches.
+    :return: Structured array of matches, sorted by position (top to bottom, left to right).
+    """
+    if len(matches) == 0:
+        return matches
+
+    radius_y, radius_x = _get_radius(needle_shape)
+    matches = matches[np.argsort(-matches['score'], kind='stable')]
+    xs = matches['x']
+    ys = matches['y']
+    suppressed = np.zeros(len(matches), dtype=bool)
+    keep = []
+    for index in range(len(matches)):
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        if len(keep) >= max_matches:
+            break
+        suppressed |= (np.abs(xs - xs[index]) <= radius_x) & (np.abs(ys - ys[index]) <= radius_y)
+
+    kept = matches[keep]
+    return kept[np.lexsort((kept['x'], kept['y']))]
+
+
+def _get_radius(needle_shape: tuple) -> (int, int):
+    height, width = needle_shape[:2]
+    return max(height // 2, 1), max(width // 2, 1)
+
+
+class Matches:
+    """Matches of a pattern, kept in a structured array with x, y and score fields.
+
+    Behaves like a read-only list of Location objects, which are only built when accessed. The offset is added to the
+    match positions, to convert them from screenshot to screen coordinates. Used inside the finder: the public search
+    functions return plain lists, built with to_list().
+    """
+
+    def __init__(self, array=None, offset_x: int = 0, offset_y: int = 0):
+        self.array = np.empty(0, dtype=MATCH_DTYPE) if array is None else array
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_list())
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._to_location(match) for match in self.array[index]]
+        return self._to_location(self.array[index])
+
+    def __iter__(self):
+        for match in self.array:
+            yield self._to_location(match)
+
+    @property
+    def scores(self) -> list:
+        return [float(score) for score in self.array['score']]
+
+    def to_list(self) -> list:
+        """Returns the matches as a list of Location objects."""
+        return list(self)
+
+    def _to_location(self, match) -> Location:
+        return Location(int(match['x']) + self.offset_x, int(match['y']) + self.offset_y)
@@ -0,0 +1,221 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import threading
+import time
+
+import cv2
+
+from src.core.api.enums import MatchTemplateType, ObserveEventType
+from src.core.api.errors import ScreenshotError
+from src.core.api.finder.image_search import search_array, _region_in_display_list
+from src.core.api.finder.pattern import Pattern
+from src.core.api.location import Location
+from src.core.api.rectangle import Rectangle
+from src.core.api.screen.screenshot_image import ScreenshotImage
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_capture_thread = None
+_capture_lock = threading.Lock()
+
+
+class ObserveEvent:
+    """Event passed to the observer callbacks."""
+
+    def __init__(self, event_type: ObserveEventType, region: Rectangle, pattern: Pattern = None,
+                 location: Location = None, changed_pixels: int = 0):
+        self.type = event_type
+        self.region = region
+        self.pattern = pattern
+        self.location = location
+        self.changed_pixels = changed_pixels
+
+    def __repr__(self):
+        return '%s(%r, %r, %r, %r)' % (self.__class__.__name__, self.type, self.region, self.location,
+                                       self.changed_pixels)
+
+
+class ObserveHandler:
+    """Callback registered on a region, called by the capture thread when its event happens.
+
+    Appear and vanish events are triggered on transitions: an appear handler fires once the pattern is found after
+    not being found, a vanish handler fires once the pattern is not found after being found. A vanish handler starts
+    in the found state, so it fires on the first frame if the pattern is missing. A change handler fires each time at
+    least min_changed_pixels pixels of the region differ from the previous frame.
+    """
+
+    def __init__(self, event_type: ObserveEventType, region: Rectangle, callback, pattern: Pattern = None,
+                 min_changed_pixels: int = None):
+        self.type = event_type
+        self.region = region
+        self.callback = callback
+        self.pattern = pattern
+        self.min_changed_pixels = min_changed_pixels
+        self.fired = threading.Event()
+        self.active = True
+        self._found = None
+        self._previous_array = None
+        self.reset()
+
+    def reset(self):
+        """Clears the fired event and the state of the previous captures, before observing starts again."""
+        self.fired.clear()
+        self._found = self.type == ObserveEventType.VANISH
+        self._previous_array = None
+
+    def process(self, gray_array):
+        """Checks a capture of the handler region and calls the callback if the event happened.
+
+        :param gray_array: Gray array of the handler region.
+        :return: None.
+        """
+        event = None
+        if self.type == ObserveEventType.CHANGE:
+            if self._previous_array is not None and self._previous_array.shape == gray_array.shape:
+                min_changed_pixels = self.min_changed_pixels
+                if min_changed_pixels is None:
+                    min_changed_pixels = Settings.observe_min_changed_pixels
+                changed_pixels = cv2.countNonZero(cv2.absdiff(self._previous_array, gray_array))
+                if changed_pixels >= min_changed_pixels:
+                    event = ObserveEvent(self.type, self.region, changed_pixels=changed_pixels)
+            self._previous_array = gray_array.copy()
+        else:
+            p_height, p_width = self.pattern.get_gray_array().shape[:2]
+            if p_width > gray_array.shape[1] or p_height > gray_array.shape[0]:
+                return
+            matches = search_array(gray_array, self.pattern, MatchTemplateType.SINGLE)
+            found = len(matches) > 0
+            if found != self._found:
+                self._found = found
+                if found and self.type == ObserveEventType.APPEAR:
+                    location = Location(int(matches[0]['x']) + self.region.x, int(matches[0]['y']) + self.region.y)
+                    event = ObserveEvent(self.type, self.region, self.pattern, location)
+                elif not found and self.type == ObserveEventType.VANISH:
+                    event = ObserveEvent(self.type, self.region, self.pattern)
+
+        if event is not None:
+            logger.debug('Observer event: %s' % event)
+            try:
+                self.callback(event)
+            except Exception as e:
+                logger.error('Observer callback for %s event failed: %s' % (self.type.value, e))
+            self.fired.set()
+
+
+class _CaptureThread(threading.Thread):
+    """Background thread capturing the screen for all the registered handlers.
+
+    Handlers are grouped by display and each display is captured once per scan, over the bounding box of its handler
+    regions. Every handler then gets a view of its own region from that shared frame. The thread stops when its last
+    handler is removed.
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self, name='ObserverCaptureThread', daemon=True)
+        self.handlers = []
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def add(self, handler: ObserveHandler):
+        with self.lock:
+            if handler not in self.handlers:
+                self.handlers.append(handler)
+
+    def remove(self, handler: ObserveHandler) -> int:
+        """Removes a handler and returns the number of handlers left."""
+        with self.lock:
+            if handler in self.handlers:
+                self.handlers.remove(handler)
+            return len(self.handlers)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self.lock:
+                handlers = [handler for handler in self.handlers if handler.active]
+            scan_start = time.time()
+            if len(handlers) > 0:
+                self._scan(handlers)
+            scan_rate = max(Settings.observe_scan_rate, 0.1)
+            self._stop_event.wait(max(1.0 / scan_rate - (time.time() - scan_start), 0))
+
+    @staticmethod
+    def _scan(handlers: list):
+        displays = {}
+        for handler in handlers:
+            displays.setdefault(_region_in_display_list(handler.region), []).append(handler)
+
+        for screen_id, display_handlers in displays.items():
+            bounds = _get_bounding_box([handler.region for handler in display_handlers])
+            try:
+                gray_array = ScreenshotImage(region=bounds, screen_id=screen_id).get_gray_array()
+            except ScreenshotError:
+                logger.warning('Observer screenshot failed.')
+                continue
+            for handler in display_handlers:
+                x = int(handler.region.x - bounds.x)
+                y = int(handler.region.y - bounds.y)
+                handler.process(gray_array[y:y + int(handler.region.height), x:x + int(handler.region.width)])
+
+
+def _get_bounding_box(regions: list) -> Rectangle:
+    """Returns the smallest Rectangle containing all the regions."""
+    x_start = min(region.x for region in regions)
+    y_start = min(region.y for region in regions)
+    x_end = max(region.x + region.width for region in regions)
+    y_end = max(region.y + region.height for region in regions)
+    return Rectangle(x_start, y_start, x_end - x_start, y_end - y_start)
+
+
+def start_observing(handler: ObserveHandler):
+    """Registers a handler to the capture thread, starting the thread if needed.
+
+    :param ObserveHandler handler: Handler to register.
+    :return: None.
+    """
+    global _capture_thread
+    handler.reset()
+    handler.active = True
+    with _capture_lock:
+        if _capture_thread is None:
+            _capture_thread = _CaptureThread()
+            _capture_thread.start()
+        _capture_thread.add(handler)
+
+
+def stop_observing(handler: ObserveHandler):
+    """Removes a handler from the capture thread, and stops the thread if no handler is left.
+
+    The thread is not joined, since callbacks run on it and can stop observing.
+
+    :param ObserveHandler handler: Handler to remove.
+    :return: None.
+    """
+    global _capture_thread
+    handler.active = False
+    with _capture_lock:
+        if _capture_thread is not None and _capture_thread.remove(handler) == 0:
+            _capture_thread.stop()
+            _capture_thread = None
+
+
+def wait_for_handlers(handlers: list, timeout: float = None) -> bool:
+    """Waits until all the handlers fired at least once.
+
+    :param handlers: List of ObserveHandler objects.
+    :param timeout: Maximum waiting time in seconds, None to wait forever.
+    :return: True if all the handlers fired, False if the timeout expired.
+    """
+    end_time = None if timeout is None else time.time() + timeout
+    for handler in handlers:
+        remaining = None if end_time is None else max(end_time - time.time(), 0)
+        if not handler.fired.wait(remaining):
+            return False
+    return True
@@ -0,0 +1,69 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_ocr_cache = None
+
+
+def get_image_hash(gray_array) -> str:
+    """Returns the content hash of a gray array, used as the OCR cache key of a screenshot."""
+    gray_array = np.ascontiguousarray(gray_array)
+    digest = hashlib.sha1(gray_array.tobytes())
+    digest.update(str(gray_array.shape).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """LRU cache of parsed OCR results, keyed by (image hash, scale, preprocess)."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """Returns the cached OCR rows of a key, or None."""
+        with self._lock:
+            rows = self.entries.get(key)
+            if rows is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return rows
+
+    def set(self, key: tuple, rows: list):
+        with self._lock:
+            self.entries[key] = rows
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def log_stats(self):
+        logger.debug('OCR cache: %s entries, %s hits, %s misses.' % (len(self.entries), self.hits, self.misses))
+
+
+def get_ocr_cache() -> OcrCache:
+    """Returns the global OCR cache."""
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = OcrCache(Settings.ocr_cache_size)
+    return _ocr_cache
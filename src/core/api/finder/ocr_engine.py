@@ -0,0 +1,121 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import multiprocessing
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import pytesseract
+
+from src.core.api.settings import Settings
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class OcrEngine(ABC):
+    """Base class of the OCR engines.
+
+    Engines return the tesseract TSV output of an image, with its header line, like pytesseract.image_to_data. Several
+    images are recognized concurrently by a pool of long-lived workers.
+    """
+
+    name = None
+
+    def __init__(self, workers: int):
+        self.workers = max(workers, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='OcrWorker')
+
+    @abstractmethod
+    def image_to_data(self, image) -> str:
+        """Recognizes an image.
+
+        :param image: PIL Image.
+        :return: TSV data.
+        """
+
+    def recognize_many(self, images: list) -> list:
+        """Recognizes several images concurrently.
+
+        :param images: List of PIL Images.
+        :return: List with the TSV data of each image, in the same order as images.
+        """
+        if len(images) == 1:
+            return [self.image_to_data(images[0])]
+        return list(self._executor.map(self.image_to_data, images))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class TesserocrEngine(OcrEngine):
+    """Recognizes images with the tesseract C API, through a pool of initialized tesserocr instances."""
+
+    name = 'tesserocr'
+
+    def __init__(self, workers: int):
+        OcrEngine.__init__(self, workers)
+        self._apis = queue.Queue()
+        for _ in range(self.workers):
+            self._apis.put(tesserocr.PyTessBaseAPI())
+
+    def image_to_data(self, image) -> str:
+        api = self._apis.get()
+        try:
+            api.SetImage(image)
+            return '%s\n%s' % (TSV_HEADER, api.GetTSVText(0))
+        finally:
+            self._apis.put(api)
+
+    def close(self):
+        OcrEngine.close(self)
+        while not self._apis.empty():
+            self._apis.get().End()
+
+
+class PytesseractEngine(OcrEngine):
+    """Recognizes images with the tesseract command line tool. Each image still starts a tesseract process, but the
+    processes of a search run concurrently. Used on Windows, where tesserocr is not installed, and when tesserocr can't
+    be initialized."""
+
+    name = 'pytesseract'
+
+    def image_to_data(self, image) -> str:
+        return pytesseract.image_to_data(image)
+
+
+def _create_engine() -> OcrEngine:
+    workers = Settings.ocr_workers or multiprocessing.cpu_count()
+    if Settings.ocr_engine in (None, TesserocrEngine.name) and tesserocr is not None:
+        try:
+            return TesserocrEngine(workers)
+        except RuntimeError as e:
+            logger.warning('Unable to initialize tesserocr: %s' % e)
+    elif Settings.ocr_engine == TesserocrEngine.name:
+        logger.warning('tesserocr is not installed, using %s instead.' % PytesseractEngine.name)
+    elif Settings.ocr_engine is None:
+        logger.debug('tesserocr is not installed, each OCR call starts a tesseract process.')
+    return PytesseractEngine(workers)
+
+
+def get_ocr_engine() -> OcrEngine:
+    """Returns the OCR engine, creating its worker pool on first call."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _create_engine()
+            logger.debug('OCR engine: %s with %s workers.' % (_engine.name, _engine.workers))
+    return _engine
@@ -3,6 +3,7 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import functools
 import inspect
 import logging
 import os
@@ -11,6 +12,8 @@ import cv2
 import numpy as np
 
 from src.core.api.errors import FindError
+from src.core.api.finder.image_index import get_image_index, parse_name
+from src.core.api.finder.pattern_cache import load_gray_array
 from src.core.api.location import Location
 from src.core.api.os_helpers import OSHelper
 from src.core.api.settings import Settings
@@ -35,24 +38,20 @@ class Pattern:
 
     def __init__(self, image_name: str, from_path: str = None, application: str = parse_args().application):
 
-        if from_path is None:
-            path = _get_image_path(inspect.stack()[1][1], image_name, application)
-        else:
-            path = from_path
-        name, scale = _parse_name(os.path.split(path)[1])
-
-        image = cv2.imread(path)
-
-        self.image_name = name
-        self.image_path = path
-        self.scale_factor = scale
+        self._requested_name = image_name
+        self._caller = inspect.currentframe().f_back.f_code.co_filename if from_path is None else None
+        self._application = application
+        self._image_name = None
+        self._image_path = from_path
+        self._scale_factor = None
         self.similarity = Settings.min_similarity
         self._target_offset = None
-        self._size = _get_pattern_size(image, scale)
-        self.rgb_array = _get_array_from_image(image)
-        self.color_image = _get_image_from_array(scale, self.rgb_array)
-        self.gray_image = _get_gray_image(self.color_image)
-        self.gray_array = _get_array_from_image(self.gray_image)
+        self._loaded = False
+        self._gray_array = None
+        self._size = None
+        self._rgb_array = None
+        self._color_image = None
+        self._gray_image = None
 
     def __str__(self):
         return '(%s, %s, %s, %s)' % (self.image_name, self.image_path, self.scale_factor, self.similarity)
@@ -88,6 +87,66 @@ class Pattern:
         """Getter for the scale_factor property."""
         return self.scale_factor
 
+    def _resolve(self):
+        """Resolves the image path relative to the module that created the pattern, on first use."""
+        if self._scale_factor is None:
+            if self._image_path is None:
+                self._image_path = _get_image_path(self._caller, self._requested_name, self._application)
+            self._image_name, self._scale_factor = parse_name(os.path.split(self._image_path)[1])
+
+    def _load(self):
+        """Loads the image pixels on first use."""
+        if not self._loaded:
+            self._resolve()
+            self._gray_array = load_gray_array(self._image_path, self._scale_factor, _decode_gray_array)
+            self._size = _get_pattern_size(self._gray_array, self._scale_factor)
+            self._loaded = True
+
+    @property
+    def image_name(self):
+        """Name of the image, without the scale factor."""
+        self._resolve()
+        return self._image_name
+
+    @property
+    def image_path(self):
+        """Full path to the image on disk."""
+        self._resolve()
+        return self._image_path
+
+    @property
+    def scale_factor(self):
+        """Scale factor detected in the image name."""
+        self._resolve()
+        return self._scale_factor
+
+    @property
+    def rgb_array(self):
+        """Color array of the image, as decoded from disk. Built on first use."""
+        if self._rgb_array is None:
+            self._rgb_array = _get_array_from_image(cv2.imread(self.image_path))
+        return self._rgb_array
+
+    @property
+    def color_image(self):
+        """Scaled color image. Built on first use."""
+        if self._color_image is None:
+            self._color_image = _get_image_from_array(self.scale_factor, self.rgb_array)
+        return self._color_image
+
+    @property
+    def gray_image(self):
+        """Scaled gray image. Built on first use."""
+        if self._gray_image is None and self.gray_array is not None:
+            self._gray_image = Image.fromarray(np.asarray(self._gray_array))
+        return self._gray_image
+
+    @property
+    def gray_array(self):
+        """Scaled gray array, memory-mapped from the pattern cache."""
+        self._load()
+        return self._gray_array
+
     def get_rgb_array(self):
         """Getter for the RGB array of image."""
         return self.rgb_array
@@ -121,70 +180,10 @@ class Pattern:
 
     def get_size(self):
         """Getter for the _size property."""
+        self._load()
         return self._size
 
 
-def _parse_name(full_name: str) -> (str, int):
-    """Detects the scale factor in image name.
-
-    :param str full_name: Image full name. Valid format name@[scale_factor]x.png.
-    Examples: google_search@2x.png, amazon_logo@2.5x.png
-
-    :return: Pair of image name and scale factor.
-    """
-    start_symbol = '@'
-    end_symbol = 'x.'
-    if start_symbol not in full_name:
-        return full_name, 1
-    else:
-        try:
-            start_index = full_name.index(start_symbol)
-            end_index = full_name.index(end_symbol, start_index)
-            scale_factor = float(full_name[start_index + 1:end_index])
-            image_name = full_name[0:start_index] + full_name[end_index + 1:len(full_name)]
-            return image_name, scale_factor
-        except ValueError:
-            logger.warning('Invalid file name format: "%s".' % full_name)
-            return full_name, 1
-
-
-def _load_all_patterns(application: str) -> list:
-    """Function returns a list with all the project's Patterns."""
-    if parse_args().resize:
-        _convert_hi_res_images()
-    result_list = []
-    for root, dirs, files in os.walk(PathManager.get_module_dir()):
-        for file_name in files:
-            if file_name.endswith('.png'):
-                if application in root and (PathManager.get_images_path() in root or 'common' in root):
-                    pattern_name, pattern_scale = _parse_name(file_name)
-                    pattern_path = os.path.join(root, file_name)
-                    pattern = {'name': pattern_name, 'path': pattern_path, 'scale': pattern_scale}
-                    result_list.append(pattern)
-    return result_list
-
-
-def _convert_hi_res_images():
-    """Function resizes all the project's hi-resolution images."""
-    for root, dirs, files in os.walk(PathManager.get_module_dir()):
-        for file_name in files:
-            if file_name.endswith('.png'):
-                if 'images' in root or 'local_web' in root:
-                    if '@' in file_name:
-                        logger.debug('Found hi-resolution image at: %s' % os.path.join(root, file_name))
-                        temp = file_name.split('@')
-                        name = temp[0]
-                        scale = int(temp[1].split('x')[0])
-                        new_name = '%s.png' % name
-                        img = Image.open(os.path.join(root, file_name))
-                        logger.debug('Resizing image from %sx scale' % scale)
-                        new_img = img.resize((img.width / scale, img.height / scale), Image.ANTIALIAS)
-                        logger.debug('Creating newly converted image file at: %s' % os.path.join(root, new_name))
-                        new_img.save(os.path.join(root, new_name))
-                        logger.debug('Removing unused image at: %s' % os.path.join(root, file_name))
-                        os.remove(os.path.join(root, file_name))
-
-
 def _apply_scale(scale: int, rgb_array):
     """Resize the image for HD images.
 
@@ -207,10 +206,12 @@ def _get_array_from_image(image: Image):
     return np.array(image)
 
 
-def _get_pattern_size(image: Image, scale: float) -> (int, int):
-    if image is None or scale is None:
+def _get_pattern_size(gray_array, scale: float) -> (int, int):
+    if gray_array is None or scale is None:
         return None
-    height, width, channel = image.shape
+    height, width = gray_array.shape[:2]
+    if scale > 1:
+        return width, height
     return int(width / scale), int(height / scale)
 
 
@@ -221,11 +222,30 @@ def _get_image_from_array(scale: int, array) -> Image:
     return Image.fromarray(_apply_scale(scale, array))
 
 
-def _get_gray_image(colored_image: Image) -> Image:
-    """Converts colored image to gray image."""
-    if colored_image is None:
+def _decode_gray_array(path: str, scale: float):
+    """Decodes an image from disk and returns its scaled gray array.
+
+    cv2.imread returns BGR pixels, converted with the same luminance weights as the screenshots.
+    """
+    bgr_array = cv2.imread(path)
+    if bgr_array is None:
         return None
-    return colored_image.convert('L')
+    return cv2.cvtColor(_apply_scale(scale, bgr_array), cv2.COLOR_BGR2GRAY)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_real_path(path: str) -> str:
+    return os.path.realpath(path)
+
+
+def _find_in_index(index, module_directory: str, os_version: str, locale: str, names: list) -> str or None:
+    """Looks up an image in the image index, using the same priority as the default locations of _get_image_path."""
+    for folder, folder_locale in ((os_version, locale), ('common', locale), (os_version, ''), ('common', '')):
+        for name in names:
+            path = index.get(module_directory, folder, folder_locale, name)
+            if path is not None:
+                return path
+    return None
 
 
 def _get_image_path(caller, image: str, application: str) -> str:
@@ -281,20 +301,20 @@ def _get_image_path(caller, image: str, application: str) -> str:
     for name in names:
         paths.append(os.path.join(common_directory, name))
 
-    found = False
-    image_path = None
-    for path in paths:
-        if os.path.exists(path):
-            found = True
-            image_path = path
-            break
+    index = get_image_index()
+    real_module_directory = _get_real_path(module_directory)
+    image_path = _find_in_index(index, real_module_directory, os_version, current_locale, names)
+    if image_path is None and index.source != 'tree':
+        image_path = _find_in_index(get_image_index(rebuild=True), real_module_directory, os_version,
+                                    current_locale, names)
+    found = image_path is not None
 
     if found:
         logger.debug('Module %s requests image %s' % (module, image))
         logger.debug('Found %s' % image_path)
         return image_path
     else:
-        result_list = [x for x in _load_all_patterns(application) if x['name'] == image]
+        result_list = get_image_index().find_by_name(image, application)
         if len(result_list) > 0:
             res = result_list[0]
             logger.warning('Failed to find image %s in default locations for module %s.' % (image, module))
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from src.core.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+
+
+def _get_cache_key(path: str, mtime: int, scale: float) -> str:
+    """Returns the cache key of a pattern image, based on the cache version, its path, modification time and scale
+    factor."""
+    raw_key = '%s|%s|%s|%s' % (CACHE_VERSION, os.path.realpath(path), mtime, scale)
+    return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+
+def _save_gray_array(cache_file: str, gray_array):
+    """Writes a gray array to the cache. The file is renamed in place once complete, so readers never see partial
+    files."""
+    temp_file = '%s.%s.tmp' % (cache_file, os.getpid())
+    try:
+        with open(temp_file, 'wb') as f:
+            np.save(f, gray_array)
+        os.replace(temp_file, cache_file)
+    except (IOError, OSError) as e:
+        logger.debug('Unable to write pattern cache file %s: %s' % (cache_file, e))
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def load_gray_array(path: str, scale: float, decoder):
+    """Returns the gray array of a pattern image, memory-mapped from the on-disk pattern cache when possible.
+
+    :param path: Path to the pattern image.
+    :param scale: Scale factor of the pattern image.
+    :param decoder: Function called with path and scale to build the gray array on a cache miss.
+    :return: Gray array, or None if the image can't be decoded.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    try:
+        cache_file = os.path.join(PathManager.get_pattern_cache_dir(), '%s.npy' % _get_cache_key(path, mtime, scale))
+    except OSError:
+        return decoder(path, scale)
+
+    if os.path.exists(cache_file):
+        try:
+            return np.load(cache_file, mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            logger.debug('Invalid pattern cache file %s, decoding %s again.' % (cache_file, path))
+
+    gray_array = decoder(path, scale)
+    if gray_array is not None:
+        _save_gray_array(cache_file, gray_array)
+    return gray_array
@@ -0,0 +1,69 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Command line of the search and capture benchmarks, used to check the Settings.pyramid_search and
+Settings.capture_backend defaults on a machine.
+
+Usage, from the Iris directory, on a machine with a display:
+
+    python -m src.core.api.finder.run_benchmark pyramid SCREENSHOT_DIR PATTERN [PATTERN ...] [-r REPEAT] [-t TOLERANCE]
+    python -m src.core.api.finder.run_benchmark capture [-r REPEAT]
+
+The recorded screenshots can be the debug images of a previous run, and the patterns the images of its tests.
+"""
+
+import argparse
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_benchmark_args(argv: list):
+    parser = argparse.ArgumentParser(description='Run Iris benchmarks',
+                                     prog='python -m src.core.api.finder.run_benchmark')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    pyramid = subparsers.add_parser('pyramid', help='Compare pyramid search with brute-force search')
+    pyramid.add_argument('screenshot_dir', help='Directory of recorded screenshots')
+    pyramid.add_argument('patterns', nargs='+', help='Pattern images searched in the screenshots')
+    pyramid.add_argument('-r', '--repeat',
+                         help='Number of times each search is timed',
+                         type=int,
+                         default=3)
+    pyramid.add_argument('-t', '--tolerance',
+                         help='Maximum distance in pixels between the locations found by both searches',
+                         type=int,
+                         default=None)
+
+    capture = subparsers.add_parser('capture', help='Measure the capture latency of each screen capture backend')
+    capture.add_argument('-r', '--repeat',
+                         help='Number of captures per backend',
+                         type=int,
+                         default=20)
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = _parse_benchmark_args(sys.argv[1:])
+    # Iris modules parse the Iris arguments when they are imported, so they are imported without the benchmark ones.
+    sys.argv = sys.argv[:1]
+    from src.core.api.finder import benchmark
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.benchmark == 'pyramid':
+        tolerance = benchmark.LOCATION_TOLERANCE if args.tolerance is None else args.tolerance
+        report = benchmark.benchmark_pyramid_search(args.screenshot_dir, args.patterns, args.repeat, tolerance)
+    else:
+        report = benchmark.benchmark_capture_backends(repeat=args.repeat)
+
+    if len(report) == 0:
+        logger.error('Nothing was measured.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+
+import cv2
+import numpy as np
+
+from src.core.api.rectangle import Rectangle
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+BAND_KERNEL_SIZE = (25, 5)
+BAND_MIN_HEIGHT = 6
+BAND_MAX_HEIGHT = 150
+BAND_MIN_WIDTH = 6
+BAND_PADDING = 6
+
+
+def _merge_bands(bands: list) -> list:
+    """Merges overlapping bands, until none of them overlap."""
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for x_start, y_start, x_end, y_end in sorted(bands):
+            for index, (r_x_start, r_y_start, r_x_end, r_y_end) in enumerate(result):
+                if x_start <= r_x_end and r_x_start <= x_end and y_start <= r_y_end and r_y_start <= y_end:
+                    result[index] = (min(x_start, r_x_start), min(y_start, r_y_start), max(x_end, r_x_end),
+                                     max(y_end, r_y_end))
+                    merged = True
+                    break
+            else:
+                result.append((x_start, y_start, x_end, y_end))
+        bands = result
+    return bands
+
+
+def find_text_bands(binary_array) -> list or None:
+    """Finds the areas of a screenshot that may contain text.
+
+    Character edges are extracted from the binarized screenshot with a morphological gradient, so both dark text on
+    light background and light text on dark background are found. A horizontal closing then joins the characters of a
+    line into bands, which are kept if their height fits text.
+
+    The whole screenshot is used instead when an area is too tall for a band, since it may hold large text, when there
+    are more than Settings.ocr_text_band_max_count bands, since each band is a separate OCR call, or when the bands
+    cover most of the screenshot.
+
+    :param binary_array: Binarized screenshot, as returned by ScreenshotImage.binarize().
+    :return: List of Rectangle objects in screenshot coordinates, or None if the whole screenshot should be used.
+    """
+    height, width = binary_array.shape[:2]
+    edges = cv2.morphologyEx(binary_array, cv2.MORPH_GRADIENT, np.ones((3, 3), dtype=np.uint8))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, BAND_KERNEL_SIZE)
+    closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(closed)
+
+    bands = []
+    for x, y, w, h, area in stats[1:]:
+        if w < BAND_MIN_WIDTH or h < BAND_MIN_HEIGHT:
+            continue
+        if h > BAND_MAX_HEIGHT:
+            logger.debug('Text bands: found an area of %s pixels high, using the whole screenshot.' % h)
+            return None
+        bands.append((max(x - BAND_PADDING, 0), max(y - BAND_PADDING, 0), min(x + w + BAND_PADDING, width),
+                      min(y + h + BAND_PADDING, height)))
+    bands = _merge_bands(bands)
+
+    covered_area = sum((x_end - x_start) * (y_end - y_start) for x_start, y_start, x_end, y_end in bands)
+    if len(bands) == 0 or len(bands) > Settings.ocr_text_band_max_count or \
+            covered_area > Settings.ocr_text_band_max_coverage * width * height:
+        logger.debug('Text bands: %s bands covering %s of %s pixels, using the whole screenshot.'
+                     % (len(bands), covered_area, width * height))
+        return None
+
+    logger.debug('Text bands: %s bands covering %s of %s pixels.' % (len(bands), covered_area, width * height))
+    return [Rectangle(int(x_start), int(y_start), int(x_end - x_start), int(y_end - y_start))
+            for x_start, y_start, x_end, y_end in bands]
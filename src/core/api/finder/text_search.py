@@ -3,99 +3,107 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-import difflib
+import logging
+import time
 
-import pytesseract
 from PIL import ImageEnhance
 
+from src.core.api.finder.ocr_cache import get_image_hash, get_ocr_cache
+from src.core.api.finder.ocr_engine import get_ocr_engine
+from src.core.api.finder.text_bands import find_text_bands
+from src.core.api.finder.word_table import WordTable
 from src.core.api.rectangle import Rectangle
 from src.core.api.save_debug_image.save_image import save_debug_ocr_image
 from src.core.api.screen.display import DisplayCollection
 from src.core.api.screen.screenshot_image import ScreenshotImage
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
 
 TRY_RESIZE_IMAGES = 2
 OCR_RESULT_COLUMNS_COUNT = 12
-WORD_PROXIMITY = 5
-
-cutoffs = {'string': {'min_cutoff': 0.7, 'max_cutoff': 0.9, 'step': 0.1},
-           'digit': {'min_cutoff': 0.75, 'max_cutoff': 0.9, 'step': 0.05}}
-
-digit_chars = ['.', '%', ',']
-
-
-def _is_similar_result(result_list, x: int, y: int, pixels: int):
-    """Checks if current result is similar to previous results based on pixel proximity."""
-    if len(result_list) == 0:
-        return False
-
-    for result in result_list:
-        if (x - pixels <= result.x <= x + pixels) and (y - pixels <= result.y <= y + pixels):
-            return True
-    return False
-
-
-def _is_next_word(prev_word, x, y):
-    """Checks if previous - current word are located correctly."""
-    if (prev_word.x + prev_word.width + 10 >= x) and (y - 5 <= prev_word.y <= y + 5):
-        return True
-    return False
-
-
-def _replace_multiple(main_string, replace_string, replace_with_string):
-    """Replace a string with a list of substrings."""
-    for elem in replace_string:
-        if elem in main_string:
-            main_string = main_string.replace(elem, replace_with_string)
-
-    return main_string
-
-
-def _create_rectangle_from_ocr_data(data, scale):
-    """Generates a Rectangle object based on OCR processed data and image scale."""
-    x = int(int(data[6]) / (scale * (1 if scale - 1 == 0 else scale - 1)))
-    y = int(int(data[7]) / (scale * (1 if scale - 1 == 0 else scale - 1)))
-    width = int(int(data[8]) / (scale * (1 if scale - 1 == 0 else scale - 1)))
-    height = int(int(data[9]) / (scale * (1 if scale - 1 == 0 else scale - 1)))
-    return Rectangle(x, y, width, height)
-
-
-def _get_first_word(sentence_list, image_list):
-    """Finds all occurrences of the first searched word."""
-    first_word = sentence_list.split()[0]
-    cutoff_type = 'digit' if _replace_multiple(first_word, digit_chars, '').isdigit() else 'string'
-    words_found = []
-    for index_image, stack_image in enumerate(image_list):
-        for index_scale, scale in enumerate(range(1, TRY_RESIZE_IMAGES + 1)):
-            stack_image = stack_image.resize([stack_image.width * scale, stack_image.height * scale])
-            processed_data = pytesseract.image_to_data(stack_image)
-            for index_data, line in enumerate(processed_data.split('\n')[1:]):
-                d = line.split()
-                if len(d) == OCR_RESULT_COLUMNS_COUNT:
-                    cutoff = cutoffs[cutoff_type]['max_cutoff']
-                    while cutoff >= cutoffs[cutoff_type]['min_cutoff']:
-                        if difflib.get_close_matches(first_word, [d[11]], cutoff=cutoff):
-                            try:
-                                vd = _create_rectangle_from_ocr_data(d, scale)
-                                if not _is_similar_result(words_found, vd.x, vd.y, WORD_PROXIMITY):
-                                    words_found.append(vd)
-                            except ValueError:
-                                continue
-                        cutoff -= cutoffs[cutoff_type]['step']
-    return words_found
-
-
-def _assemble_results(result_list):
-    """Merge all Rectangle objects into one that contains them all."""
-    from operator import attrgetter
-    x = min(result_list, key=attrgetter('x')).x
-    y = min(result_list, key=attrgetter('y')).y
-
-    x_max = max(result_list, key=attrgetter('x')).x
-    width = max([x.width for x in result_list if x.x == x_max]) + x_max - x
-
-    y_max = max(result_list, key=attrgetter('y')).y
-    height = max([x.height for x in result_list if x.y == y_max]) + y_max - y
-    return Rectangle(x, y, width, height)
+PREPROCESS_TYPES = ['raw', 'contrast']
+
+
+def _preprocess(image, preprocess: str):
+    """Returns the image variant sent to OCR."""
+    if preprocess == 'contrast':
+        return ImageEnhance.Contrast(image).enhance(10.0)
+    return image
+
+
+def _parse_ocr_data(processed_data: str) -> list:
+    """Returns the OCR data rows, each one a list of OCR_RESULT_COLUMNS_COUNT strings."""
+    return [d for d in (line.split() for line in processed_data.split('\n')[1:]) if len(d) == OCR_RESULT_COLUMNS_COUNT]
+
+
+def _move_rows(rows: list, band: Rectangle, band_index: int, scale: int) -> list:
+    """Moves OCR data rows from band to screenshot coordinates, at the OCR scale.
+
+    Block numbers are prefixed with the band index, so lines of different bands are never mixed.
+    """
+    moved_rows = []
+    for d in rows:
+        try:
+            left = int(d[6]) + band.x * scale
+            top = int(d[7]) + band.y * scale
+        except ValueError:
+            continue
+        moved_rows.append(d[:2] + ['%s.%s' % (band_index, d[2])] + d[3:6] + [str(left), str(top)] + d[8:])
+    return moved_rows
+
+
+def _get_ocr_pages(img: ScreenshotImage) -> list:
+    """Returns the OCR rows of all the image variants and scales of a screenshot.
+
+    When Settings.ocr_text_bands is enabled, only the text bands of the screenshot are recognized. Each (image hash,
+    scale, preprocess) combination of a band is recognized once, the missing ones are sent together to the OCR engine
+    worker pool.
+
+    :return: List of (scale, rows) pairs.
+    """
+    image = img.get_gray_image()
+    gray_array = img.get_gray_array()
+    bands = find_text_bands(img.binarize()) if Settings.ocr_text_bands else None
+    if bands is None:
+        bands = [Rectangle(0, 0, gray_array.shape[1], gray_array.shape[0])]
+
+    page_keys = [(scale, preprocess) for preprocess in PREPROCESS_TYPES for scale in range(1, TRY_RESIZE_IMAGES + 1)]
+    band_rows = {}
+    missing = []
+    for band_index, band in enumerate(bands):
+        band_hash = get_image_hash(gray_array[band.y:band.y + band.height, band.x:band.x + band.width])
+        for scale, preprocess in page_keys:
+            key = (band_hash, scale, preprocess)
+            rows = get_ocr_cache().get(key)
+            if rows is None:
+                missing.append((band_index, scale, preprocess, key))
+            else:
+                band_rows[band_index, scale, preprocess] = rows
+
+    if len(missing) > 0:
+        stack_images = []
+        for band_index, scale, preprocess, key in missing:
+            band = bands[band_index]
+            stack_image = _preprocess(image.crop((band.x, band.y, band.x + band.width, band.y + band.height)),
+                                      preprocess)
+            stack_images.append(stack_image.resize([stack_image.width * scale, stack_image.height * scale]))
+        ocr_start = time.time()
+        results = get_ocr_engine().recognize_many(stack_images)
+        logger.debug('OCR of %s images from %s bands took %.3f seconds.'
+                     % (len(stack_images), len(bands), time.time() - ocr_start))
+        for (band_index, scale, preprocess, key), processed_data in zip(missing, results):
+            rows = _parse_ocr_data(processed_data)
+            get_ocr_cache().set(key, rows)
+            band_rows[band_index, scale, preprocess] = rows
+
+    pages = []
+    for scale, preprocess in page_keys:
+        rows = []
+        for band_index, band in enumerate(bands):
+            rows.extend(_move_rows(band_rows[band_index, scale, preprocess], band, band_index, scale))
+        pages.append((scale, rows))
+    return pages
 
 
 def _text_search(text, region: Rectangle = None, multiple_search=False):
@@ -104,63 +112,7 @@ def _text_search(text, region: Rectangle = None, multiple_search=False):
         region = DisplayCollection[0].bounds
 
     img = ScreenshotImage(region=region)
-    raw_gray_image = img.get_gray_image()
-    enhanced_image = ImageEnhance.Contrast(img.get_gray_image()).enhance(10.0)
-    stack_images = [raw_gray_image, enhanced_image]
-    first_word_occurrences = _get_first_word(text, stack_images)
-
-    word_count = len(text.split())
-
-    if not multiple_search:
-        if len(first_word_occurrences) == 0:
-            first_word = []
-        else:
-            first_word = [first_word_occurrences[0]]
-    else:
-        first_word = first_word_occurrences
-
-    if word_count == 1:
-        save_debug_ocr_image(text, img, first_word)
-        for result in first_word:
-            result.x += region.x
-            result.y += region.y
-        return first_word
-
-    sentence = []
-    for data in first_word:
-        sentence.append([data])
-
-    for index, word in enumerate(first_word):
-        for index_word, word_to_search in enumerate(text.split()[1:]):
-            found = False
-            cutoff_type = 'digit' if _replace_multiple(word_to_search, digit_chars, '').isdigit() else 'string'
-            for index_image, stack_image in enumerate(stack_images):
-                if not found:
-                    for index_scale, scale in enumerate(range(1, TRY_RESIZE_IMAGES + 1)):
-                        if not found:
-                            stack_image = stack_image.resize([stack_image.width * scale, stack_image.height * scale])
-                            processed_data = pytesseract.image_to_data(stack_image)
-                            for index_data, line in enumerate(processed_data.split('\n')[1:]):
-                                if not found:
-                                    d = line.split()
-                                    if len(d) == OCR_RESULT_COLUMNS_COUNT:
-                                        cutoff = cutoffs[cutoff_type]['max_cutoff']
-                                        while cutoff >= cutoffs[cutoff_type]['min_cutoff'] and not found:
-
-                                            if difflib.get_close_matches(word_to_search, [d[11]], cutoff=cutoff):
-                                                try:
-                                                    vd = _create_rectangle_from_ocr_data(d, scale)
-                                                    if _is_next_word(sentence[index][-1], vd.x, vd.y):
-                                                        sentence[index].append(vd)
-                                                        found = True
-                                                except ValueError:
-                                                    continue
-                                            cutoff -= cutoffs[cutoff_type]['step']
-
-    final_result = []
-    for words in sentence:
-        if len(words) == word_count:
-            final_result.append(_assemble_results(words))
+    final_result = WordTable(_get_ocr_pages(img)).find_phrase(text, multiple_search)
 
     save_debug_ocr_image(text, img, final_result)
 
@@ -0,0 +1,214 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import functools
+import math
+
+import numpy as np
+
+from src.core.api.rectangle import Rectangle
+
+WORD_PROXIMITY = 5
+NEXT_WORD_MAX_GAP = 10
+NEXT_WORD_MAX_Y_OFFSET = 5
+
+cutoffs = {'string': {'min_cutoff': 0.7, 'max_cutoff': 0.9, 'step': 0.1},
+           'digit': {'min_cutoff': 0.75, 'max_cutoff': 0.9, 'step': 0.05}}
+
+digit_chars = ['.', '%', ',']
+
+
+def _replace_multiple(main_string, replace_string, replace_with_string):
+    """Replace a string with a list of substrings."""
+    for elem in replace_string:
+        if elem in main_string:
+            main_string = main_string.replace(elem, replace_with_string)
+
+    return main_string
+
+
+@functools.lru_cache(maxsize=None)
+def _get_min_cutoff(cutoff_type: str) -> float:
+    """Returns the lowest cutoff reached by decreasing max_cutoff by step, as long as it stays above min_cutoff."""
+    cutoff = cutoffs[cutoff_type]['max_cutoff']
+    min_cutoff = cutoff
+    while cutoff >= cutoffs[cutoff_type]['min_cutoff']:
+        min_cutoff = cutoff
+        cutoff -= cutoffs[cutoff_type]['step']
+    return min_cutoff
+
+
+def get_word_cutoff(word: str) -> float:
+    """Returns the minimum similarity of an OCR word to the searched word."""
+    cutoff_type = 'digit' if _replace_multiple(word, digit_chars, '').isdigit() else 'string'
+    return _get_min_cutoff(cutoff_type)
+
+
+def _has_common_subsequence(first: str, second: str, min_length: int) -> bool:
+    """Checks if two strings have a common subsequence of at least min_length characters.
+
+    The longest common subsequence is computed with the bit-parallel algorithm of Hyyro, one integer operation per
+    character of second, and the computation stops as soon as the remaining characters can't reach min_length.
+    """
+    length = len(first)
+    masks = {}
+    for index, char in enumerate(first):
+        masks[char] = masks.get(char, 0) | 1 << index
+    all_bits = (1 << length) - 1
+    row = all_bits
+    for index, char in enumerate(second):
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & all_bits
+        if length - bin(row).count('1') + len(second) - index - 1 < min_length:
+            return False
+    return length - bin(row).count('1') >= min_length
+
+
+@functools.lru_cache(maxsize=4096)
+def is_similar(word: str, candidate: str, cutoff: float) -> bool:
+    """Checks if an OCR word is close enough to the searched word.
+
+    The similarity is 2 * M / T, where T is the total number of characters of both words, like difflib ratio, but M is
+    the length of their longest common subsequence instead of the characters of the difflib matching blocks. Both agree
+    on OCR errors, except when the difflib blocks miss a common subsequence and reject a close word. Words whose
+    lengths are too different are rejected without comparing them, and results are cached since the same words come
+    back in every OCR pass.
+    """
+    total_length = len(word) + len(candidate)
+    if total_length == 0:
+        return True
+    if 2.0 * min(len(word), len(candidate)) / total_length < cutoff:
+        return False
+    # Smallest common subsequence length with 2 * M / T >= cutoff, compared in floats like the ratio.
+    min_length = max(math.floor(cutoff * total_length / 2.0), 0)
+    while 2.0 * min_length / total_length < cutoff:
+        min_length += 1
+    while min_length > 0 and 2.0 * (min_length - 1) / total_length >= cutoff:
+        min_length -= 1
+    return _has_common_subsequence(candidate, word, min_length)
+
+
+def _assemble_results(result_list):
+    """Merge all Rectangle objects into one that contains them all."""
+    from operator import attrgetter
+    x = min(result_list, key=attrgetter('x')).x
+    y = min(result_list, key=attrgetter('y')).y
+
+    x_max = max(result_list, key=attrgetter('x')).x
+    width = max([x.width for x in result_list if x.x == x_max]) + x_max - x
+
+    y_max = max(result_list, key=attrgetter('y')).y
+    height = max([x.height for x in result_list if x.y == y_max]) + y_max - y
+    return Rectangle(x, y, width, height)
+
+
+class WordTable:
+    """OCR words of all the passes over a screenshot, stored in arrays.
+
+    Word boxes are converted to screenshot coordinates. Words are indexed by OCR line, to get the next word of a line
+    directly, and by vertical position, to find the words on the same row in other OCR passes.
+    """
+
+    def __init__(self, pages: list):
+        """
+        :param pages: List of (scale, rows) pairs, where rows are the OCR data rows of an image variant.
+        """
+        texts = []
+        boxes = []
+        line_keys = []
+        for page_index, (scale, rows) in enumerate(pages):
+            factor = scale * (1 if scale - 1 == 0 else scale - 1)
+            for d in rows:
+                try:
+                    boxes.append([int(int(value) / factor) for value in d[6:10]])
+                except ValueError:
+                    continue
+                texts.append(d[11])
+                line_keys.append((page_index, d[2], d[3], d[4]))
+
+        boxes = np.array(boxes, dtype=np.int32).reshape(-1, 4)
+        self.x = boxes[:, 0]
+        self.y = boxes[:, 1]
+        self.width = boxes[:, 2]
+        self.height = boxes[:, 3]
+        self.unique_texts, self._text_index = np.unique(np.array(texts, dtype=str), return_inverse=True)
+
+        self._next_in_line = np.full(len(texts), -1, dtype=np.int64)
+        lines = {}
+        for index, key in enumerate(line_keys):
+            lines.setdefault(key, []).append(index)
+        for indices in lines.values():
+            indices.sort(key=lambda i: self.x[i])
+            for current, following in zip(indices, indices[1:]):
+                self._next_in_line[current] = following
+
+        self._y_order = np.argsort(self.y, kind='stable')
+        self._sorted_y = self.y[self._y_order]
+
+    def __len__(self):
+        return len(self.x)
+
+    def get_rectangle(self, index: int) -> Rectangle:
+        return Rectangle(int(self.x[index]), int(self.y[index]), int(self.width[index]), int(self.height[index]))
+
+    def match(self, word: str):
+        """Returns a boolean array marking the words similar to the searched word."""
+        cutoff = get_word_cutoff(word)
+        unique_mask = np.array([is_similar(word, text, cutoff) for text in self.unique_texts], dtype=bool)
+        return unique_mask[self._text_index] if len(self.unique_texts) > 0 else np.zeros(0, dtype=bool)
+
+    def find_word(self, word: str) -> list:
+        """Returns the indices of the occurrences of a word, without the duplicates found by several OCR passes."""
+        found = []
+        for index in np.flatnonzero(self.match(word)):
+            if not any(abs(self.x[index] - self.x[other]) <= WORD_PROXIMITY and
+                       abs(self.y[index] - self.y[other]) <= WORD_PROXIMITY for other in found):
+                found.append(index)
+        return found
+
+    def _find_next_word(self, index: int, mask) -> int or None:
+        """Returns the closest word to the right of a word, on the same row, among the words selected by mask."""
+        x_start = self.x[index]
+        x_end = self.x[index] + self.width[index] + NEXT_WORD_MAX_GAP
+        following = self._next_in_line[index]
+        if following >= 0 and mask[following] and x_start < self.x[following] <= x_end and \
+                abs(int(self.y[following]) - int(self.y[index])) <= NEXT_WORD_MAX_Y_OFFSET:
+            return following
+
+        low = np.searchsorted(self._sorted_y, self.y[index] - NEXT_WORD_MAX_Y_OFFSET, side='left')
+        high = np.searchsorted(self._sorted_y, self.y[index] + NEXT_WORD_MAX_Y_OFFSET, side='right')
+        candidates = self._y_order[low:high]
+        candidates = candidates[mask[candidates] & (self.x[candidates] > x_start) & (self.x[candidates] <= x_end)]
+        if len(candidates) == 0:
+            return None
+        return int(candidates[np.argmin(self.x[candidates])])
+
+    def find_phrase(self, text: str, multiple: bool = False) -> list:
+        """Finds the occurrences of a phrase.
+
+        :param text: Searched words, separated by spaces.
+        :param multiple: If False, only the first occurrence of the first word is used.
+        :return: List of Rectangle objects, one for each occurrence of the phrase.
+        """
+        words = text.split()
+        if len(words) == 0 or len(self) == 0:
+            return []
+
+        starts = self.find_word(words[0])
+        if not multiple:
+            starts = starts[:1]
+        masks = [self.match(word) for word in words[1:]]
+
+        results = []
+        for start in starts:
+            indices = [start]
+            for mask in masks:
+                following = self._find_next_word(indices[-1], mask)
+                if following is None:
+                    break
+                indices.append(following)
+            if len(indices) == len(words):
+                results.append(_assemble_results([self.get_rectangle(index) for index in indices]))
+        return results
@@ -0,0 +1,136 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from src.core.api.enums import DebugImagePolicy
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class DebugImageWriter(threading.Thread):
+    """Background thread saving debug images.
+
+    Images are sampled according to Settings.debug_image_policy and queued in a bounded queue. When the queue is full,
+    new images are dropped instead of blocking the search.
+
+    With DebugImagePolicy.LAST_PER_WAIT, images submitted while a wait operation is running only replace the pending
+    image of their needle, and the pending images are queued when the outermost wait operation ends.
+    """
+
+    def __init__(self, queue_size: int):
+        threading.Thread.__init__(self, name='DebugImageWriter', daemon=True)
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self._lock = threading.Lock()
+        self._wait_depth = 0
+        self._pending = {}
+
+    def run(self):
+        while True:
+            write, args = self.queue.get()
+            try:
+                write(*args)
+                self.written += 1
+            except Exception as e:
+                logger.debug('Unable to save debug image: %s' % e)
+            finally:
+                self.queue.task_done()
+
+    def submit(self, needle, found: bool, write, *args):
+        """Samples a debug image and queues it for writing.
+
+        :param needle: Searched pattern or text, used to keep the last image per needle during wait operations.
+        :param found: True if the needle was found.
+        :param write: Function saving the image, called in the writer thread with args.
+        :return: None.
+        """
+        policy = Settings.debug_image_policy
+        with self._lock:
+            self.submitted += 1
+            if policy == DebugImagePolicy.NONE or (policy == DebugImagePolicy.FAILURES and found) or \
+                    (policy == DebugImagePolicy.EVERY_NTH and
+                     (self.submitted - 1) % max(Settings.debug_image_interval, 1) != 0):
+                self.sampled_out += 1
+                return
+            if policy == DebugImagePolicy.LAST_PER_WAIT and self._wait_depth > 0:
+                if needle in self._pending:
+                    self.sampled_out += 1
+                self._pending[needle] = (write, args)
+                return
+        self._enqueue(write, args)
+
+    def begin_wait(self):
+        with self._lock:
+            self._wait_depth += 1
+
+    def end_wait(self):
+        with self._lock:
+            self._wait_depth = max(self._wait_depth - 1, 0)
+            if self._wait_depth > 0:
+                return
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for write, args in pending:
+            self._enqueue(write, args)
+
+    def flush(self):
+        """Blocks until all the queued images are saved."""
+        self.queue.join()
+
+    def log_stats(self):
+        logger.debug('Debug images: %s submitted, %s written, %s sampled out, %s dropped.'
+                     % (self.submitted, self.written, self.sampled_out, self.dropped))
+
+    def _enqueue(self, write, args):
+        try:
+            self.queue.put_nowait((write, args))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+def get_debug_image_writer() -> DebugImageWriter:
+    """Returns the debug image writer, starting it on first call."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DebugImageWriter(Settings.debug_image_queue_size)
+            _writer.start()
+    return _writer
+
+
+def wait_for_debug_images():
+    """Waits for the queued debug images to be saved."""
+    if _writer is not None:
+        _writer.flush()
+
+
+def flush_debug_images():
+    """Waits for the queued debug images to be saved and logs the writer statistics."""
+    if _writer is not None:
+        _writer.flush()
+        _writer.log_stats()
+
+
+@contextmanager
+def debug_image_wait():
+    """Marks a wait operation, for the DebugImagePolicy.LAST_PER_WAIT policy."""
+    writer = get_debug_image_writer()
+    writer.begin_wait()
+    try:
+        yield
+    finally:
+        writer.end_wait()
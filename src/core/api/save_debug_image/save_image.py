@@ -3,6 +3,7 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import copy
 import datetime
 import logging
 import os
@@ -11,6 +12,8 @@ import re
 import cv2
 import numpy as np
 
+from src.core.api.save_debug_image.debug_image_writer import get_debug_image_writer
+from src.core.util.arg_parser import parse_args
 from src.core.util.path_manager import PathManager
 
 try:
@@ -24,32 +27,65 @@ logger = logging.getLogger(__name__)
 def save_debug_image(needle, haystack, locations):
     """Saves input Image for debug.
 
+    With --image_debug, every image is saved right away. Otherwise the image is sampled and saved in the background
+    according to Settings.debug_image_policy.
+
     :param Image || None needle: Input needle image that needs to be highlighted.
     :param haystack: Input Region as Image.
     :param List[Location] || Location locations: Location or list of Location as coordinates.
     :return: None.
     """
+    _save(_write_debug_image, needle, haystack, locations)
 
-    w, h = needle.get_size()
 
+def save_debug_ocr_image(text, haystack, text_occurrences):
+    """Saves input Image for debug.
+
+    With --image_debug, every image is saved right away. Otherwise the image is sampled and saved in the background
+    according to Settings.debug_image_policy.
+
+    :param text: Input text that needs to be highlighted.
+    :param haystack: Input Region as Image.
+    :param List[Location] || Location text_occurrences: Location or list of Location as coordinates.
+    :return: None.
+    """
+    _save(_write_debug_ocr_image, text, haystack, text_occurrences)
+
+
+def _save(write, needle, haystack, locations):
+    found = locations is not None and len(locations) > 0
+    file_name = _get_file_name(found)
+    if parse_args().image_debug:
+        write(file_name, needle, haystack, locations)
+    else:
+        # The search results and the screenshot may change before the writer thread saves them.
+        locations = [copy.copy(location) for location in locations] if locations else []
+        get_debug_image_writer().submit(needle, found, write, file_name, needle, haystack, locations)
+
+
+def _get_file_name(found: bool) -> str:
     path = PathManager.get_debug_image_directory()
 
     timestamp_str = re.sub('[ :.-]', '_', str(datetime.datetime.now()))
-    resolution_str = '_not_found' if len(locations) == 0 else '_found'
+    resolution_str = '_found' if found else '_not_found'
 
     temp_f = timestamp_str + resolution_str
 
-    file_name = '%s.jpg' % os.path.join(path, temp_f)
+    return '%s.jpg' % os.path.join(path, temp_f)
+
+
+def _write_debug_image(file_name, needle, haystack, locations):
+    w, h = needle.get_size()
 
-    if not os.path.exists(path):
-        os.makedirs(path)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
 
     not_found_txt = ' <<< Pattern not found!'
 
     if len(locations) > 0:
+        d_array = haystack.get_gray_array().copy()
         for loc in locations:
-            cv2.rectangle(haystack.get_gray_array(), (loc.x, loc.y), (loc.x + w, loc.y + h), (0, 0, 255), 2)
-        cv2.imwrite(file_name, haystack.get_gray_array(), [int(cv2.IMWRITE_JPEG_QUALITY), 50])
+            cv2.rectangle(d_array, (loc.x, loc.y), (loc.x + w, loc.y + h), (0, 0, 255), 2)
+        cv2.imwrite(file_name, d_array, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
     else:
         gray_img = haystack.get_gray_image()
         search_for_image = needle.get_color_image()
@@ -64,35 +100,19 @@ def save_debug_image(needle, haystack, locations):
         cv2.imwrite(file_name, d_array, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
 
 
-def save_debug_ocr_image(text, haystack, text_occurrences):
-    """Saves input Image for debug.
-
-    :param text: Input text that needs to be highlighted.
-    :param haystack: Input Region as Image.
-    :param List[Location] || Location text_occurrences: Location or list of Location as coordinates.
-    :return: None.
-    """
-    path = PathManager.get_debug_image_directory()
-
-    timestamp_str = re.sub('[ :.-]', '_', str(datetime.datetime.now()))
-    resolution_str = '_not_found' if len(text_occurrences) == 0 else '_found'
-
-    temp_f = timestamp_str + resolution_str
-
-    file_name = '%s.jpg' % os.path.join(path, temp_f)
-
-    if not os.path.exists(path):
-        os.makedirs(path)
+def _write_debug_ocr_image(file_name, text, haystack, text_occurrences):
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
 
     not_found_txt = ' \'{}\' not found!'.format(text)
 
     if text_occurrences and len(text_occurrences) > 0:
+        d_array = haystack.get_gray_array().copy()
         for occurrence in text_occurrences:
-            cv2.rectangle(haystack.get_gray_array(),
+            cv2.rectangle(d_array,
                           (occurrence.x, occurrence.y),
                           (occurrence.x + occurrence.width, occurrence.y + occurrence.height),
                           (0, 0, 255), 2)
-        cv2.imwrite(file_name, haystack.get_gray_array(), [int(cv2.IMWRITE_JPEG_QUALITY), 50])
+        cv2.imwrite(file_name, d_array, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
     else:
         gray_img = haystack.get_gray_image()
         v_align_pos = int(gray_img.size[1] / 2 - 20 / 2)
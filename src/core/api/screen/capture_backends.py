@@ -0,0 +1,155 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import mss
+import numpy as np
+
+from src.core.api.rectangle import Rectangle
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+SELECTION_REGION_SIZE = 200
+SELECTION_REPEAT = 5
+_selected_backend = None
+_selection_lock = threading.Lock()
+
+
+class CaptureBackend(ABC):
+    """Base class of the screen capture backends. Backends return the gray array of a screen region."""
+
+    name = None
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @abstractmethod
+    def grab(self, region: Rectangle):
+        """Captures a region of the screen.
+
+        :param Rectangle region: Region in screen coordinates.
+        :return: Gray array of the region.
+        """
+
+    def is_available(self) -> bool:
+        """Checks if the backend can capture the screen."""
+        try:
+            gray_array = self.grab(Rectangle(0, 0, 1, 1))
+            return gray_array is not None and gray_array.size > 0
+        except Exception as e:
+            logger.debug('Capture backend %s is not available: %s' % (self.name, e))
+            return False
+
+
+class MssBackend(CaptureBackend):
+    """Captures the screen with mss, straight into a numpy buffer."""
+
+    name = 'mss'
+
+    def grab(self, region: Rectangle):
+        # mss instances can't be shared between threads.
+        if not hasattr(self._local, 'sct'):
+            self._local.sct = mss.mss()
+        grabbed = self._local.sct.grab({'top': int(region.y), 'left': int(region.x),
+                                        'width': int(region.width), 'height': int(region.height)})
+        bgra = np.frombuffer(grabbed.raw, dtype=np.uint8).reshape(grabbed.height, grabbed.width, 4)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+
+
+class XlibBackend(CaptureBackend):
+    """Captures the screen with python-xlib, reading the root window pixels into a numpy buffer.
+
+    Pixels are read with a plain XGetImage request and copied over the X connection, since python-xlib has no support
+    for the MIT-SHM extension. This is a fallback for when mss can't capture the screen, not a shared memory backend.
+    """
+
+    name = 'xlib'
+
+    def grab(self, region: Rectangle):
+        from Xlib import X
+        from Xlib.display import Display
+
+        if not hasattr(self._local, 'root'):
+            self._local.root = Display(os.environ['DISPLAY']).screen().root
+        width = int(region.width)
+        height = int(region.height)
+        image = self._local.root.get_image(int(region.x), int(region.y), width, height, X.ZPixmap, 0xffffffff)
+        data = np.frombuffer(image.data, dtype=np.uint8)
+        bgra = data.reshape(height, len(data) // (height * 4), 4)[:, :width]
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """Captures the screen with pyautogui, which saves and decodes an image file on Linux."""
+
+    name = 'pyautogui'
+
+    def grab(self, region: Rectangle):
+        from pyautogui import screenshot
+
+        rgb = np.array(screenshot(region=(region.x, region.y, region.width, region.height)))
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+
+BACKENDS = {backend.name: backend for backend in (MssBackend, XlibBackend, PyAutoGuiBackend)}
+
+
+def time_backend(backend: CaptureBackend, region: Rectangle, repeat: int) -> float:
+    """Returns the best capture duration of a backend, in milliseconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.grab(region)
+        duration = (time.perf_counter() - start) * 1000
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def _select_backend() -> CaptureBackend:
+    """Returns the fastest working backend, or the one named in Settings.capture_backend."""
+    if Settings.capture_backend is not None:
+        if Settings.capture_backend in BACKENDS:
+            backend = BACKENDS[Settings.capture_backend]()
+            if backend.is_available():
+                return backend
+            logger.warning('Capture backend %s is not available.' % Settings.capture_backend)
+        else:
+            logger.warning('Unknown capture backend: %s. Available backends: %s'
+                           % (Settings.capture_backend, ', '.join(BACKENDS)))
+
+    region = Rectangle(0, 0, SELECTION_REGION_SIZE, SELECTION_REGION_SIZE)
+    timings = []
+    for backend_class in BACKENDS.values():
+        backend = backend_class()
+        if backend.is_available():
+            try:
+                timings.append((time_backend(backend, region, SELECTION_REPEAT), backend))
+            except Exception as e:
+                logger.debug('Capture backend %s failed: %s' % (backend.name, e))
+
+    if len(timings) == 0:
+        logger.warning('No working capture backend found, using %s.' % MssBackend.name)
+        return MssBackend()
+
+    duration, backend = min(timings, key=lambda timing: timing[0])
+    logger.debug('Selected capture backend: %s (%s)'
+                 % (backend.name, ', '.join('%s %.2f ms' % (b.name, d) for d, b in timings)))
+    return backend
+
+
+def get_capture_backend() -> CaptureBackend:
+    """Returns the capture backend, selecting it on first call."""
+    global _selected_backend
+    with _selection_lock:
+        if _selected_backend is None:
+            _selected_backend = _select_backend()
+    return _selected_backend
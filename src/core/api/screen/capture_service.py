@@ -0,0 +1,189 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+
+import cv2
+import mss
+import numpy as np
+
+from src.core.api.rectangle import Rectangle
+from src.core.api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+MAX_FRAME_AGE_FACTOR = 2
+_capture_service = None
+_service_lock = threading.Lock()
+
+
+class _FrameBuffer(np.ndarray):
+    """Type of the frame buffers.
+
+    numpy makes the base of a view the array that owns the memory, skipping the views in between, but only through
+    arrays of the same type. Views of a frame buffer region therefore keep the region view returned by get_frame as
+    their base, and the buffer stays pinned until that view and all the views made from it are gone.
+    """
+
+
+class CaptureService(threading.Thread):
+    """Background thread grabbing the whole virtual display into a ring of preallocated gray buffers.
+
+    The latest complete frame is published after each grab, and the next grab is written to a buffer that is neither
+    the latest frame nor pinned. Regions of the latest frame are returned as read-only views of its buffer, which stays
+    pinned while any view of it is alive. Callers keeping a frame for long should copy it, so the ring is not starved.
+    """
+
+    def __init__(self, fps: int, buffers: int):
+        threading.Thread.__init__(self, name='CaptureService', daemon=True)
+        self.fps = max(fps, 1)
+        self.buffers = []
+        self.buffer_count = max(buffers, 2)
+        self.bounds = None
+        self.frames = 0
+        self._latest = None
+        self._timestamp = 0
+        self._pinned = Counter()
+        # Views can be released by the garbage collector while the lock is held by the same thread.
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+
+    def run(self):
+        # mss instances can't be shared between threads.
+        with mss.mss() as sct:
+            monitor = sct.monitors[0]
+            self.bounds = Rectangle(monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+            while not self._stop_event.is_set():
+                start = time.time()
+                try:
+                    grab = sct.grab(monitor)
+                except Exception as e:
+                    logger.warning('Capture service screenshot failed: %s' % e)
+                    self._stop_event.wait(1.0 / self.fps)
+                    continue
+
+                with self._lock:
+                    index = self._get_free_buffer()
+                if index is not None:
+                    bgra = np.frombuffer(grab.raw, dtype=np.uint8).reshape(grab.height, grab.width, 4)
+                    if len(self.buffers) == 0:
+                        self.buffers = [_new_buffer(grab.height, grab.width) for _ in range(self.buffer_count)]
+                    elif self.buffers[index].shape != (grab.height, grab.width):
+                        self.buffers[index] = _new_buffer(grab.height, grab.width)
+                    cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=self.buffers[index])
+                    with self._lock:
+                        self._latest = index
+                        self._timestamp = time.time()
+                    self.frames += 1
+                    self._ready.set()
+                self._stop_event.wait(max(1.0 / self.fps - (time.time() - start), 0))
+
+    def _get_free_buffer(self) -> int or None:
+        """Returns the index of a buffer that is neither the latest frame nor pinned, or None if there is none.
+
+        Must be called with the lock held.
+        """
+        for index in range(self.buffer_count):
+            if index != self._latest and self._pinned[index] == 0:
+                return index
+        return None
+
+    def _unpin(self, index: int):
+        with self._lock:
+            self._pinned[index] -= 1
+
+    def stop(self):
+        self._stop_event.set()
+
+    def wait_ready(self, timeout: float = 1) -> bool:
+        return self._ready.wait(timeout)
+
+    def get_frame(self, region: Rectangle):
+        """Returns a read-only view of a region of the latest frame.
+
+        The frame buffer is pinned until the view and all the views made from it are garbage collected, so the capture
+        thread never writes to it while it is read.
+
+        :param Rectangle region: Region in screen coordinates.
+        :return: (gray array, timestamp) pair, or None if no fresh frame covers the region.
+        """
+        with self._lock:
+            if self._latest is None:
+                return None
+            index = self._latest
+            timestamp = self._timestamp
+            self._pinned[index] += 1
+
+        view = None
+        try:
+            if time.time() - timestamp > MAX_FRAME_AGE_FACTOR / self.fps:
+                return None
+
+            frame = self.buffers[index]
+            x = int(region.x - self.bounds.x)
+            y = int(region.y - self.bounds.y)
+            width = int(region.width)
+            height = int(region.height)
+            if x < 0 or y < 0 or width <= 0 or height <= 0 or x + width > frame.shape[1] or \
+                    y + height > frame.shape[0]:
+                return None
+            view = frame[y:y + height, x:x + width].view(np.ndarray)
+            view.flags.writeable = False
+            weakref.finalize(view, self._unpin, index)
+            return view, timestamp
+        finally:
+            if view is None:
+                self._unpin(index)
+
+
+def _new_buffer(height: int, width: int) -> _FrameBuffer:
+    return np.empty((height, width), dtype=np.uint8).view(_FrameBuffer)
+
+
+def start_capture_service(fps: int = None, buffers: int = None) -> CaptureService:
+    """Starts the capture service, if it is not already running.
+
+    :param fps: Number of captures per second. By default Settings.capture_fps.
+    :param buffers: Number of frame buffers. By default Settings.capture_buffers.
+    :return: CaptureService object.
+    """
+    global _capture_service
+    with _service_lock:
+        if _capture_service is None or not _capture_service.is_alive():
+            _capture_service = CaptureService(fps or Settings.capture_fps, buffers or Settings.capture_buffers)
+            _capture_service.start()
+            if not _capture_service.wait_ready():
+                logger.warning('Capture service did not deliver a frame in time.')
+            else:
+                logger.debug('Capture service started: %s fps, %s buffers, bounds %s.'
+                             % (_capture_service.fps, _capture_service.buffer_count, _capture_service.bounds))
+    return _capture_service
+
+
+def stop_capture_service():
+    """Stops the capture service."""
+    global _capture_service
+    with _service_lock:
+        if _capture_service is not None:
+            _capture_service.stop()
+            _capture_service.join()
+            logger.debug('Capture service stopped after %s frames.' % _capture_service.frames)
+            _capture_service = None
+
+
+def get_service_frame(region: Rectangle):
+    """Returns a read-only view of a region of the latest captured frame, when the capture service is enabled.
+
+    :param Rectangle region: Region in screen coordinates.
+    :return: (gray array, timestamp) pair, or None if the service is disabled or has no fresh frame for the region.
+    """
+    if not Settings.capture_service:
+        return None
+    return start_capture_service().get_frame(region)
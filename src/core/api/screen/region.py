@@ -3,11 +3,16 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+from src.core.api.enums import ObserveEventType
 from src.core.api.errors import FindError
-from src.core.api.finder.finder import wait, find, find_all, exists, highlight, wait_vanish
+from src.core.api.finder.finder import wait, find, find_all, find_many, exists, exists_all, exists_any, highlight, \
+    wait_vanish
+from src.core.api.finder.observer import ObserveHandler, start_observing, stop_observing, wait_for_handlers
+from src.core.api.finder.pattern import Pattern
 from src.core.api.location import Location
 from src.core.api.mouse.mouse import move, press, release, click, right_click, double_click, drag_drop
 from src.core.api.rectangle import Rectangle
+from src.core.api.settings import Settings
 
 
 class Region:
@@ -29,6 +34,7 @@ class Region:
         self.y = y_start
         self.width = width
         self.height = height
+        self._observer_handlers = []
 
     def __repr__(self):
         return '%s(%r, %r, %r, %r)' % (self.__class__.__name__, self.x, self.y, self.width, self.height)
@@ -155,6 +161,100 @@ class Region:
         """
         return exists(ps, timeout, self._area)
 
+    def find_many(self, patterns=None, parallel=False):
+        """Look for a single match of several Patterns, using a single screen capture.
+
+        :param patterns: List of Patterns.
+        :param parallel: If True, patterns are matched in a thread pool.
+        :return: Call the find_many() method.
+        """
+        return find_many(patterns, self._area, parallel)
+
+    def exists_any(self, patterns=None, timeout=None, parallel=False):
+        """Check if at least one of several Patterns exists.
+
+        :param patterns: List of Patterns.
+        :param timeout: Number as maximum waiting time in seconds.
+        :param parallel: If True, patterns are matched in a thread pool.
+        :return: Call the exists_any() method.
+        """
+        return exists_any(patterns, timeout, self._area, parallel)
+
+    def exists_all(self, patterns=None, timeout=None, parallel=False):
+        """Check if all of several Patterns exist.
+
+        :param patterns: List of Patterns.
+        :param timeout: Number as maximum waiting time in seconds.
+        :param parallel: If True, patterns are matched in a thread pool.
+        :return: Call the exists_all() method.
+        """
+        return exists_all(patterns, timeout, self._area, parallel)
+
+    def on_appear(self, ps=None, handler=None):
+        """Register a callback called when a Pattern appears in the region.
+
+        :param ps: Pattern.
+        :param handler: Function called with an ObserveEvent object.
+        :return: ObserveHandler object.
+        """
+        return self._add_observer(ObserveHandler(ObserveEventType.APPEAR, self._area, handler, pattern=ps))
+
+    def on_vanish(self, ps=None, handler=None):
+        """Register a callback called when a Pattern vanishes from the region.
+
+        :param ps: Pattern.
+        :param handler: Function called with an ObserveEvent object.
+        :return: ObserveHandler object.
+        """
+        return self._add_observer(ObserveHandler(ObserveEventType.VANISH, self._area, handler, pattern=ps))
+
+    def on_change(self, handler=None, min_changed_pixels=None):
+        """Register a callback called when the content of the region changes.
+
+        :param handler: Function called with an ObserveEvent object.
+        :param min_changed_pixels: Minimum number of changed pixels. By default Settings.observe_min_changed_pixels.
+        :return: ObserveHandler object.
+        """
+        return self._add_observer(ObserveHandler(ObserveEventType.CHANGE, self._area, handler,
+                                                 min_changed_pixels=min_changed_pixels))
+
+    def observe(self, timeout=None, background=False) -> bool:
+        """Start observing the region with the registered callbacks.
+
+        All the observed regions share a single background capture thread, scanning Settings.observe_scan_rate times
+        per second.
+
+        :param timeout: Maximum observing time in seconds. By default Settings.auto_wait_timeout.
+        :param background: If True, return immediately and keep observing until stop_observer() is called.
+        :return: True if all the callbacks were called, False otherwise.
+        """
+        if timeout is None:
+            timeout = Settings.auto_wait_timeout
+        for handler in self._observer_handlers:
+            start_observing(handler)
+        if background:
+            return True
+        try:
+            return wait_for_handlers(self._observer_handlers, timeout)
+        finally:
+            self.stop_observer()
+
+    def stop_observer(self):
+        """Stop observing the region.
+
+        :return: None.
+        """
+        for handler in self._observer_handlers:
+            stop_observing(handler)
+
+    def _add_observer(self, handler):
+        if not callable(handler.callback):
+            raise ValueError('Invalid observer callback: %s' % handler.callback)
+        if handler.type != ObserveEventType.CHANGE and not isinstance(handler.pattern, Pattern):
+            raise ValueError('Invalid pattern: %s' % handler.pattern)
+        self._observer_handlers.append(handler)
+        return handler
+
     def highlight(self, duration=None, color=None):
         """Region highlight.
 
@@ -7,11 +7,12 @@ import cv2
 import mss
 import numpy as np
 import logging
-
-from pyautogui import screenshot
+import time
 
 from src.core.api.errors import ScreenshotError
 from src.core.api.os_helpers import OSHelper
+from src.core.api.screen.capture_backends import get_capture_backend
+from src.core.api.screen.capture_service import get_service_frame
 from src.core.api.screen.display import DisplayCollection
 from src.core.api.rectangle import Rectangle
 
@@ -25,7 +26,11 @@ _mss = mss.mss()
 
 
 class ScreenshotImage:
-    """This class represents the visual representation of a region/screen."""
+    """This class represents the visual representation of a region/screen.
+
+    When the capture service is enabled, the gray array is a read-only view of a region of its latest frame, and
+    timestamp is the capture time of that frame.
+    """
 
     def __init__(self, region: Rectangle = None, screen_id: int = None):
         if screen_id is None:
@@ -34,19 +39,24 @@ class ScreenshotImage:
         if region is None:
             region = DisplayCollection[screen_id].bounds
 
-        if OSHelper.is_linux():
-            screen_region = region
-        else:
-            screen_region = {'top': int(region.y), 'left': int(region.x),
-                             'width': int(region.width), 'height': int(region.height)}
+        scale = DisplayCollection[screen_id].scale
 
-        self._gray_array = _region_to_image(screen_region)
+        frame = get_service_frame(region) if scale == 1 else None
+        if frame is not None:
+            self._gray_array, self.timestamp = frame
+        else:
+            if OSHelper.is_linux():
+                screen_region = region
+            else:
+                screen_region = {'top': int(region.y), 'left': int(region.x),
+                                 'width': int(region.width), 'height': int(region.height)}
+
+            self._gray_array = _region_to_image(screen_region)
+            self.timestamp = time.time()
         height, width = self._gray_array.shape
         self.width = width
         self.height = height
 
-        scale = DisplayCollection[screen_id].scale
-
         if scale != 1:
             self.width = int(width / scale)
             self.height = int(height / scale)
@@ -70,11 +80,13 @@ def _region_to_image(region) -> Image or ScreenshotError:
     if not OSHelper.is_linux():
         grabbed_area = _mss_screenshot(region)
     else:
+        backend = get_capture_backend()
         try:
-            grabbed_area = np.array(screenshot(region=(region.x, region.y, region.width, region.height)))
-        except (IOError, OSError):
-            logger.debug('Call to pyautogui.screnshot failed, using mss instead.')
-            grabbed_area = _mss_screenshot(region)
+            return backend.grab(region)
+        except Exception as e:
+            logger.debug('Capture with %s failed: %s, using mss instead.' % (backend.name, e))
+            grabbed_area = _mss_screenshot({'top': int(region.y), 'left': int(region.x),
+                                            'width': int(region.width), 'height': int(region.height)})
     return cv2.cvtColor(grabbed_area, cv2.COLOR_BGR2GRAY)
 
 
@@ -3,7 +3,7 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-from src.core.api.enums import Color
+from src.core.api.enums import Color, DebugImagePolicy
 from src.core.util.arg_parser import parse_args
 
 
@@ -31,6 +31,45 @@ class _Settings:
     highlight_color             -   The rectangle/circle border color for the highlight effect.
     highlight_thickness         -   The rectangle/circle border thickness for the highlight effect.
     mouse_scroll_step           -   The number of pixels for a vertical/horizontal scroll event.
+    pyramid_search              -   Use a coarse-to-fine image pyramid for pattern search operations. (default - False)
+    pyramid_levels              -   The maximum number of times the screenshot and the pattern are downsampled while
+                                    using pyramid search. (default - 2)
+    persist_image_index         -   Save the project image index in the working directory and reuse it while the
+                                    project tree is unchanged. (default - True)
+    capture_service             -   Serve screenshots from a background capture of the whole virtual display instead of
+                                    grabbing each region on demand. (default - False)
+    capture_fps                 -   The number of times per second the capture service grabs the screen. (default - 30)
+    capture_buffers             -   The number of preallocated frame buffers used by the capture service. (default - 3)
+    capture_backend             -   Screen capture backend used on Linux: mss, xlib or pyautogui. By default the fastest
+                                    working backend is selected at startup. (default - None)
+    match_hints                 -   Search first around the last location of a pattern, and only search the whole region
+                                    when it is not found there. The match found near the last location is returned
+                                    even if a better match exists elsewhere in the region. Hints are cleared before
+                                    each test and when the browser starts or quits. (default - False)
+    match_hint_padding          -   The number of pixels added around the last location of a pattern while using match
+                                    hints. (default - 20)
+    max_matches                 -   The maximum number of matches returned by find_all operations. (default - 500)
+    debug_image_policy          -   Which debug images are saved in the background when --image_debug is not set:
+                                    all, the last frame of each wait operation, failures, every Nth image or none.
+                                    (default - DebugImagePolicy.LAST_PER_WAIT)
+    debug_image_interval        -   The sampling interval of the DebugImagePolicy.EVERY_NTH policy. (default - 10)
+    debug_image_queue_size      -   The maximum number of debug images waiting to be saved. Images are dropped when the
+                                    queue is full. (default - 16)
+    ocr_cache_size              -   The maximum number of OCR results kept in memory, per screenshot area, scale and
+                                    preprocessing. (default - 256)
+    ocr_engine                  -   OCR engine used by text search operations: tesserocr or pytesseract. By default
+                                    tesserocr is used when it is installed, which the Pipfile does on Linux and macOS.
+                                    (default - None)
+    ocr_workers                 -   The number of OCR workers. By default, one worker per CPU. (default - None)
+    ocr_text_bands              -   Only send the text bands found by a morphological analysis of the screenshot to OCR.
+                                    Each band is a separate OCR call, so this only pays off with the tesserocr engine,
+                                    on mostly empty screens with a few bands of text. Enable it for text searches over
+                                    the whole screen on such pages, and compare the OCR time in the debug log.
+                                    (default - False)
+    ocr_text_band_max_coverage  -   When the text bands cover a larger part of the screenshot than this ratio, the whole
+                                    screenshot is sent to OCR. (default - 0.6)
+    ocr_text_band_max_count     -   When more text bands than this are found, the whole screenshot is sent to OCR.
+                                    (default - 4)
     """
 
     DEFAULT_MIN_SIMILARITY = 0.8
@@ -49,6 +88,25 @@ class _Settings:
     DEFAULT_HIGHLIGHT_COLOR = Color.RED
     DEFAULT_HIGHLIGHT_THICKNESS = 2
     DEFAULT_MOUSE_SCROLL_STEP = 100
+    DEFAULT_PYRAMID_SEARCH = False
+    DEFAULT_PYRAMID_LEVELS = 2
+    DEFAULT_PERSIST_IMAGE_INDEX = True
+    DEFAULT_CAPTURE_SERVICE = False
+    DEFAULT_CAPTURE_FPS = 30
+    DEFAULT_CAPTURE_BUFFERS = 3
+    DEFAULT_CAPTURE_BACKEND = None
+    DEFAULT_MATCH_HINTS = False
+    DEFAULT_MATCH_HINT_PADDING = 20
+    DEFAULT_MAX_MATCHES = 500
+    DEFAULT_DEBUG_IMAGE_POLICY = DebugImagePolicy.LAST_PER_WAIT
+    DEFAULT_DEBUG_IMAGE_INTERVAL = 10
+    DEFAULT_DEBUG_IMAGE_QUEUE_SIZE = 16
+    DEFAULT_OCR_CACHE_SIZE = 256
+    DEFAULT_OCR_ENGINE = None
+    DEFAULT_OCR_WORKERS = None
+    DEFAULT_OCR_TEXT_BANDS = False
+    DEFAULT_OCR_TEXT_BAND_MAX_COVERAGE = 0.6
+    DEFAULT_OCR_TEXT_BAND_MAX_COUNT = 4
     DEFAULT_SITE_LOAD_TIMEOUT = 30
     DEFAULT_HEAVY_SITE_LOAD_TIMEOUT = 90
     UI_DELAY = 1
@@ -66,7 +124,26 @@ class _Settings:
                  highlight_duration=DEFAULT_HIGHLIGHT_DURATION,
                  highlight_color=DEFAULT_HIGHLIGHT_COLOR,
                  highlight_thickness=DEFAULT_HIGHLIGHT_THICKNESS,
-                 mouse_scroll_step=DEFAULT_MOUSE_SCROLL_STEP):
+                 mouse_scroll_step=DEFAULT_MOUSE_SCROLL_STEP,
+                 pyramid_search=DEFAULT_PYRAMID_SEARCH,
+                 pyramid_levels=DEFAULT_PYRAMID_LEVELS,
+                 persist_image_index=DEFAULT_PERSIST_IMAGE_INDEX,
+                 capture_service=DEFAULT_CAPTURE_SERVICE,
+                 capture_fps=DEFAULT_CAPTURE_FPS,
+                 capture_buffers=DEFAULT_CAPTURE_BUFFERS,
+                 capture_backend=DEFAULT_CAPTURE_BACKEND,
+                 match_hints=DEFAULT_MATCH_HINTS,
+                 match_hint_padding=DEFAULT_MATCH_HINT_PADDING,
+                 max_matches=DEFAULT_MAX_MATCHES,
+                 debug_image_policy=DEFAULT_DEBUG_IMAGE_POLICY,
+                 debug_image_interval=DEFAULT_DEBUG_IMAGE_INTERVAL,
+                 debug_image_queue_size=DEFAULT_DEBUG_IMAGE_QUEUE_SIZE,
+                 ocr_cache_size=DEFAULT_OCR_CACHE_SIZE,
+                 ocr_engine=DEFAULT_OCR_ENGINE,
+                 ocr_workers=DEFAULT_OCR_WORKERS,
+                 ocr_text_bands=DEFAULT_OCR_TEXT_BANDS,
+                 ocr_text_band_max_coverage=DEFAULT_OCR_TEXT_BAND_MAX_COVERAGE,
+                 ocr_text_band_max_count=DEFAULT_OCR_TEXT_BAND_MAX_COUNT):
 
         self.wait_scan_rate = wait_scan_rate
         self._type_delay = type_delay
@@ -84,6 +161,25 @@ class _Settings:
         self.highlight_color = highlight_color.value
         self.highlight_thickness = highlight_thickness
         self.mouse_scroll_step = mouse_scroll_step
+        self.pyramid_search = pyramid_search
+        self.pyramid_levels = pyramid_levels
+        self.persist_image_index = persist_image_index
+        self.capture_service = capture_service
+        self.capture_fps = capture_fps
+        self.capture_buffers = capture_buffers
+        self.capture_backend = capture_backend
+        self.match_hints = match_hints
+        self.match_hint_padding = match_hint_padding
+        self.max_matches = max_matches
+        self.debug_image_policy = debug_image_policy
+        self.debug_image_interval = debug_image_interval
+        self.debug_image_queue_size = debug_image_queue_size
+        self.ocr_cache_size = ocr_cache_size
+        self.ocr_engine = ocr_engine
+        self.ocr_workers = ocr_workers
+        self.ocr_text_bands = ocr_text_bands
+        self.ocr_text_band_max_coverage = ocr_text_band_max_coverage
+        self.ocr_text_band_max_count = ocr_text_band_max_count
 
     @property
     def type_delay(self):
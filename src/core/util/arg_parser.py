@@ -78,6 +78,7 @@ def parse_args():
     parser.add_argument('-r', '--report',
                         help='Report tests to TestRail',
                         action='store_true')
+    add_run_arguments(parser)
     parser.add_argument('-w', '--workdir',
                         help='Path to working directory',
                         type=os.path.abspath,
@@ -93,3 +94,27 @@ def parse_args():
         iris_args = parser.parse_args()
 
     return iris_args
+
+
+def add_run_arguments(parser: argparse.ArgumentParser):
+    """Adds the arguments scheduling the run, shared by the Iris parser and the target parsers.
+
+    :param parser: Parser of the command line.
+    :return: None.
+    """
+    parser.add_argument('-s', '--shards',
+                        help='Number of virtual displays running tests in parallel (Linux only)',
+                        type=int,
+                        action='store',
+                        default=1)
+    parser.add_argument('--shard',
+                        help=argparse.SUPPRESS,
+                        type=int,
+                        action='store',
+                        default=None)
+    parser.add_argument('-t', '--fail_first',
+                        help='Run the tests that failed in their last run first',
+                        action='store_true')
+    parser.add_argument('-u', '--offline',
+                        help='Use cached Firefox builds without network access',
+                        action='store_true')
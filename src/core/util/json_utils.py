@@ -8,12 +8,15 @@ import sys
 import git
 import importlib
 import json
+import linecache
 import logging
 import pytest
 
 from src.core.api.os_helpers import OSHelper
 from src.core.util.arg_parser import parse_args
 from src.core.util.path_manager import PathManager
+from src.core.util.result_store import build_test_tree, export_unfinished_runs, get_result_store
+from src.core.util.run_index import get_run_index
 
 logger = logging.getLogger(__name__)
 
@@ -64,28 +67,35 @@ def update_run_index(app, finished=False):
                        'locale': app.locale,
                        'target': parse_args().application,
                        'total': '-1'}
+    write_run_index_entry(current_run)
 
-    run_file = os.path.join(parse_args().workdir, 'data', 'runs.json')
 
-    if os.path.exists(run_file):
-        logger.debug('Updating run file: %s' % run_file)
-        with open(run_file, 'r') as f:
-            run_file_data = json.load(f)
-        for run in run_file_data['runs']:
-            if run['id'] == PathManager.get_run_id():
-                run_file_data['runs'].remove(run)
-        run_file_data['runs'].append(current_run)
-    else:
-        logger.debug('Creating run file: %s' % run_file)
-        run_file_data = {'runs': []}
-        run_file_data['runs'].append(current_run)
+def write_run_index_entry(current_run):
+    """Adds a run to the run index, replacing the previous entry of the same run.
 
-    with open(run_file, 'w') as f:
-        json.dump(run_file_data, f, sort_keys=True, indent=True)
+    :param current_run: Dict with the id, target, locale, total, failed and duration of the run.
+    :return: None.
+    """
+    logger.debug('Updating run index with run %s' % current_run['id'])
+    get_run_index().put(current_run)
 
 
-def create_run_log(app):
+def recover_unfinished_runs():
+    """Writes run.json and the run index entry of the runs of the working directory that ended before writing them."""
+    runs_dir = os.path.join(PathManager.get_working_dir(), 'runs')
+    for meta, duration in export_unfinished_runs(runs_dir):
+        if meta.get('run_id') is None:
+            continue
+        write_run_index_entry({'duration': duration,
+                               'failed': meta['failed'] + meta['errors'],
+                               'id': meta['run_id'],
+                               'locale': meta.get('locale'),
+                               'target': (meta.get('params') or {}).get('application'),
+                               'total': meta['total']})
+
 
+def get_run_meta(app):
+    """Returns the run information of run.json, without the test counts."""
     meta = {'run_id': PathManager.get_run_id(),
             'platform': OSHelper.get_os().value,
             'config': '%s, %s-bit, %s' % (OSHelper.get_os().value, OSHelper.get_os_bits(),
@@ -105,40 +115,65 @@ def create_run_log(app):
     meta['iris_branch'] = repo.active_branch.name
     meta['iris_branch_head'] = repo.head.object.hexsha
 
-    failed = 0
-    passed = 0
-    skipped = 0
-    errors = 0
-
-    for test in app.completed_tests:
-        if test.outcome == 'FAILED':
-            failed = failed + 1
-        if test.outcome == 'PASSED':
-            passed = passed + 1
-        if test.outcome == 'SKIPPED':
-            skipped = skipped + 1
-        if test.outcome == 'ERROR':
-            errors = errors + 1
-
-    logger.debug('Updating runs.json with completed run data.')
-    meta['total'] = len(app.completed_tests)
-    meta['passed'] = passed
-    meta['failed'] = failed
-    meta['skipped'] = skipped
-    meta['errors'] = errors
-    meta['start_time'] = app.start_time
-    meta['end_time'] = app.end_time
-    meta['total_time'] = app.end_time - app.start_time
-
-    tests = {}
-    tests['all_tests'] = convert_test_list(app.completed_tests)
-    tests['failed_tests'] = convert_test_list(app.completed_tests, only_failures=True)
-    
-    run_file = os.path.join(PathManager.get_current_run_dir(), 'run.json')
-    run_file_data = {'meta': meta, 'tests': tests}
-
-    with open(run_file, 'w') as f:
-        json.dump(run_file_data, f, sort_keys=True, indent=True)
+    meta['start_time'] = getattr(app, 'start_time', None)
+    meta['end_time'] = getattr(app, 'end_time', None)
+    return meta
+
+
+def start_run_log(app):
+    """Saves the run information in the result store, before any test runs."""
+    get_result_store().set_meta(get_run_meta(app))
+
+
+def record_test_result(test):
+    """Saves the result of a finished test in the result store."""
+    path, test_obj = convert_test_result(test)
+    get_result_store().add_result(path, test_obj)
+
+
+def create_run_log(app):
+    logger.debug('Writing run.json with completed run data.')
+    store = get_result_store()
+    store.set_meta(get_run_meta(app))
+    store.export(os.path.join(PathManager.get_current_run_dir(), 'run.json'))
+
+
+def convert_test_result(test):
+    """
+    Converts a test result object to its run.json entry.
+
+    :param test: Completed test
+    :return: Tuple with the test path inside its target directory and the run.json entry
+    """
+    test_root = os.path.join(PathManager.get_module_dir(), 'tests')
+    test_failed = True if 'FAILED' in test.outcome or 'ERROR' in test.outcome else False
+    original_path = str(test.item.__dict__.get('fspath'))
+    target_root = original_path.split(test_root)[1]
+    target = target_root.split(os.sep)[1]
+    test_path = target_root.split('%s%s%s' % (os.sep, target, os.sep))[1].split('.py')[0]
+    details = get_test_markers(test.item)
+
+    test_obj = {}
+    test_obj['name'] = os.path.basename(test_path)
+    if test_failed:
+        test_assert = {
+            'error': test.error.lstrip(), 'message': test.message.lstrip(), 'call_stack': test.traceback,
+            'actual': test.actual, 'expected': test.expected, 'code': get_failing_code(test.node_name, int(test.line))
+        }
+        test_obj['assert'] = test_assert
+    test_obj['result'] = test.outcome
+    test_obj['time'] = test.test_duration
+    debug_image_directory = os.path.join(PathManager.get_current_run_dir(), test_path, 'debug_images')
+    test_obj['debug_image_directory'] = debug_image_directory
+    test_obj['debug_images'] = get_image_names(debug_image_directory)
+    test_obj['description'] = details.get('description')
+
+    values = {}
+    for i in details:
+        if i != 'description':
+            values[i] = details.get(i)
+    test_obj['values'] = values
+    return '/'.join(test_path.split(os.sep)), test_obj
 
 
 def convert_test_list(list, only_failures=False):
@@ -150,58 +185,10 @@ def convert_test_list(list, only_failures=False):
     :param only_failures: If True, only return failed tests
     :return:
     '''
-    test_root = os.path.join(PathManager.get_module_dir(), 'tests')
-    tests = []
-    for test in list:
-        test_failed = True if 'FAILED' in test.outcome or 'ERROR' in test.outcome else False
-        original_path = str(test.item.__dict__.get('fspath'))
-        target_root = original_path.split(test_root)[1]
-        target = target_root.split(os.sep)[1]
-        test_path = target_root.split('%s%s%s' % (os.sep, target, os.sep))[1]
-        parent = tests
-        details = get_test_markers(test.item)
-        for module in test_path.split(os.sep):
-            test_obj = {}
-            test_obj['name'] = module.split('.py')[0]
-            if 'py' not in module:
-                module_exists = False
-                for objects in parent:
-                    if objects['name'] == module:
-                        parent = objects['children']
-                        module_exists = True
-                        break
-                if not module_exists:
-                    new_parent = test_obj['children'] = []
-                    if only_failures and test_failed:
-                        parent.append(test_obj)
-                    elif not only_failures:
-                        parent.append(test_obj)
-                    parent = new_parent
-            else:
-                if test_failed:
-                    test_assert = {
-                        'error': test.error.lstrip(), 'message': test.message.lstrip(), 'call_stack': test.traceback,
-                        'actual': test.actual, 'expected': test.expected, 'code': get_failing_code(test.node_name, int(test.line))
-                    }
-                    test_obj['assert'] = test_assert
-                test_obj['result'] = test.outcome
-                test_obj['time'] = test.test_duration
-                debug_image_directory = os.path.join(PathManager.get_current_run_dir(), test_path.split('.py')[0], 'debug_images')
-                test_obj['debug_image_directory'] = debug_image_directory
-                test_obj['debug_images'] = get_image_names(debug_image_directory)
-                test_obj['description'] = details.get('description')
-
-                values = {}
-                for i in details:
-                    if i != 'description':
-                        values[i] = details.get(i)
-                test_obj['values'] = values
-                if only_failures and test_failed:
-                    parent.append(test_obj)
-                elif not only_failures:
-                    parent.append(test_obj)
-                parent = tests
-    return tests
+    results = [convert_test_result(test) for test in list]
+    if only_failures:
+        results = [(path, test_obj) for path, test_obj in results if test_obj['result'] in ('FAILED', 'ERROR')]
+    return build_test_tree(results)
 
 
 def get_image_names(path):
@@ -214,7 +201,7 @@ def get_image_names(path):
 
 
 def get_failing_code(file, line):
-    f = open(file, 'r').readlines()
+    f = linecache.getlines(file)
     lines = []
     num_lines = 10
     if len(f) < num_lines:
@@ -29,7 +29,7 @@ def __create_tempdir():
 
 
 _tmp_dir = __create_tempdir()
-_run_id = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+_run_id = os.environ.get('IRIS_RUN_ID') or datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
 _current_module = os.path.join(os.path.expanduser('~'), 'temp', 'test')
 args = parse_args()
 
@@ -127,9 +127,10 @@ class PathManager:
             master_run_directory = os.path.join(path, 'runs')
             if os.path.exists(master_run_directory):
                 shutil.rmtree(master_run_directory, ignore_errors=True)
-            run_file = os.path.join(path, 'data', 'all_runs.json')
-            if os.path.exists(run_file):
-                os.remove(run_file)
+            for run_file in ('runs.json', 'runs.jsonl'):
+                run_file = os.path.join(path, 'data', run_file)
+                if os.path.exists(run_file):
+                    os.remove(run_file)
             cache_builds_directory = os.path.join(path, 'cache')
             if os.path.exists(cache_builds_directory):
                 shutil.rmtree(cache_builds_directory, ignore_errors=True)
@@ -140,6 +141,14 @@ class PathManager:
         PathManager.create_working_directory(args.workdir)
         return args.workdir
 
+    @staticmethod
+    def get_root_working_dir():
+        """Returns the working directory of the main run, which is the parent of the shard working directories in shard
+        workers."""
+        if args.shard is not None:
+            return os.path.dirname(os.path.dirname(args.workdir))
+        return args.workdir
+
     @staticmethod
     def create_run_directory():
         """Creates run directory."""
@@ -173,6 +182,14 @@ class PathManager:
         test_path = current_test.split(test_root)[1].split('.py')[0][1:]
         return os.path.join(PathManager.get_current_run_dir(), test_path, 'debug_images')
 
+    @staticmethod
+    def get_pattern_cache_dir():
+        """Returns the path to the directory where decoded pattern images are cached."""
+        path = os.path.join(args.workdir, 'pattern_cache')
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        return path
+
     @staticmethod
     def get_git_details():
         repo_details = {}
@@ -0,0 +1,229 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack
+
+from src.core.util.file_lock import file_lock
+from src.core.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_FILE = 'results.db'
+RUN_FILE = 'run.json'
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+class ResultStore:
+    """Test results of a run, saved in an SQLite database of the run directory as soon as each test finishes.
+
+    Results are stored as rows with the test path inside its target directory, so the run.json test tree is built with
+    one pass over the rows, and the results of a run that crashed can still be exported.
+
+    The store of a running run holds a lock file next to the database until it is closed or its process ends, so the
+    runs that crashed are the ones with a store nobody holds and no run.json.
+    """
+
+    def __init__(self, path: str, owner: bool = False):
+        """
+        :param path: Path of the database file.
+        :param owner: True for the store of the current run, which holds the lock file of the store.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._exit_stack = ExitStack()
+        if owner:
+            self._exit_stack.enter_context(file_lock(path + '.lock'))
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS tests (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                     'path TEXT, result TEXT, failed INTEGER, data TEXT, finished REAL)')
+            columns = [row[1] for row in self._connection.execute('PRAGMA table_info(tests)')]
+            if 'finished' not in columns:
+                self._connection.execute('ALTER TABLE tests ADD COLUMN finished REAL')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS tests_path ON tests (path)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS tests_failed ON tests (failed)')
+
+    def set_meta(self, meta: dict):
+        """Adds or replaces run information.
+
+        :param meta: Dict of run information, with JSON serializable values.
+        :return: None.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                         [(key, json.dumps(value, default=str)) for key, value in meta.items()])
+
+    def get_meta(self) -> dict:
+        with self._lock:
+            rows = self._connection.execute('SELECT key, value FROM meta').fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def add_result(self, path: str, test_obj: dict):
+        """Saves the result of a test.
+
+        :param path: Test path inside its target directory, without the .py extension, like 'nav/test_back'.
+        :param test_obj: run.json entry of the test, with its name and result.
+        :return: None.
+        """
+        failed = test_obj['result'] in ('FAILED', 'ERROR')
+        with self._lock, self._connection:
+            self._connection.execute('INSERT INTO tests (path, result, failed, data, finished) VALUES (?, ?, ?, ?, ?)',
+                                     (path, test_obj['result'], int(failed), json.dumps(test_obj, default=str),
+                                      time.time()))
+
+    def get_results(self, path: str) -> list:
+        """Returns the run.json entries saved for a test path."""
+        with self._lock:
+            rows = self._connection.execute('SELECT data FROM tests WHERE path = ? ORDER BY id', (path,)).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get_counts(self) -> dict:
+        """Returns the number of tests of each result, and the total number of tests."""
+        with self._lock:
+            rows = self._connection.execute('SELECT result, COUNT(*) FROM tests GROUP BY result').fetchall()
+        counts = dict(rows)
+        return {'total': sum(counts.values()), 'passed': counts.get('PASSED', 0),
+                'failed': counts.get('FAILED', 0), 'skipped': counts.get('SKIPPED', 0),
+                'errors': counts.get('ERROR', 0)}
+
+    def get_last_finish_time(self):
+        """Returns the time the last saved test finished, or None if no test finished."""
+        with self._lock:
+            finished, = self._connection.execute('SELECT MAX(finished) FROM tests').fetchone()
+        return finished
+
+    def get_total_duration(self):
+        """Returns the sum of the durations of the saved tests."""
+        with self._lock:
+            rows = self._connection.execute('SELECT data FROM tests').fetchall()
+        return sum(json.loads(data).get('time') or 0 for data, in rows)
+
+    def get_tree(self, only_failures: bool = False) -> list:
+        """Returns the results as the nested test tree of run.json, in the order the tests finished.
+
+        :param only_failures: If True, only failed tests and their directories are returned.
+        :return: List of directory and test entries.
+        """
+        query = 'SELECT path, data FROM tests%s ORDER BY id' % (' WHERE failed = 1' if only_failures else '')
+        with self._lock:
+            rows = self._connection.execute(query).fetchall()
+        return build_test_tree((path, json.loads(data)) for path, data in rows)
+
+    def export(self, run_file: str) -> dict:
+        """Writes run.json from the saved run information and results.
+
+        :param run_file: Path of the run.json file.
+        :return: Run information written in run.json.
+        """
+        meta = self.get_meta()
+        meta.update(self.get_counts())
+        if meta.get('end_time') is None:
+            # The run ended before the session finished, use the time the last saved test finished.
+            last_finish_time = self.get_last_finish_time()
+            meta['end_time'] = int(last_finish_time) if last_finish_time is not None else meta.get('start_time')
+        if meta.get('start_time') is not None and meta['end_time'] is not None:
+            meta['total_time'] = meta['end_time'] - meta['start_time']
+        tests = {'all_tests': self.get_tree(), 'failed_tests': self.get_tree(only_failures=True)}
+
+        temp_file = '%s.%s.tmp' % (run_file, os.getpid())
+        with open(temp_file, 'w') as f:
+            json.dump({'meta': meta, 'tests': tests}, f, sort_keys=True, indent=True)
+        os.replace(temp_file, run_file)
+        return meta
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+            self._exit_stack.close()
+
+
+def build_test_tree(results) -> list:
+    """Nests test entries by directory, with a dict of the directories already created instead of scanning children.
+
+    :param results: Iterable of (path, test_obj) tuples.
+    :return: List of directory and test entries.
+    """
+    tests = []
+    directories = {}
+    for path, test_obj in results:
+        parent = tests
+        parts = path.split('/')
+        for index in range(len(parts) - 1):
+            directory_path = '/'.join(parts[:index + 1])
+            children = directories.get(directory_path)
+            if children is None:
+                children = directories[directory_path] = []
+                parent.append({'name': parts[index], 'children': children})
+            parent = children
+        parent.append(test_obj)
+    return tests
+
+
+def get_result_store() -> ResultStore:
+    """Returns the result store of the current run, creating it on first call."""
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            _result_store = ResultStore(os.path.join(PathManager.get_current_run_dir(), RESULT_STORE_FILE),
+                                        owner=True)
+    return _result_store
+
+
+def export_result_store(run_dir: str) -> bool:
+    """Writes the run.json file of a run directory from its result store, for runs that ended before writing it.
+
+    :param run_dir: Run directory.
+    :return: True if run.json was written.
+    """
+    store_path = os.path.join(run_dir, RESULT_STORE_FILE)
+    if not os.path.exists(store_path):
+        return False
+    store = ResultStore(store_path)
+    try:
+        store.export(os.path.join(run_dir, RUN_FILE))
+    finally:
+        store.close()
+    return True
+
+
+def export_unfinished_runs(runs_dir: str) -> list:
+    """Writes the run.json files of the runs that ended before writing them, like runs that crashed.
+
+    Runs with a result store held by their process are still running and are skipped.
+
+    :param runs_dir: Directory of the run directories.
+    :return: List of (run information, total test duration) tuples of the exported runs.
+    """
+    exported = []
+    if not os.path.isdir(runs_dir):
+        return exported
+    for run_id in sorted(os.listdir(runs_dir)):
+        run_dir = os.path.join(runs_dir, run_id)
+        store_path = os.path.join(run_dir, RESULT_STORE_FILE)
+        if os.path.exists(os.path.join(run_dir, RUN_FILE)) or not os.path.exists(store_path):
+            continue
+        with file_lock(store_path + '.lock', blocking=False) as locked:
+            if not locked:
+                continue
+            logger.info('Exporting results of unfinished run %s' % run_id)
+            store = ResultStore(store_path)
+            try:
+                exported.append((store.export(os.path.join(run_dir, RUN_FILE)), store.get_total_duration()))
+            except (sqlite3.Error, OSError) as e:
+                logger.warning('Could not export results of run %s: %s' % (run_id, e))
+            finally:
+                store.close()
+    return exported
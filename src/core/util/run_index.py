@@ -0,0 +1,197 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import logging
+import os
+import threading
+
+from src.core.util.arg_parser import parse_args
+from src.core.util.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_MIN_RECORDS = 1000
+EXPORT_LIMIT = 1000
+
+_run_index = None
+_run_index_lock = threading.Lock()
+
+
+class RunIndex:
+    """Index of the runs of a working directory, stored as an append-only JSON Lines file.
+
+    Each line is a run entry, or a deletion marker with the id of a deleted run. The last line of a run id wins. Writes
+    append one line under a file lock, so parallel workers never rewrite each other's entries. Readers keep the byte
+    offset of the last line of each run and only read the lines appended since their last read. The file is compacted,
+    keeping only the last line of each run, when most of its lines are outdated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._offsets = {}
+        self._records = 0
+        self._read_size = 0
+        self._inode = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def put(self, run: dict):
+        """Adds or replaces the entry of a run.
+
+        :param run: Dict with the id, target, locale, total, failed and duration of the run.
+        :return: None.
+        """
+        self._append(run)
+
+    def delete(self, run_id: str) -> bool:
+        """Removes the entry of a run.
+
+        :param run_id: Id of the run.
+        :return: True if the run was in the index.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            if run_id not in self._offsets:
+                return False
+            self._write_line({'id': run_id, 'deleted': True})
+            return True
+
+    def get(self, run_id: str) -> dict or None:
+        """Returns the entry of a run, or None if the run is not in the index."""
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            offset = self._offsets.get(run_id)
+            if offset is None:
+                return None
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                return json.loads(f.readline().decode('utf-8'))
+
+    def count(self) -> int:
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            return len(self._offsets)
+
+    def page(self, offset: int = 0, limit: int = 50, newest_first: bool = True) -> dict:
+        """Returns a page of run entries, ordered by run id.
+
+        :param offset: Number of runs to skip.
+        :param limit: Maximum number of runs to return.
+        :param newest_first: If True, the newest runs come first.
+        :return: Dict with the runs of the page and the total number of runs.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            run_ids = sorted(self._offsets, reverse=newest_first)
+            runs = []
+            with open(self.path, 'rb') as f:
+                for run_id in run_ids[offset:offset + limit]:
+                    f.seek(self._offsets[run_id])
+                    runs.append(json.loads(f.readline().decode('utf-8')))
+            return {'runs': runs, 'total': len(run_ids), 'offset': offset, 'limit': limit}
+
+    def compact(self):
+        """Rewrites the index with only the current entry of each run."""
+        with self._lock, file_lock(self.lock_path):
+            self._compact()
+
+    def export(self, path: str, limit: int = EXPORT_LIMIT):
+        """Writes the newest runs, oldest first, in the runs.json format read by the control center."""
+        runs = list(reversed(self.page(0, limit)['runs']))
+        temp_file = '%s.%s.tmp' % (path, os.getpid())
+        with open(temp_file, 'w') as f:
+            json.dump({'runs': runs}, f, sort_keys=True, indent=True)
+        os.replace(temp_file, path)
+
+    def import_legacy(self, path: str):
+        """Adds the runs of a legacy runs.json file to an empty index."""
+        try:
+            with open(path, 'r') as f:
+                runs = json.load(f)['runs']
+        except (IOError, ValueError, KeyError):
+            return
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            if self._records > 0:
+                return
+            logger.debug('Importing %s runs from %s' % (len(runs), path))
+            for run in runs:
+                self._write_line(run)
+
+    def _append(self, record: dict):
+        with self._lock, file_lock(self.lock_path):
+            self._write_line(record)
+            self._refresh()
+            if self._records >= COMPACTION_MIN_RECORDS and self._records > 2 * len(self._offsets):
+                self._compact()
+
+    def _write_line(self, record: dict):
+        with open(self.path, 'ab') as f:
+            f.write((json.dumps(record, sort_keys=True) + '\n').encode('utf-8'))
+
+    def _refresh(self):
+        """Reads the lines appended since the last read, or the whole file if it was compacted by another process."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._reset(None)
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._read_size:
+            self._reset(stat.st_ino)
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._read_size)
+            offset = self._read_size
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                    run_id = record['id']
+                except (ValueError, KeyError, TypeError):
+                    offset += len(line)
+                    continue
+                self._records += 1
+                if record.get('deleted'):
+                    self._offsets.pop(run_id, None)
+                else:
+                    self._offsets[run_id] = offset
+                offset += len(line)
+            self._read_size = offset
+
+    def _reset(self, inode):
+        self._offsets = {}
+        self._records = 0
+        self._read_size = 0
+        self._inode = inode
+
+    def _compact(self):
+        self._refresh()
+        temp_file = '%s.%s.tmp' % (self.path, os.getpid())
+        with open(self.path, 'rb') as source, open(temp_file, 'wb') as target:
+            for offset in sorted(self._offsets.values()):
+                source.seek(offset)
+                target.write(source.readline())
+        os.replace(temp_file, self.path)
+        logger.debug('Compacted run index from %s to %s entries.' % (self._records, len(self._offsets)))
+        self._reset(None)
+        self._refresh()
+
+
+def get_run_index() -> RunIndex:
+    """Returns the run index of the working directory, importing the legacy runs.json file on first use."""
+    global _run_index
+    with _run_index_lock:
+        if _run_index is None:
+            data_dir = os.path.join(parse_args().workdir, 'data')
+            index_path = os.path.join(data_dir, 'runs.jsonl')
+            legacy_path = os.path.join(data_dir, 'runs.json')
+            is_new = not os.path.exists(index_path)
+            _run_index = RunIndex(index_path)
+            if is_new and os.path.exists(legacy_path):
+                _run_index.import_legacy(legacy_path)
+    return _run_index
@@ -0,0 +1,223 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from src.core.api.os_helpers import OSHelper
+from src.core.util.json_utils import write_run_index_entry
+from src.core.util.path_manager import PathManager
+from src.core.util.result_store import export_result_store
+
+logger = logging.getLogger(__name__)
+
+X_SERVER = 'Xvfb'
+X_SCREEN = '1920x1080x24'
+X_START_TIMEOUT = 10
+FIRST_DISPLAY = 99
+
+
+class VirtualDisplay:
+    """Headless X server running on the first free display number.
+
+    Xvfb is used by default, any X server accepting the display number followed by server_args can be used instead.
+    """
+
+    def __init__(self, server: str = X_SERVER, server_args: list = None):
+        self.server = server
+        self.server_args = server_args if server_args is not None else ['-screen', '0', X_SCREEN, '-nolisten', 'tcp']
+        self.number = None
+        self.process = None
+
+    @property
+    def name(self) -> str:
+        return ':%s' % self.number
+
+    def start(self):
+        """Starts the X server and waits until it accepts connections.
+
+        :return: None.
+        :raises OSError: If the X server could not be started.
+        """
+        self.number = _find_free_display()
+        self.process = subprocess.Popen([self.server, self.name] + self.server_args,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        end_time = time.time() + X_START_TIMEOUT
+        while not os.path.exists(_get_display_socket(self.number)):
+            if self.process.poll() is not None or time.time() > end_time:
+                self.stop()
+                raise OSError('Unable to start %s on display %s.' % (self.server, self.name))
+            time.sleep(0.1)
+        logger.debug('Started %s on display %s.' % (self.server, self.name))
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(X_START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class Shard:
+    """Worker process running a part of the tests on its own virtual display, working directory and web server port."""
+
+    def __init__(self, index: int, count: int, args):
+        self.index = index
+        self.count = count
+        self.workdir = os.path.join(args.workdir, 'shards', str(index))
+        self.port = args.port + index
+        self.display = VirtualDisplay()
+        self.process = None
+        self.output_file = None
+
+    @property
+    def run_file(self) -> str:
+        return os.path.join(self.workdir, 'runs', PathManager.get_run_id(), 'run.json')
+
+    def start(self):
+        self.display.start()
+        os.makedirs(self.workdir, exist_ok=True)
+        env = dict(os.environ)
+        env['DISPLAY'] = self.display.name
+        env['IRIS_RUN_ID'] = PathManager.get_run_id()
+        command = [sys.executable, '-m', 'src'] + sys.argv[1:] + \
+                  ['--shard', str(self.index), '--workdir', self.workdir, '--port', str(self.port), '--no_check']
+        self.output_file = open(os.path.join(self.workdir, 'shard_output.log'), 'w')
+        self.process = subprocess.Popen(command, env=env, cwd=PathManager.get_module_dir(),
+                                        stdout=self.output_file, stderr=subprocess.STDOUT)
+        logger.info('Started shard %s/%s on display %s, port %s, working directory %s.'
+                    % (self.index + 1, self.count, self.display.name, self.port, self.workdir))
+
+    def wait(self) -> int:
+        exit_code = self.process.wait()
+        logger.info('Shard %s/%s finished with exit code %s.' % (self.index + 1, self.count, exit_code))
+        self.stop()
+        return exit_code
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        if self.output_file is not None:
+            self.output_file.close()
+            self.output_file = None
+        self.display.stop()
+
+
+def _get_display_socket(number: int) -> str:
+    return '/tmp/.X11-unix/X%s' % number
+
+
+def _find_free_display() -> int:
+    number = FIRST_DISPLAY
+    while os.path.exists('/tmp/.X%s-lock' % number) or os.path.exists(_get_display_socket(number)):
+        number += 1
+    return number
+
+
+def sharding_available() -> bool:
+    """Checks if tests can be sharded across virtual displays on this machine."""
+    if not OSHelper.is_linux():
+        logger.warning('Sharded runs need virtual X displays and are only supported on Linux.')
+        return False
+    if shutil.which(X_SERVER) is None:
+        logger.warning('%s is not installed, running tests without sharding.' % X_SERVER)
+        return False
+    return True
+
+
+def run_shards(args):
+    """Runs the tests in args.shards worker processes, each one on its own virtual display, and merges their run logs.
+
+    :param args: Parsed Iris arguments.
+    :return: List with the exit code of each shard.
+    """
+    shards = [Shard(index, args.shards, args) for index in range(args.shards)]
+    try:
+        for shard in shards:
+            shard.start()
+        exit_codes = [shard.wait() for shard in shards]
+    finally:
+        for shard in shards:
+            shard.stop()
+
+    merge_run_logs(shards, args)
+    return exit_codes
+
+
+def merge_run_logs(shards: list, args):
+    """Merges the run.json files of the shards into the run.json of the current run, and adds the run to runs.json.
+
+    :param shards: List of Shard objects.
+    :param args: Parsed Iris arguments.
+    :return: None.
+    """
+    meta = None
+    tests = {'all_tests': [], 'failed_tests': []}
+    for shard in shards:
+        if not os.path.exists(shard.run_file):
+            export_result_store(os.path.dirname(shard.run_file))
+        try:
+            with open(shard.run_file, 'r') as f:
+                shard_data = json.load(f)
+        except (IOError, ValueError):
+            logger.error('Missing results of shard %s, see %s.'
+                         % (shard.index + 1, os.path.join(shard.workdir, 'shard_output.log')))
+            continue
+
+        shard_meta = shard_data['meta']
+        if meta is None:
+            meta = dict(shard_meta)
+        else:
+            for key in ('total', 'passed', 'failed', 'skipped', 'errors'):
+                meta[key] += shard_meta[key]
+            meta['start_time'] = min(meta['start_time'], shard_meta['start_time'])
+            meta['end_time'] = max(meta['end_time'], shard_meta['end_time'])
+        for key in tests:
+            _merge_test_tree(tests[key], shard_data['tests'][key])
+
+    if meta is None:
+        logger.error('No shard completed, unable to create run log.')
+        return
+
+    meta['args'] = ' '.join(sys.argv)
+    meta['params'] = vars(args)
+    meta['log'] = os.path.join(PathManager.get_current_run_dir(), 'iris_log.log')
+    meta['total_time'] = meta['end_time'] - meta['start_time']
+    meta['shards'] = [{'index': shard.index, 'workdir': shard.workdir, 'port': shard.port} for shard in shards]
+
+    run_file = os.path.join(PathManager.get_current_run_dir(), 'run.json')
+    with open(run_file, 'w') as f:
+        json.dump({'meta': meta, 'tests': tests}, f, sort_keys=True, indent=True)
+
+    write_run_index_entry({'duration': _get_total_duration(tests['all_tests']),
+                           'failed': meta['failed'] + meta['errors'],
+                           'id': PathManager.get_run_id(),
+                           'locale': meta['locale'],
+                           'target': args.application,
+                           'total': meta['total']})
+
+
+def _merge_test_tree(tree: list, shard_tree: list):
+    """Adds the nodes of a shard test tree to a merged test tree, merging the children of directories with the same
+    name."""
+    for node in shard_tree:
+        if 'children' in node:
+            existing = next((item for item in tree if item['name'] == node['name'] and 'children' in item), None)
+            if existing is not None:
+                _merge_test_tree(existing['children'], node['children'])
+                continue
+        tree.append(node)
+
+
+def _get_total_duration(tree: list) -> float:
+    return sum(_get_total_duration(node['children']) if 'children' in node else node.get('time', 0) for node in tree)
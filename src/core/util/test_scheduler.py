@@ -0,0 +1,127 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import heapq
+import json
+import logging
+import os
+
+from src.core.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+HISTORY_RUNS = 10
+DEFAULT_TEST_DURATION = 30.0
+
+
+class TestHistory:
+    """Durations and results of the tests in the latest run logs, newest run first."""
+
+    def __init__(self):
+        self.durations = {}
+        self.results = {}
+        self.run_count = 0
+        self._default_duration = None
+
+    def add_run(self, tests: list, parent: str = ''):
+        """Adds the results of a run.json test tree.
+
+        :param tests: Test tree, as stored under tests/all_tests in run.json.
+        :param parent: Key of the parent directory.
+        :return: None.
+        """
+        self._default_duration = None
+        for node in tests:
+            key = '%s/%s' % (parent, node['name']) if parent else node['name']
+            if 'children' in node:
+                self.add_run(node['children'], key)
+            else:
+                self.results.setdefault(key, []).append(node.get('result'))
+                if node.get('result') != 'SKIPPED':
+                    self.durations.setdefault(key, []).append(node.get('time', 0))
+
+    def get_duration(self, key: str) -> float:
+        """Returns the expected duration of a test, the mean of its past durations, or the mean duration of all the
+        known tests if it never ran."""
+        durations = self.durations.get(key)
+        if durations:
+            return sum(durations) / len(durations)
+        if self._default_duration is None:
+            known = [sum(values) / len(values) for values in self.durations.values() if values]
+            self._default_duration = sum(known) / len(known) if known else DEFAULT_TEST_DURATION
+        return self._default_duration
+
+    def failed_recently(self, key: str) -> bool:
+        """Checks if a test failed the last time it ran."""
+        results = [result for result in self.results.get(key, []) if result != 'SKIPPED']
+        return len(results) > 0 and results[0] in ('FAILED', 'ERROR')
+
+
+def load_test_history(workdir: str, max_runs: int = HISTORY_RUNS) -> TestHistory:
+    """Reads the run logs of the latest runs of a working directory, ignoring the current run.
+
+    :param workdir: Working directory containing the runs directory.
+    :param max_runs: Maximum number of run logs to read.
+    :return: TestHistory object.
+    """
+    history = TestHistory()
+    runs_dir = os.path.join(workdir, 'runs')
+    if not os.path.isdir(runs_dir):
+        return history
+
+    run_ids = sorted((run_id for run_id in os.listdir(runs_dir) if run_id != PathManager.get_run_id()), reverse=True)
+    for run_id in run_ids:
+        if history.run_count >= max_runs:
+            break
+        try:
+            with open(os.path.join(runs_dir, run_id, 'run.json'), 'r') as f:
+                history.add_run(json.load(f)['tests']['all_tests'])
+            history.run_count += 1
+        except (IOError, ValueError, KeyError):
+            continue
+    logger.debug('Loaded test history of %s runs from %s.' % (history.run_count, runs_dir))
+    return history
+
+
+def get_test_key(item) -> str:
+    """Returns the key of a pytest item in the run.json test tree, the test path inside its target directory without
+    the .py extension."""
+    test_root = os.path.join(PathManager.get_module_dir(), 'tests')
+    test_path = str(item.__dict__.get('fspath')).split(test_root)[-1].lstrip(os.sep)
+    return '/'.join(test_path.split('.py')[0].split(os.sep)[1:])
+
+
+def order_tests(items: list, history: TestHistory, fail_first: bool = False) -> list:
+    """Orders tests longest first, so that the longest tests do not end up running alone at the end of a run.
+
+    :param items: Collected pytest items.
+    :param history: TestHistory object.
+    :param fail_first: If True, the tests that failed in their last run are run first.
+    :return: Ordered list of items.
+    """
+    def sort_key(indexed_item):
+        index, item = indexed_item
+        key = get_test_key(item)
+        return not (fail_first and history.failed_recently(key)), -history.get_duration(key), index
+
+    return [item for index, item in sorted(enumerate(items), key=sort_key)]
+
+
+def balance_shards(items: list, history: TestHistory, count: int) -> list:
+    """Splits ordered tests between shards, always giving the next test to the shard with the smallest expected
+    duration.
+
+    :param items: Ordered pytest items, in the same order in every shard.
+    :param history: TestHistory object.
+    :param count: Number of shards.
+    :return: List with the items of each shard.
+    """
+    shards = [[] for _ in range(count)]
+    loads = [(0.0, index) for index in range(count)]
+    for item in items:
+        load, index = heapq.heappop(loads)
+        shards[index].append(item)
+        heapq.heappush(loads, (load + history.get_duration(get_test_key(item)), index))
+    return shards
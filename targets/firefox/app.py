@@ -13,7 +13,7 @@ from src.core.api.os_helpers import OSHelper
 from src.core.util.local_web_server import LocalWebServer
 from src.core.util.path_manager import PathManager
 from src.core.util.test_assert import create_result_object
-from targets.firefox.bug_manager import is_blocked
+from targets.firefox.bug_manager import is_blocked, prefetch_bugs
 from targets.firefox.firefox_app.fx_browser import FXRunner, FirefoxProfile
 from targets.firefox.firefox_app.fx_collection import FX_Collection
 from targets.firefox.firefox_ui.helpers.general import confirm_firefox_launch
@@ -98,12 +98,18 @@ class Target(BaseTarget):
 
     def pytest_sessionfinish(self, session):
         BaseTarget.pytest_sessionfinish(self, session)
+        FirefoxProfile.close_pool()
         for process in self.process_list:
             logger.info('Terminating process.')
             process.terminate()
             process.join()
         logger.debug('Finishing Firefox session')
 
+    def pytest_collection_modifyitems(self, session, config, items):
+        BaseTarget.pytest_collection_modifyitems(self, session, config, items)
+        blocked_by_values = [item.own_markers[0].kwargs.get('blocked_by') for item in items if item.own_markers]
+        prefetch_bugs([value for value in blocked_by_values if value])
+
     def pytest_runtest_setup(self, item):
         BaseTarget.pytest_runtest_setup(self, item)
         if item.name == 'test_run':
@@ -115,7 +121,7 @@ class Target(BaseTarget):
                 test_instance = (item, 'SKIPPED', None)
 
                 test_result = create_result_object(test_instance, 0, 0)
-                self.completed_tests.append(test_result)
+                self.add_test_result(test_result)
                 pytest.skip(item)
 
             elif 'blocked_by' in values:
@@ -127,7 +133,7 @@ class Target(BaseTarget):
                     test_instance = (item, 'SKIPPED', None)
 
                     test_result = create_result_object(test_instance, 0, 0)
-                    self.completed_tests.append(test_result)
+                    self.add_test_result(test_result)
                     pytest.skip(item)
 
     def pytest_runtest_call(self, item):
@@ -3,36 +3,83 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import functools
+import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import bugzilla
-from github import Github
+from github import Github, GithubException
 
 from src.configuration.config_parser import get_config_property, ConfigError
+from src.core.util.path_manager import PathManager
 from targets.firefox.errors import BugManagerError
 from src.core.api.os_helpers import OSHelper
 
 logger = logging.getLogger(__name__)
 
 bugzilla_os = {'win': 'Windows 10', 'win7': 'Windows 7', 'linux': 'Linux', 'osx': 'macOS'}
+marker_os = {'win': 'windows', 'linux': 'linux', 'osx': 'osx'}
 
+BUG_CACHE_TTL = 60 * 60
+BUG_LOOKUP_WORKERS = 8
+GITHUB_REPO_NAME = 'iris2'
+BUGZILLA_FIELDS = ['id', 'status', 'op_sys', 'platform']
 
-def get_github_issue(id):
-    """Get Github issues details."""
+_bug_cache = None
+_bug_cache_lock = threading.Lock()
+
+
+def _get_config_value(section, prop, default=None):
     try:
-        github_api_key = Github(get_config_property('GitHub', 'github_key'))
+        return get_config_property(section, prop)
+    except Exception:
+        return default
+
+
+@functools.lru_cache(maxsize=1)
+def get_github_repo():
+    """Get the Github repository of the Iris issues.
+
+    The repository is read from the github_repo property of the GitHub section of config.ini. By default, the iris2
+    repository of the authenticated user is used, or else the first iris2 repository the user can access, like the
+    upstream repository for its collaborators. The repository is looked up once per run.
+    """
+    try:
+        github_api_key = get_config_property('GitHub', 'github_key')
     except ConfigError:
         logger.warning('Github section missing from config.ini')
-        github_api_key = ''
+        github_api_key = None
+    github = Github(github_api_key)
+    repo_name = _get_config_value('GitHub', 'github_repo')
+    if repo_name is not None:
+        return github.get_repo(repo_name)
+
+    user = github.get_user()
+    try:
+        return github.get_repo('%s/%s' % (user.login, GITHUB_REPO_NAME))
+    except GithubException:
+        for repo in user.get_repos():
+            if repo.name == GITHUB_REPO_NAME:
+                return repo
+    raise BugManagerError('No %s repository found for the Github user.' % GITHUB_REPO_NAME)
+
+
+def get_github_issue(id, repo=None):
+    """Get Github issues details."""
     try:
-        repo = [x for x in github_api_key.get_user().get_repos() if x.name == 'iris2']
-        return repo[0].get_issue(id)
+        if repo is None:
+            repo = get_github_repo()
+        return repo.get_issue(int(str(id).replace('issue_', '')))
     except Exception:
         return None
 
 
-def get_bugzilla_bug(id):
-    """Get Bugzilla bug details."""
+def get_bugzilla_client():
+    """Get a Bugzilla client for the bugzilla_url of config.ini."""
     try:
         bugzilla_api_key = get_config_property('Bugzilla', 'api_key')
         base_url = get_config_property('Bugzilla', 'bugzilla_url')
@@ -40,34 +87,183 @@ def get_bugzilla_bug(id):
         logger.warning('Bugzilla section missing from config.ini')
         bugzilla_api_key = ''
         base_url = ''
+    return bugzilla.Bugzilla(url=base_url, api_key=bugzilla_api_key)
+
+
+def get_bugzilla_bug(id):
+    """Get Bugzilla bug details."""
     try:
-        b = bugzilla.Bugzilla(url=base_url, api_key=bugzilla_api_key)
-        return b.get_bug(id)
-    except Exception:
+        return get_bugzilla_client().get_bug(id)
+    except Exception as e:
+        logger.warning('Unable to get Bugzilla bug %s: %s' % (id, e))
         return None
 
 
-def is_blocked(id):
+def get_bugzilla_bugs(ids):
+    """Get the details of several Bugzilla bugs with one search request.
+
+    :param ids: List of bug ids.
+    :return: List of bug dicts, without the bugs that could not be found.
+    """
+    try:
+        result = get_bugzilla_client().search_bugs([{'id': ','.join(ids)},
+                                                    {'include_fields': ','.join(BUGZILLA_FIELDS)}])
+        return result.get('bugs', [])
+    except Exception as e:
+        logger.warning('Unable to get Bugzilla bugs: %s' % e)
+        return []
+
+
+class BugCache:
+    """Status of Github issues and Bugzilla bugs, saved in the working directory and reused for BUG_CACHE_TTL
+    seconds."""
+
+    def __init__(self, path, ttl=BUG_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (IOError, ValueError):
+            pass
+
+    def get(self, id):
+        """Returns the cached status of a bug, or None if it is missing or expired."""
+        with self._lock:
+            entry = self.entries.get(id)
+        if entry is None or time.time() - entry['time'] > self.ttl:
+            return None
+        return entry['status']
+
+    def set(self, id, status):
+        with self._lock:
+            self.entries[id] = {'time': time.time(), 'status': status}
+
+    def save(self):
+        """Writes the cache file, replacing it atomically."""
+        with self._lock:
+            file_data = dict(self.entries)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_file = '%s.%s.tmp' % (self.path, os.getpid())
+            with open(temp_file, 'w') as f:
+                json.dump(file_data, f, sort_keys=True, indent=True)
+            os.replace(temp_file, self.path)
+        except (IOError, OSError) as e:
+            logger.debug('Unable to save bug cache: %s' % e)
+
+
+def get_bug_cache():
+    """Returns the bug status cache of the working directory."""
+    global _bug_cache
+    with _bug_cache_lock:
+        if _bug_cache is None:
+            _bug_cache = BugCache(os.path.join(PathManager.get_root_working_dir(), 'data', 'bug_cache.json'))
+    return _bug_cache
+
+
+def get_bug_id(blocked_by):
+    """Returns the bug id and the blocked platforms of a blocked_by marker value.
+
+    :param blocked_by: Bug id, or dict with the bug id and the list of blocked platforms.
+    :return: Tuple with the bug id as string and the list of platforms, None if all platforms are blocked.
+    """
+    if isinstance(blocked_by, dict):
+        return str(blocked_by.get('id')), blocked_by.get('platform')
+    return str(blocked_by), None
+
+
+def _get_github_status(issue):
+    return {'state': issue.state, 'title': issue.title}
+
+
+def _get_bugzilla_status(bug):
+    return {'status': bug['status'], 'op_sys': bug['op_sys'], 'platform': bug['platform']}
+
+
+def _fetch_status(id):
+    if 'issue_' in id:
+        issue = get_github_issue(id)
+        return None if issue is None else _get_github_status(issue)
+    bug = get_bugzilla_bug(id)
+    return None if bug is None else _get_bugzilla_status(bug)
+
+
+def prefetch_bugs(blocked_by_values):
+    """Gets the status of all the bugs blocking tests, before the tests run.
+
+    Bugs that are not cached are looked up concurrently: Bugzilla bugs with one request, Github issues with one request
+    each on a single repository.
+
+    :param blocked_by_values: List of blocked_by marker values.
+    :return: None.
+    """
+    cache = get_bug_cache()
+    ids = set(get_bug_id(value)[0] for value in blocked_by_values if value)
+    missing = [id for id in ids if cache.get(id) is None]
+    if len(missing) == 0:
+        return
+
+    issue_ids = [id for id in missing if 'issue_' in id]
+    bug_ids = [id for id in missing if 'issue_' not in id]
+    logger.debug('Getting the status of %s Bugzilla bugs and %s Github issues.' % (len(bug_ids), len(issue_ids)))
+
+    def fetch_bugzilla():
+        for bug in get_bugzilla_bugs(bug_ids):
+            cache.set(str(bug['id']), _get_bugzilla_status(bug))
+
+    def fetch_github(id, repo):
+        issue = get_github_issue(id, repo)
+        if issue is not None:
+            cache.set(id, _get_github_status(issue))
+
+    with ThreadPoolExecutor(max_workers=BUG_LOOKUP_WORKERS) as executor:
+        futures = []
+        if len(bug_ids) > 0:
+            futures.append(executor.submit(fetch_bugzilla))
+        if len(issue_ids) > 0:
+            try:
+                repo = get_github_repo()
+                futures.extend(executor.submit(fetch_github, id, repo) for id in issue_ids)
+            except Exception as e:
+                logger.warning('Unable to get Github repository: %s' % e)
+        for future in futures:
+            future.result()
+    cache.save()
+
+
+def is_blocked(blocked_by):
     """Checks if a Github issue/Bugzilla bug is blocked or not."""
     try:
+        id, platforms = get_bug_id(blocked_by)
+        if platforms is not None and marker_os.get(OSHelper.get_os().value) not in platforms:
+            return False
+
+        cache = get_bug_cache()
+        status = cache.get(id)
+        if status is None:
+            status = _fetch_status(id)
+            if status is None:
+                logger.warning('Unable to get the status of %s, the test is not skipped.' % id)
+                return False
+            cache.set(id, status)
+            cache.save()
+
         if 'issue_' in id:
-            bug = get_github_issue(id).state
-            if bug is None:
-                return True
-            if bug.state == 'closed':
+            if status['state'] == 'closed':
                 return False
             else:
-                if OSHelper.get_os() in bug.title:
+                if OSHelper.get_os().value in status['title']:
                     return True
                 return False
         else:
-            bug = get_bugzilla_bug(id)
-            if bug is None:
-                return True
-            if bug.status in ['CLOSED', 'RESOLVED']:
+            if status['status'] in ['CLOSED', 'RESOLVED']:
                 return False
             else:
-                if bugzilla_os[OSHelper.get_os().value] == bug.op_sys or bug.platform in ['All', 'Unspecified']:
+                if bugzilla_os[OSHelper.get_os().value] == status['op_sys'] or \
+                        status['platform'] in ['All', 'Unspecified']:
                     return True
                 return False
     except BugManagerError as e:
@@ -3,27 +3,34 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import json
 import logging
 import os
+import queue
 import shutil
 import subprocess
-from distutils import dir_util
+import threading
 from distutils.spawn import find_executable
 from enum import Enum
 
 import mozversion
 from mozdownload import FactoryScraper, errors
-from mozinstall import install, get_binary
 from mozrunner import FirefoxRunner, errors as run_errors
 from mozprofile import Profile as MozProfile
+from src.core.api.finder.match_hints import clear_match_hints
 
 from src.core.api.os_helpers import OSHelper
+from src.core.util.arg_parser import parse_args
 from src.core.util.path_manager import PathManager
+from src.core.util.file_lock import file_lock
+from targets.firefox.firefox_app.fx_install_cache import InstallCache, get_channel
 
 from src.core.api.errors import APIHelperError
 
 logger = logging.getLogger(__name__)
 CHANNELS = ('beta', 'release', 'nightly', 'esr', 'dev')
+PROFILE_POOL_SIZE = 2
+_firefox_info_cache = {}
 
 default_preferences = {  # Don't automatically update the application
         'app.update.disabledForTesting': True,
@@ -83,6 +90,147 @@ class Profiles(str, Enum):
     DEFAULT = 'like_new'
 
 
+class ProfilePool(threading.Thread):
+    """Staged profiles prepared ahead of the tests that use them.
+
+    Each zipped profile is extracted once per run into a template directory, which is never handed out to Firefox.
+    Test profiles are clones of the templates: copy-on-write clones where the file system supports them, full copies
+    otherwise. Hard links are not used, since Firefox updates its databases in place and would change the template.
+
+    A background thread keeps up to size clones of each profile type ready, built while the current test runs.
+    """
+
+    def __init__(self, root: str, size: int):
+        threading.Thread.__init__(self, name='ProfilePool', daemon=True)
+        self.root = root
+        self.size = size
+        self._templates = {}
+        self._ready = {}
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def run(self):
+        while True:
+            profile_type = self._requests.get()
+            if profile_type is None:
+                return
+            try:
+                self._ready[profile_type].put(self._build(profile_type))
+            except Exception as e:
+                logger.debug('Unable to prepare %s profile: %s' % (profile_type.value, e))
+
+    def get(self, profile_type: Profiles, path: str) -> str:
+        """Moves a prepared profile to a test directory.
+
+        :param profile_type: Staged profile type.
+        :param path: Profile directory of the test, created by this method.
+        :return: Path of the profile.
+        """
+        with self._lock:
+            ready = self._ready.get(profile_type)
+            if ready is None:
+                ready = self._ready[profile_type] = queue.Queue()
+                for _ in range(self.size):
+                    self._requests.put(profile_type)
+        try:
+            profile_path = ready.get_nowait()
+            self._requests.put(profile_type)
+        except queue.Empty:
+            logger.debug('No prepared %s profile, creating it now.' % profile_type.value)
+            profile_path = self._build(profile_type)
+
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(profile_path, path)
+        return path
+
+    def stop(self):
+        """Stops the background thread and removes the templates and the unused profiles."""
+        self._requests.put(None)
+        self.join()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _build(self, profile_type: Profiles) -> str:
+        template = self._get_template(profile_type)
+        with self._lock:
+            self._count += 1
+            profile_path = os.path.join(self.root, 'pool', '%s_%s' % (profile_type.value, self._count))
+        os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+        _clone_tree(template, profile_path)
+        return profile_path
+
+    def _get_template(self, profile_type: Profiles) -> str:
+        """Returns the template of a profile type, extracting it on first use.
+
+        The template is extracted outside the lock, in a directory of its own, so callers needing other templates or
+        pool counters are not blocked by 7z. If two callers extract the same template, the first one published is kept.
+        """
+        with self._lock:
+            template = self._templates.get(profile_type)
+            if template is not None:
+                return template
+            self._count += 1
+            destination = os.path.join(self.root, 'templates', '%s_%s' % (profile_type.value, self._count))
+
+        template = _extract_profile(profile_type, destination)
+        with self._lock:
+            published = self._templates.setdefault(profile_type, template)
+        if published != template:
+            shutil.rmtree(destination, ignore_errors=True)
+        return published
+
+
+def _extract_profile(profile_type: Profiles, destination: str) -> str:
+    """Extracts a zipped profile of the source tree.
+
+    :param profile_type: Staged profile type.
+    :param destination: Directory where the profile is extracted.
+    :return: Path of the extracted profile.
+    """
+    staged_profiles = os.path.join(PathManager.get_module_dir(), 'targets', 'firefox', 'firefox_app', 'profiles')
+
+    sz_bin = find_executable('7z')
+    logger.debug('Using 7zip executable at "%s"' % sz_bin)
+
+    zipped_profile = os.path.join(staged_profiles, '%s.zip' % profile_type.value)
+
+    cmd = [sz_bin, 'x', '-y', '-bd', '-o%s' % destination, zipped_profile]
+    logger.debug('Unzipping profile with command "%s"' % ' '.join(cmd))
+    try:
+        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError as e:
+        logger.error('7zip failed: %s' % repr(e.output))
+        raise Exception('Unable to unzip profile.')
+    logger.debug('7zip succeeded: %s' % repr(output))
+
+    resource_fork_folder = os.path.join(destination, '__MACOSX')
+    if os.path.exists(resource_fork_folder):
+        shutil.rmtree(resource_fork_folder, ignore_errors=True)
+
+    return os.path.join(destination, profile_type.value)
+
+
+def _clone_tree(source: str, destination: str):
+    """Copies a directory, with copy-on-write clones of the files when the file system supports them."""
+    if OSHelper.is_linux():
+        cmd = ['cp', '-a', '--reflink=auto', source, destination]
+    elif OSHelper.is_mac():
+        cmd = ['cp', '-Rc', source, destination]
+    else:
+        cmd = None
+
+    if cmd is not None:
+        try:
+            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+            return
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.debug('Unable to clone profile, copying it instead: %s' % e)
+            shutil.rmtree(destination, ignore_errors=True)
+    shutil.copytree(source, destination)
+
+
 class FirefoxProfile:
     """Profile options available to tests.
 
@@ -92,50 +240,29 @@ class FirefoxProfile:
     """
 
     _profiles = []
+    _pool = None
 
     @staticmethod
     def _get_staged_profile(profile_name, path):
         """
-        Internal-only method used to extract a given profile.
+        Internal-only method used to create a test profile from the profile pool.
         :param profile_name:
         :param path:
         :return:
         """
-        staged_profiles = os.path.join(PathManager.get_module_dir(), 'targets', 'firefox', 'firefox_app', 'profiles')
-
-        sz_bin = find_executable('7z')
-        logger.debug('Using 7zip executable at "%s"' % sz_bin)
-
-        zipped_profile = os.path.join(staged_profiles, '%s.zip' % profile_name.value)
-
-        cmd = [sz_bin, 'x', '-y', '-bd', '-o%s' % staged_profiles, zipped_profile]
-        logger.debug('Unzipping profile with command "%s"' % ' '.join(cmd))
-        try:
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-        except subprocess.CalledProcessError as e:
-            logger.error('7zip failed: %s' % repr(e.output))
-            raise Exception('Unable to unzip profile.')
-        logger.debug('7zip succeeded: %s' % repr(output))
-
-        from_directory = os.path.join(staged_profiles, profile_name.value)
-        to_directory = path
-        logger.debug('Creating new profile: %s' % to_directory)
-
-        dir_util.copy_tree(from_directory, to_directory)
-
-        try:
-            shutil.rmtree(from_directory)
-        except WindowsError:
-            logger.debug('Error, can\'t remove orphaned directory, leaving in place.')
-
-        resource_fork_folder = os.path.join(staged_profiles, '__MACOSX')
-        if os.path.exists(resource_fork_folder):
-            try:
-                shutil.rmtree(resource_fork_folder)
-            except WindowsError:
-                logger.debug('Error, can\'t remove orphaned directory, leaving in place.')
+        if FirefoxProfile._pool is None:
+            FirefoxProfile._pool = ProfilePool(os.path.join(PathManager.get_current_run_dir(), 'profile_cache'),
+                                               PROFILE_POOL_SIZE)
+            FirefoxProfile._pool.start()
+        logger.debug('Creating new profile: %s' % path)
+        return FirefoxProfile._pool.get(profile_name, path)
 
-        return to_directory
+    @staticmethod
+    def close_pool():
+        """Stops preparing profiles and removes the profile templates of the run."""
+        if FirefoxProfile._pool is not None:
+            FirefoxProfile._pool.stop()
+            FirefoxProfile._pool = None
 
     @staticmethod
     def make_profile(profile_type: Profiles = None, preferences: dict = None):
@@ -192,9 +319,19 @@ class FirefoxApp:
         self.path = path
         self.channel = get_firefox_channel(path)
         self.version = get_firefox_version(path)
-        self.latest_version = get_firefox_latest_version(path)
         self.build_id = get_firefox_build_id(path)
         self.locale = locale
+        self._latest_version = None
+
+    @property
+    def latest_version(self) -> str or None:
+        """Latest available version of the Firefox channel, looked up online on first access."""
+        if self._latest_version is None and not parse_args().offline:
+            try:
+                self._latest_version = get_firefox_latest_version(self.path)
+            except Exception as e:
+                logger.warning('Unable to get the latest Firefox version: %s' % e)
+        return self._latest_version
 
     def __str__(self):
         return '(path: {}, channel: {}, version: {}, build: {}, locale: {})'.format(self.path,
@@ -247,13 +384,15 @@ class FXRunner:
             raise APIHelperError('Error creating Firefox runner.')
 
     def start(self):
+        clear_match_hints()
         self.runner.start()
 
 
 def get_test_candidate(version: str, locale: str) -> str or None:
     """Download and extract a build candidate.
 
-    Build may either refer to a Firefox release identifier, package, or build directory.
+    Build may either refer to a Firefox release identifier, package, or build directory. Builds are installed once in
+    the install cache of the working directory. In offline mode, the newest cached build matching the version is used.
     :param: build: str with firefox build
     :return: Installation path for the Firefox App
     """
@@ -262,22 +401,25 @@ def get_test_candidate(version: str, locale: str) -> str or None:
         candidate = PathManager.get_local_firefox_path()
         if candidate is None:
             logger.critical('Firefox not found. Please download if from https://www.mozilla.org/en-US/firefox/new/')
-    else:
-        try:
-            s_t, s_d = get_scraper_details(version, CHANNELS,
-                                           os.path.join(PathManager.get_working_dir(), 'cache'), locale)
+        return candidate
+
+    workdir = PathManager.get_root_working_dir()
+    install_cache = InstallCache(os.path.join(workdir, 'cache', 'installs'))
+    if parse_args().offline:
+        candidate = install_cache.find_latest(version, locale)
+        if candidate is None:
+            logger.critical('No cached build found for {} in offline mode. Closing Iris ...'.format(version))
+        return candidate
 
-            scraper = FactoryScraper(s_t, **s_d)
-            firefox_dmg = scraper.download()
+    try:
+        s_t, s_d = get_scraper_details(version, CHANNELS, os.path.join(workdir, 'cache'), locale)
 
-            install_dir = install(src=firefox_dmg,
-                                  dest=os.path.join(PathManager.get_current_run_dir(),
-                                                    'firefox{}{}'.format(normalize_str(version),
-                                                                         normalize_str(locale))))
+        scraper = FactoryScraper(s_t, **s_d)
+        firefox_dmg = scraper.download()
 
-            return get_binary(install_dir, 'Firefox')
-        except errors.NotFoundError:
-            logger.critical('Specified build {} has not been found. Closing Iris ...'.format(version))
+        return install_cache.install(firefox_dmg, locale)
+    except errors.NotFoundError:
+        logger.critical('Specified build {} has not been found. Closing Iris ...'.format(version))
     return None
 
 
@@ -404,20 +546,14 @@ def get_firefox_channel(build_path: str) -> str or None:
     if build_path is None:
         return None
 
-    fx_channel = get_firefox_info(build_path)['application_repository']
-    if 'beta' in fx_channel:
-        return 'beta'
-    elif 'release' in fx_channel:
-        return 'release'
-    elif 'esr' in fx_channel:
-        return 'esr'
-    else:
-        return 'nightly'
+    return get_channel(get_firefox_info(build_path)['application_repository'])
 
 
-def get_firefox_info(build_path: str) -> str or None:
+def get_firefox_info(build_path: str) -> dict or None:
     """Returns the application version information as a dict with the help of mozversion library.
 
+    Information is read once per binary and cached on disk, keyed by binary path and modification time.
+
     :param build_path: Path to the binary for the application or Android APK
     file.
     """
@@ -426,7 +562,52 @@ def get_firefox_info(build_path: str) -> str or None:
 
     # import mozlog
     # mozlog.commandline.setup_logging('mozversion', None, {})
-    return mozversion.get_version(binary=build_path)
+    build_path = os.path.realpath(build_path)
+    try:
+        mtime = os.path.getmtime(build_path)
+    except OSError:
+        return mozversion.get_version(binary=build_path)
+
+    cached = _firefox_info_cache.get(build_path)
+    if cached is None:
+        cached = _load_firefox_info_cache().get(build_path)
+    if cached is None or cached['mtime'] != mtime:
+        logger.debug('Reading Firefox build information: %s' % build_path)
+        cached = {'mtime': mtime, 'info': mozversion.get_version(binary=build_path)}
+        _save_firefox_info(build_path, cached)
+    _firefox_info_cache[build_path] = cached
+    return cached['info']
+
+
+def _get_firefox_info_file() -> str:
+    return os.path.join(PathManager.get_root_working_dir(), 'data', 'firefox_info.json')
+
+
+def _load_firefox_info_cache() -> dict:
+    try:
+        with open(_get_firefox_info_file(), 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def _save_firefox_info(build_path: str, cached: dict):
+    """Adds the build information of a binary to the disk cache, replacing the cache file atomically.
+
+    The cache file is read and written under a file lock, so shard workers saving at the same time keep each other's
+    entries.
+    """
+    info_file = _get_firefox_info_file()
+    try:
+        with file_lock(info_file + '.lock'):
+            file_data = _load_firefox_info_cache()
+            file_data[build_path] = cached
+            temp_file = '%s.%s.tmp' % (info_file, os.getpid())
+            with open(temp_file, 'w') as f:
+                json.dump(file_data, f, sort_keys=True, indent=True)
+            os.replace(temp_file, info_file)
+    except (IOError, OSError) as e:
+        logger.debug('Unable to save Firefox build information: %s' % e)
 
 
 def get_firefox_version(build_path: str) -> str or None:
@@ -0,0 +1,219 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import mozversion
+from mozinstall import install, get_binary
+
+logger = logging.getLogger(__name__)
+
+INSTALL_CACHE_BUDGET = 5 * 1024 ** 3
+EVICTION_GRACE_PERIOD = 12 * 60 * 60
+METADATA_FILE = 'install.json'
+CHANNEL_OPTIONS = {'latest': 'release', 'release': 'release', 'latest-beta': 'beta', 'beta': 'beta',
+                   'latest-esr': 'esr', 'esr': 'esr', 'nightly': 'nightly'}
+
+
+def get_channel(application_repository: str) -> str:
+    """Returns the Firefox channel of a build from its application repository.
+
+    The channel is read from the last segment of the repository path, like mozilla-beta in
+    https://hg.mozilla.org/releases/mozilla-beta, since ESR repositories are also under releases/.
+    """
+    repository = application_repository.rstrip('/').rsplit('/', 1)[-1]
+    if repository.startswith('mozilla-esr'):
+        return 'esr'
+    elif repository == 'mozilla-beta':
+        return 'beta'
+    elif repository == 'mozilla-release':
+        return 'release'
+    else:
+        return 'nightly'
+
+
+def get_file_checksum(path: str) -> str:
+    """Returns the SHA-256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InstallCache:
+    """Firefox builds installed once and shared by all the runs and shard workers of a working directory.
+
+    Each build is installed in a directory named after its version, locale and installer checksum. Builds are
+    installed in a temporary directory, which is renamed when complete, so a build directory with its metadata file is
+    always a complete installation. The least recently used builds are removed when the cache exceeds its disk budget.
+    """
+
+    def __init__(self, root: str, budget: int = INSTALL_CACHE_BUDGET):
+        self.root = root
+        self.budget = budget
+
+    def install(self, installer: str, locale: str) -> str:
+        """Returns the binary of an installer build, installing it if it is not in the cache.
+
+        :param installer: Path to the downloaded installer.
+        :param locale: Locale of the build.
+        :return: Path to the Firefox binary.
+        """
+        checksum = get_file_checksum(installer)
+        entry = self._find(lambda metadata: metadata['checksum'] == checksum and metadata['locale'] == locale)
+        if entry is None:
+            entry = self._install(installer, locale, checksum)
+        else:
+            logger.debug('Using cached Firefox build: %s' % entry)
+        self._touch(entry)
+        self.evict()
+        return self._get_binary(entry)
+
+    def find_latest(self, version: str, locale: str) -> str or None:
+        """Returns the binary of the newest cached build matching a version or release option, without network access.
+
+        :param version: Firefox version, like 65.0b3, or release option, like nightly or latest-beta.
+        :param locale: Locale of the build.
+        :return: Path to the Firefox binary, or None if no cached build matches.
+        """
+        channel = CHANNEL_OPTIONS.get(version)
+        if channel is not None:
+            matches = self._list(lambda metadata: metadata['locale'] == locale)
+            matches = [match for match in matches if self._get_channel(*match) == channel]
+        else:
+            matches = self._list(lambda metadata: metadata['version'] == version and metadata['locale'] == locale)
+        if len(matches) == 0:
+            return None
+        entry = max(matches, key=lambda match: match[1]['build_id'])[0]
+        logger.info('Using cached Firefox build for %s: %s' % (version, entry))
+        self._touch(entry)
+        return self._get_binary(entry)
+
+    def evict(self):
+        """Removes the least recently used builds until the cache fits its disk budget. Builds used during the grace
+        period are kept, since other workers may still be running them."""
+        entries = self._list()
+        total_size = sum(metadata['size'] for entry, metadata in entries)
+        entries.sort(key=lambda match: self._get_last_use(match[0]))
+        for entry, metadata in entries:
+            if total_size <= self.budget:
+                break
+            if time.time() - self._get_last_use(entry) < EVICTION_GRACE_PERIOD:
+                continue
+            logger.debug('Removing cached Firefox build: %s' % entry)
+            try:
+                os.remove(os.path.join(entry, METADATA_FILE))
+            except OSError:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= metadata['size']
+
+    def _install(self, installer: str, locale: str, checksum: str) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        temp_dir = os.path.join(self.root, '.tmp-%s' % uuid.uuid4().hex)
+        logger.info('Installing Firefox build %s' % installer)
+        try:
+            install_dir = install(src=installer, dest=temp_dir)
+            info = mozversion.get_version(binary=get_binary(install_dir, 'Firefox'))
+            metadata = {'version': info['application_version'],
+                        'build_id': info['platform_buildid'],
+                        'channel': get_channel(info['application_repository']),
+                        'application_repository': info['application_repository'],
+                        'locale': locale,
+                        'checksum': checksum,
+                        'installer': os.path.basename(installer),
+                        'install_dir': os.path.relpath(install_dir, temp_dir),
+                        'size': _get_tree_size(temp_dir)}
+            with open(os.path.join(temp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, sort_keys=True, indent=True)
+
+            entry = os.path.join(self.root, '%s-%s-%s' % (metadata['version'], locale, checksum[:16]))
+            if os.path.exists(entry) and not os.path.exists(os.path.join(entry, METADATA_FILE)):
+                shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.rename(temp_dir, entry)
+            except OSError:
+                if not os.path.exists(os.path.join(entry, METADATA_FILE)):
+                    raise
+                logger.debug('Firefox build installed by another worker: %s' % entry)
+            return entry
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _list(self, condition=None) -> list:
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            try:
+                with open(os.path.join(entry, METADATA_FILE), 'r') as f:
+                    metadata = json.load(f)
+            except (IOError, ValueError):
+                continue
+            if condition is None or condition(metadata):
+                entries.append((entry, metadata))
+        return entries
+
+    def _get_channel(self, entry: str, metadata: dict) -> str:
+        """Returns the channel of a cached build. Builds cached before the application repository was saved may have a
+        wrong channel, so it is read again from the build and saved in their metadata."""
+        if 'application_repository' not in metadata:
+            try:
+                info = mozversion.get_version(binary=self._get_binary(entry))
+            except Exception as e:
+                logger.debug('Unable to read the channel of cached Firefox build %s: %s' % (entry, e))
+                return metadata['channel']
+            metadata['application_repository'] = info['application_repository']
+            metadata['channel'] = get_channel(info['application_repository'])
+            temp_file = os.path.join(entry, '%s.%s.tmp' % (METADATA_FILE, os.getpid()))
+            try:
+                with open(temp_file, 'w') as f:
+                    json.dump(metadata, f, sort_keys=True, indent=True)
+                os.replace(temp_file, os.path.join(entry, METADATA_FILE))
+            except (IOError, OSError) as e:
+                logger.debug('Unable to update cached Firefox build metadata %s: %s' % (entry, e))
+        return metadata['channel']
+
+    def _find(self, condition) -> str or None:
+        entries = self._list(condition)
+        return entries[0][0] if len(entries) > 0 else None
+
+    @staticmethod
+    def _get_binary(entry: str) -> str:
+        with open(os.path.join(entry, METADATA_FILE), 'r') as f:
+            metadata = json.load(f)
+        return get_binary(os.path.join(entry, metadata['install_dir']), 'Firefox')
+
+    @staticmethod
+    def _touch(entry: str):
+        try:
+            os.utime(os.path.join(entry, METADATA_FILE))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _get_last_use(entry: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(entry, METADATA_FILE))
+        except OSError:
+            return 0
+
+
+def _get_tree_size(path: str) -> int:
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
@@ -7,6 +7,7 @@ import logging
 import time
 
 from src.core.api.errors import APIHelperError, FindError
+from src.core.api.finder.match_hints import clear_match_hints
 from src.core.api.finder.pattern import Pattern
 from src.core.api.keyboard.key import KeyModifier, Key
 from src.core.api.keyboard.keyboard_api import key_down, key_up, type
@@ -403,6 +404,7 @@ def full_screen():
         type(text='f', modifier=[KeyModifier.CMD, KeyModifier.SHIFT])
     else:
         type(text=Key.F11)
+    clear_match_hints()
 
 
 def maximize_window():
@@ -434,6 +436,7 @@ def maximize_window():
     else:
         type(text=Key.UP, modifier=[KeyModifier.CTRL, KeyModifier.META])
     time.sleep(Settings.UI_DELAY)
+    clear_match_hints()
 
 
 def minimize_window():
@@ -445,6 +448,7 @@ def minimize_window():
     else:
         type(text=Key.DOWN, modifier=[KeyModifier.CTRL, KeyModifier.META])
     time.sleep(Settings.UI_DELAY)
+    clear_match_hints()
 
 
 def new_tab():
@@ -493,6 +497,7 @@ def quit_firefox():
         type(text='w', modifier=[KeyModifier.CTRL, KeyModifier.SHIFT])
     else:
         type(text='q', modifier=KeyModifier.CTRL)
+    clear_match_hints()
 
 
 def select_tab(num):
@@ -6,7 +6,7 @@ import argparse
 import logging
 import os
 
-from src.core.util.arg_parser import parse_args as global_args
+from src.core.util.arg_parser import add_run_arguments, parse_args as global_args
 
 
 logger = logging.getLogger(__name__)
@@ -90,6 +90,7 @@ def parse_args():
     parser.add_argument('-r', '--report',
                         help='Report tests to TestRail',
                         action='store_true')
+    add_run_arguments(parser)
     parser.add_argument('-w', '--workdir',
                         help='Path to working directory',
                         type=os.path.abspath,
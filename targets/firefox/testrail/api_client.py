@@ -4,17 +4,40 @@
 
 
 import base64
+import http.client
 import json
-from urllib import request, error
+import logging
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
 
 from targets.firefox.errors import TestRailError
 
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+RETRY_BACKOFF = 1.0
+REQUEST_TIMEOUT = 60
+
 
 class APIClient:
-    def __init__(self, url: str):
+    """TestRail API client.
+
+    Each thread keeps one keep-alive connection to the server. Requests rejected with HTTP 429 are retried after the
+    Retry-After delay of the response, or with an exponential backoff.
+
+    In dry-run mode, POST requests are counted but not sent.
+    """
+
+    def __init__(self, url: str, dry_run: bool = False):
         self.user = ''
         self.password = ''
+        self.dry_run = dry_run
+        self.request_counts = Counter()
         self.__url = url
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
 
     def send_get(self, uri: str):
 
@@ -33,6 +56,27 @@ class APIClient:
         """
         return self.__send_request('POST', uri, data)
 
+    def log_request_counts(self):
+        logger.info('TestRail requests%s: %s GET, %s POST, %s retried.'
+                    % (' (dry run)' if self.dry_run else '', self.request_counts['GET'], self.request_counts['POST'],
+                       self.request_counts['retried']))
+
+    def __count(self, key: str):
+        with self.__lock:
+            self.request_counts[key] += 1
+
+    def __get_connection(self, reconnect: bool = False):
+        connection = getattr(self.__local, 'connection', None)
+        if connection is not None and not reconnect:
+            return connection
+        if connection is not None:
+            connection.close()
+        url = urlsplit(self.__url)
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(url.netloc, timeout=REQUEST_TIMEOUT)
+        self.__local.connection = connection
+        return connection
+
     def __send_request(self, method: str, uri: str, payload: str = None):
 
         """
@@ -41,27 +85,48 @@ class APIClient:
         :param payload: JsonObject submitted on the POST request
         :return: response Object
         """
-        url = self.__url + uri
+        self.__count(method)
+        if method == 'POST' and self.dry_run:
+            logger.debug('Dry run, skipping POST %s' % uri)
+            return {}
+
+        url = urlsplit(self.__url + uri)
+        path = '%s?%s' % (url.path, url.query) if url.query else url.path
+        auth = base64.b64encode(('%s:%s' % (self.user, self.password)).encode('utf-8')).decode('ascii')
+        headers = {'Authorization': 'Basic %s' % auth, 'Content-Type': 'application/json'}
+        body = json.dumps(payload).encode('utf-8') if method == 'POST' else None
+
+        for attempt in range(MAX_RETRIES + 1):
+            status, retry_after, response = self.__send_once(method, path, body, headers)
+            if status != 429 or attempt == MAX_RETRIES:
+                break
+            delay = retry_after if retry_after is not None else RETRY_BACKOFF * 2 ** attempt
+            logger.debug('TestRail rate limit reached, retrying %s %s in %s seconds.' % (method, uri, delay))
+            self.__count('retried')
+            time.sleep(delay)
 
-        if method == 'POST':
-            api_request = request.Request(url, data=json.dumps(payload))
-        else:
-            api_request = request.Request(url)
-        auth = base64.b64encode('%s:%s' % (self.user, self.password))
+        if status >= 400:
+            raise TestRailError('TestRail API returned HTTP %s (%s)' % (status, response))
+        if response:
+            return json.loads(response.decode('utf-8'))
+        return {}
 
-        api_request.add_header('Authorization', 'Basic %s' % auth)
-        api_request.add_header('Content-Type', 'application/json')
+    def __send_once(self, method: str, path: str, body, headers: dict) -> tuple:
+        """Sends a request on the connection of the current thread, reconnecting once if the server closed it."""
+        for reconnect in (False, True):
+            connection = self.__get_connection(reconnect)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError) as e:
+                if reconnect:
+                    raise TestRailError('TestRail API request failed: %s' % e)
 
+        retry_after = response.getheader('Retry-After')
         try:
-            response = request.urlopen(api_request).read()
-        except error.HTTPError as e:
-            response = e.read()
-            raise TestRailError('TestRail API returned HTTP %s (%s)' %
-                                (e.code, response))
-        else:
-            if response:
-                result = json.loads(response)
-            else:
-                result = {}
-
-        return result
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+        return response.status, retry_after, data
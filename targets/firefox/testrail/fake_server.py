@@ -0,0 +1,154 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+logger = logging.getLogger(__name__)
+
+API_PATH = '/index.php?/api/v2/'
+
+
+class FakeTestRailServer:
+    """Local server answering the TestRail API requests used by the TestRail client.
+
+    Projects, suites and runs are kept in memory, created plans add runs, and every request is recorded in requests as
+    (method, endpoint, payload) tuples, with the client port of its connection in connections. The first rate_limited
+    requests are answered with HTTP 429, to exercise the client retries.
+
+    Usage:
+        with FakeTestRailServer() as server:
+            client = APIClient(server.url)
+    """
+
+    def __init__(self, projects: list = None, suites: dict = None, rate_limited: int = 0, port: int = 0):
+        """
+        :param projects: List of project dicts, with id and name.
+        :param suites: Dict of the suite lists of each project id.
+        :param rate_limited: Number of requests answered with HTTP 429.
+        :param port: Port of the server, 0 for a free port.
+        """
+        self.projects = projects if projects is not None else [{'id': 1, 'name': 'Firefox Desktop'}]
+        self.suites = suites if suites is not None else {}
+        self.runs = {}
+        self.results = {}
+        self.requests = []
+        self.connections = []
+        self.rate_limited = rate_limited
+        self.lock = threading.Lock()
+        self._next_id = 1
+        self._server = _ThreadingHTTPServer(('127.0.0.1', port), _FakeTestRailHandler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return 'http://127.0.0.1:%s%s' % (self._server.server_address[1], API_PATH)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='FakeTestRailServer', daemon=True)
+        self._thread.start()
+        logger.debug('Fake TestRail server running on %s' % self.url)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def handle(self, method: str, endpoint: str, payload, client_port: int = None) -> tuple:
+        """Returns the HTTP status and the response of a request."""
+        with self.lock:
+            self.requests.append((method, endpoint, payload))
+            self.connections.append(client_port)
+            if self.rate_limited > 0:
+                self.rate_limited -= 1
+                return 429, {'error': 'API rate limit exceeded'}
+
+            match = re.match(r'(\w+)(?:/(\d+))?$', endpoint)
+            if match is None:
+                return 400, {'error': 'Unknown endpoint %s' % endpoint}
+            name, item_id = match.group(1), int(match.group(2)) if match.group(2) else None
+
+            if method == 'GET' and name == 'get_projects':
+                return 200, self.projects
+            if method == 'GET' and name == 'get_suites':
+                return 200, self.suites.get(item_id, [])
+            if method == 'GET' and name == 'get_runs':
+                return 200, [run for run in self.runs.values() if run['project_id'] == item_id]
+            if method == 'GET' and name == 'get_tests':
+                return 200, [{'case_id': result['case_id'], 'status_id': result['status_id']}
+                             for result in self.results.get(item_id, [])]
+            if method == 'POST' and name == 'add_plan':
+                entries = []
+                for entry in payload.get('entries', []):
+                    run = {'id': self._get_id(), 'name': entry.get('name'), 'project_id': item_id,
+                           'suite_id': entry.get('suite_id')}
+                    self.runs[run['id']] = run
+                    entries.append({'suite_id': entry.get('suite_id'), 'runs': [run]})
+                return 200, {'id': self._get_id(), 'name': payload.get('name'), 'entries': entries}
+            if method == 'POST' and name == 'add_results_for_cases':
+                if item_id not in self.runs:
+                    return 400, {'error': 'Unknown run %s' % item_id}
+                results = payload.get('results', [])
+                self.results.setdefault(item_id, []).extend(results)
+                return 200, [dict(result, id=self._get_id(), test_id=result.get('case_id')) for result in results]
+            return 400, {'error': 'Unknown endpoint %s' % endpoint}
+
+    def _get_id(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _FakeTestRailHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._respond('GET', None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length > 0 else b''
+        try:
+            payload = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            self._send(400, {'error': 'Invalid JSON'})
+            return
+        self._respond('POST', payload)
+
+    def _respond(self, method: str, payload):
+        if not self.path.startswith(API_PATH):
+            self._send(404, {'error': 'Not found'})
+            return
+        status, response = self.server.fake.handle(method, self.path[len(API_PATH):], payload, self.client_address[1])
+        self._send(status, response)
+
+    def _send(self, status: int, response):
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format_arg, *args):
+        logger.debug(format_arg % args)
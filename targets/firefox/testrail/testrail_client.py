@@ -4,34 +4,48 @@
 
 
 import ast
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
-from src.configuration.config_parser import get_config_property, logger
-from src.core.api.errors import TestRailError
+from src.configuration.config_parser import get_config_property
 from src.core.api.os_helpers import OSHelper
 from src.core.util.report_utils import Color
-from targets.firefox.test_rail import api_client
-from targets.firefox.test_rail.testcase_results import TestSuiteMap, TestRailTests
+from targets.firefox.errors import TestRailError
+from targets.firefox.testrail import api_client
+from targets.firefox.testrail.testcase_results import TestSuiteMap, TestRailTests
+
+logger = logging.getLogger(__name__)
+
+RESULTS_CHUNK_SIZE = 100
+RESULTS_WORKERS = 4
 
 
 class TestRail:
     project_name = 'Firefox Desktop'
     run_name = ''
 
-    def __init__(self):
+    def __init__(self, dry_run: bool = False):
+        """
+        :param dry_run: If True, results are not sent to TestRail, only the requests are counted.
+        """
         logger.info('Starting TestRail reporting.')
         self.test_rail_url = get_config_property('Test_rail', 'test_rail_url')
-        self.client = api_client.APIClient(self.test_rail_url)
+        self.client = api_client.APIClient(self.test_rail_url, dry_run)
         self.client.user = get_config_property('Test_rail', 'username')
         self.client.password = get_config_property('Test_rail', 'password')
+        self._projects = None
+        self._runs = {}
+        self._suites = {}
 
     def get_all_projects(self):
         """Retrieve all projects from Test_Rail."""
-        try:
-            projects = self.client.send_get('get_projects')
-        except Exception:
-            raise TestRailError("No projects found")
-        return projects
+        if self._projects is None:
+            try:
+                self._projects = self.client.send_get('get_projects')
+            except Exception:
+                raise TestRailError("No projects found")
+        return self._projects
 
     def get_project_id(self, project_name: str):
         """Retrieve project from Test_Rail based on project name.
@@ -39,15 +53,36 @@ class TestRail:
         :param project_name:  name of TestRail Project (Ex. Firefox Desktop)
         :return: Id of the Project
         """
-        project_id = None
-        projects = self.get_all_projects()
-        for project in projects:
+        for project in self.get_all_projects():
             if project['name'] == project_name:
-                project_id = project['id']
-                break
-            else:
-                continue
-        return project_id
+                return project['id']
+        return None
+
+    def get_all_suites(self, project_name: str):
+        """Retrieve all suites from a specific project.
+
+        :param project_name: name of TestRail Project (Ex. Firefox Desktop)
+        :return: a list of test suites from a project
+        """
+        project_id = self.get_project_id(project_name)
+        if project_id not in self._suites:
+            try:
+                self._suites[project_id] = self.client.send_get('get_suites/%s' % project_id)
+            except Exception:
+                raise TestRailError('Error: no suites found in this specific project %s' % project_name)
+        return self._suites[project_id]
+
+    def get_suite_id(self, project_name: str, suite_name: str):
+        """Return a specific suite id based on project name.
+
+        :param project_name:  name of TestRail Project (Ex. Firefox Desktop)
+        :param suite_name:  name of TestRail suite (Ex. Bookmarks, History)
+        :return: Id of the suite
+        """
+        for suite in self.get_all_suites(project_name):
+            if suite['name'] == suite_name:
+                return suite['id']
+        return None
 
     def get_all_runs(self, project_name: str):
         """Retrieve all runs from a specific project.
@@ -56,12 +91,12 @@ class TestRail:
         :return: a list of test runs from a project
         """
         project_id = self.get_project_id(project_name)
-        try:
-            test_runs = self.client.send_get('get_runs/%s' % project_id)
-        except Exception:
-            raise TestRailError('Error: no runs found in this specific project %s' % project_name)
-        else:
-            return test_runs
+        if project_id not in self._runs:
+            try:
+                self._runs[project_id] = self.client.send_get('get_runs/%s' % project_id)
+            except Exception:
+                raise TestRailError('Error: no runs found in this specific project %s' % project_name)
+        return self._runs[project_id]
 
     def get_specific_run_id(self, project_name, test_run_name):
         """Return a specific run id based on project name.
@@ -70,13 +105,11 @@ class TestRail:
         :param test_run_name:  name of TestRail test run (Bx. Bookmarks, History)
         :return: Id of the Test Run (Ex 17,34)
         """
-        test_runs = self.get_all_runs(project_name)
-        for test_run in test_runs:
+        for test_run in self.get_all_runs(project_name):
             if test_run['name'] == test_run_name:
-                run_id = test_run['id']
-                return run_id
-            else:
-                logger.error('Test run not found: %s', test_run_name)
+                return test_run['id']
+        logger.error('Test run not found: %s', test_run_name)
+        return None
 
     def get_tests_from_run(self, project_name: str, test_run_name: str):
         """Get all tests from a specific run.
@@ -128,28 +161,31 @@ class TestRail:
             test_plan_api_response = self.client.send_post('add_plan/%s' % project_id, payload)
         except Exception:
             raise TestRailError('Failed to create Test Rail Test Plan')
-
+        if self.client.dry_run:
+            test_plan_api_response = {'entries': [{'runs': [{'id': 0, 'name': entry['name']}]}
+                                                  for entry in data_array]}
         else:
             logger.info('Test plan %s was successfully created' % self.run_name)
-            entries_list = test_plan_api_response.get('entries')
-            test_run_list = []
-            if isinstance(entries_list, list):
-                for test_run_entry in entries_list:
-                    run = test_run_entry
-                    if isinstance(run, dict):
-                        run_object_list = run.get('runs')
-                        if isinstance(run_object_list, list):
-                            for run_object in run_object_list:
-                                test_run = run_object
-                                test_run_list.append(test_run)
-                        else:
-                            raise TestRailError('Invalid object format')
+
+        entries_list = test_plan_api_response.get('entries')
+        test_run_list = []
+        if isinstance(entries_list, list):
+            for test_run_entry in entries_list:
+                run = test_run_entry
+                if isinstance(run, dict):
+                    run_object_list = run.get('runs')
+                    if isinstance(run_object_list, list):
+                        for run_object in run_object_list:
+                            test_run = run_object
+                            test_run_list.append(test_run)
                     else:
                         raise TestRailError('Invalid object format')
-            else:
-                raise TestRailError('Invalid API Response format')
+                else:
+                    raise TestRailError('Invalid object format')
+        else:
+            raise TestRailError('Invalid API Response format')
 
-            self.add_test_results(test_run_list, suite_runs)
+        self.add_test_results(test_run_list, suite_runs)
 
     def add_test_results(self, test_run_list: list, suite_runs: list):
         """
@@ -160,7 +196,10 @@ class TestRail:
         status_id = 1 for Passed
         status_id = 5 for Failed
         status_id = 2 for Blocked
+
+        Results are sent in chunks of RESULTS_CHUNK_SIZE, concurrently.
         """
+        chunks = []
         for run in test_run_list:
             if isinstance(run, dict):
                 run_id = run.get('id')
@@ -169,7 +208,6 @@ class TestRail:
                 break
             for suite in suite_runs:
                 object_list = []
-                results = {}
                 if isinstance(suite, TestSuiteMap):
                     if suite.suite_name in run.get('name'):
                         suite_id_tests = suite.test_results_list
@@ -196,24 +234,30 @@ class TestRail:
                             payload['comment'] = complete_test_assert
                             payload['case_id'] = test.test_case_id
                             object_list.append(payload)
-                            results['results'] = object_list
-
-                        if run_id is not None:
-                            try:
-                                self.client.send_post('add_results_for_cases/%s' % run_id, results)
-                            except Exception:
-                                raise TestRailError('Failed to Update Test_Rail run %s', run.get('name'))
 
-                            else:
-                                logger.info(
-                                    'Successfully added test results in test run name: %s' % run.get('name'))
-                        else:
+                        if run_id is None:
                             raise TestRailError('Invalid run_id')
+                        for index in range(0, len(object_list), RESULTS_CHUNK_SIZE):
+                            chunks.append((run, {'results': object_list[index:index + RESULTS_CHUNK_SIZE]}))
                     else:
                         continue
                 else:
                     raise TestRailError('Invalid API Response')
 
+        with ThreadPoolExecutor(max_workers=RESULTS_WORKERS) as executor:
+            futures = [(run, results, executor.submit(self._add_results, run, results)) for run, results in chunks]
+            for run, results, future in futures:
+                future.result()
+                logger.info('Successfully added %s test results in test run name: %s'
+                            % (len(results['results']), run.get('name')))
+        self.client.log_request_counts()
+
+    def _add_results(self, run: dict, results: dict):
+        try:
+            self.client.send_post('add_results_for_cases/%s' % run.get('id'), results)
+        except Exception:
+            raise TestRailError('Failed to Update Test_Rail run %s' % run.get('name'))
+
     @staticmethod
     def generate_test_plan_name(firefox_version: str):
         """
@@ -264,7 +308,6 @@ class TestRail:
         return test_suite_array
 
 
-
 def report_test_results(test_case_results):
     """ PLACEHOLDER FOR Test Rail REPORT
            :param test_case_results: TEST RESULT SESSION
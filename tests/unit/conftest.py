@@ -0,0 +1,24 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Unit tests of the Iris modules that can run without a browser.
+
+Run them with: python -m pytest tests/unit
+"""
+
+import sys
+
+from src.core.util import arg_parser
+from targets.firefox import parse_args
+
+
+def pytest_configure(config):
+    # Iris modules read the Iris arguments when they are imported, parse the defaults instead of the pytest arguments.
+    argv = sys.argv
+    sys.argv = argv[:1]
+    try:
+        arg_parser.parse_args()
+        parse_args.parse_args()
+    finally:
+        sys.argv = argv
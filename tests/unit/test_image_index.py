@@ -0,0 +1,122 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import os
+
+import pytest
+
+from src.core.api.finder import image_index
+from src.core.api.finder.image_index import ImageIndex, parse_name
+from src.core.util.path_manager import PathManager
+
+IMAGES = [os.path.join('targets', 'firefox', 'images', 'common', 'home_button.png'),
+          os.path.join('targets', 'firefox', 'images', 'common', 'home_button@2x.png'),
+          os.path.join('targets', 'firefox', PathManager.get_images_path(), 'en-US', 'Menu_Icon.PNG'),
+          os.path.join('targets', 'firefox', PathManager.get_images_path(), 'fr', 'menu_icon.png'),
+          os.path.join('targets', 'nightly', 'images', 'common', 'home_button.png'),
+          os.path.join('targets', 'firefox', 'images', 'common', 'notes.txt'),
+          os.path.join('.git', 'images', 'common', 'ignored.png')]
+
+
+@pytest.fixture
+def root(tmp_path):
+    for image in IMAGES:
+        path = tmp_path.joinpath('iris', image)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return str(tmp_path / 'iris')
+
+
+def get_index(root: str) -> ImageIndex:
+    index = ImageIndex(root)
+    index.build()
+    return index
+
+
+def get_module_dir(root: str, target: str = 'firefox') -> str:
+    return os.path.join(root, 'targets', target)
+
+
+def get_relative_paths(root: str, images: list) -> list:
+    return sorted(os.path.relpath(image['path'], root) for image in images)
+
+
+def test_parse_name_reads_the_scale_factor():
+    assert parse_name('google_search@2x.png') == ('google_search.png', 2)
+    assert parse_name('amazon_logo@2.5x.png') == ('amazon_logo.png', 2.5)
+    assert parse_name('amazon_logo.png') == ('amazon_logo.png', 1)
+    assert parse_name('amazon_logo@big.png') == ('amazon_logo@big.png', 1)
+
+
+def test_images_are_indexed_by_folder_locale_and_scale(root):
+    index = get_index(root)
+    module_dir = get_module_dir(root)
+    platform_folder = PathManager.get_images_path().split(os.sep)[-1]
+
+    assert len(index.all_images) == 5
+    assert index.get(module_dir, 'common', '', 'home_button.png') == os.path.join(root, IMAGES[0])
+    assert index.get(module_dir, 'common', '', 'home_button@2x.png') == os.path.join(root, IMAGES[1])
+    assert index.get(module_dir, platform_folder, 'fr', 'menu_icon.png') == os.path.join(root, IMAGES[3])
+    assert index.get(module_dir, platform_folder, 'de', 'menu_icon.png') is None
+    assert get_relative_paths(root, index.find_by_name('home_button.png', 'firefox')) == sorted(IMAGES[:2])
+
+
+def test_image_names_are_case_sensitive_on_linux(root, monkeypatch):
+    monkeypatch.setattr(image_index, 'CASE_INSENSITIVE_NAMES', False)
+    index = get_index(root)
+    platform_folder = PathManager.get_images_path().split(os.sep)[-1]
+
+    assert index.get(get_module_dir(root), platform_folder, 'en-US', 'menu_icon.png') is None
+    assert index.get(get_module_dir(root), platform_folder, 'en-US', 'Menu_Icon.PNG') == os.path.join(root, IMAGES[2])
+
+
+def test_image_names_are_not_case_sensitive_on_windows_and_mac(root, monkeypatch):
+    monkeypatch.setattr(image_index, 'CASE_INSENSITIVE_NAMES', True)
+    index = get_index(root)
+    platform_folder = PathManager.get_images_path().split(os.sep)[-1]
+
+    assert index.get(get_module_dir(root), platform_folder, 'en-US', 'menu_icon.png') == os.path.join(root, IMAGES[2])
+    assert get_relative_paths(root, index.find_by_name('MENU_ICON.png', 'firefox')) == sorted(IMAGES[2:4])
+
+
+def test_saved_index_is_loaded_while_the_tree_is_unchanged(root, tmp_path):
+    index_file = str(tmp_path / 'image_index.json')
+    index = get_index(root)
+    index.save(index_file)
+
+    loaded = ImageIndex.load(root, index_file)
+    assert loaded.source == index_file
+    assert loaded.entries == index.entries
+    assert loaded.all_images == index.all_images
+
+
+def test_saved_index_is_rejected_when_out_of_date(root, tmp_path):
+    index_file = tmp_path / 'image_index.json'
+    get_index(root).save(str(index_file))
+    data = json.loads(index_file.read_text())
+
+    assert ImageIndex.load(os.path.join(root, 'targets'), str(index_file)) is None
+    index_file.write_text(json.dumps(dict(data, version=image_index.INDEX_VERSION - 1)))
+    assert ImageIndex.load(root, str(index_file)) is None
+    index_file.write_text(json.dumps(dict(data, tree_mtime=data['tree_mtime'] - 10)))
+    assert ImageIndex.load(root, str(index_file)) is None
+    index_file.write_text('{')
+    assert ImageIndex.load(root, str(index_file)) is None
+    assert ImageIndex.load(root, str(tmp_path / 'missing.json')) is None
+
+
+def test_saved_index_is_rejected_when_an_image_is_added(root, tmp_path):
+    index_file = str(tmp_path / 'image_index.json')
+    index = get_index(root)
+    # Older modification times, so that the new image changes the tree time on file systems with coarse times.
+    for directory in index.directories:
+        os.utime(directory, (0, 0))
+    index.save(index_file)
+    assert ImageIndex.load(root, index_file) is not None
+
+    open(os.path.join(get_module_dir(root), 'images', 'common', 'back_button.png'), 'wb').close()
+
+    assert ImageIndex.load(root, index_file) is None
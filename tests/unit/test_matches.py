@@ -0,0 +1,65 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import cv2
+import numpy as np
+
+from src.core.api.finder.matches import Matches, find_peaks, suppress_overlaps, to_matches
+
+NEEDLE_SHAPE = (10, 20)
+
+
+def get_positions(matches):
+    return [(int(match['x']), int(match['y'])) for match in matches]
+
+
+def test_find_peaks_keeps_one_point_per_maximum():
+    res = np.zeros((50, 80), dtype=np.float32)
+    res[10, 10] = 0.99
+    res[10, 11] = 0.98
+    res[11, 10] = 0.97
+    res[30, 60] = 0.95
+    res[40, 5] = 0.5
+
+    assert get_positions(find_peaks(res, 0.9, NEEDLE_SHAPE)) == [(10, 10), (60, 30)]
+    assert len(find_peaks(res, 0.999, NEEDLE_SHAPE)) == 0
+
+
+def test_suppress_overlaps_keeps_the_best_match_of_each_group():
+    matches = to_matches([10, 12, 11, 60, 100], [10, 11, 14, 30, 10], [0.95, 0.99, 0.97, 0.9, 0.92])
+    kept = suppress_overlaps(matches, NEEDLE_SHAPE, 10)
+
+    assert get_positions(kept) == [(100, 10), (12, 11), (60, 30)]
+    assert kept['score'].tolist() == np.float32([0.92, 0.99, 0.9]).tolist()
+
+
+def test_suppress_overlaps_keeps_the_best_max_matches():
+    matches = to_matches([0, 100, 200, 300], [0, 0, 0, 0], [0.91, 0.99, 0.93, 0.97])
+
+    assert get_positions(suppress_overlaps(matches, NEEDLE_SHAPE, 2)) == [(100, 0), (300, 0)]
+    assert len(suppress_overlaps(matches[:0], NEEDLE_SHAPE, 2)) == 0
+
+
+def test_repeated_icons_are_found_once_each():
+    rng = np.random.default_rng(0)
+    needle = (rng.random(NEEDLE_SHAPE) * 255).astype(np.uint8)
+    haystack = np.full((100, 200), 128, dtype=np.uint8)
+    positions = [(5, 5), (60, 5), (120, 40), (30, 70)]
+    for x, y in positions:
+        haystack[y:y + NEEDLE_SHAPE[0], x:x + NEEDLE_SHAPE[1]] = needle
+
+    res = cv2.matchTemplate(haystack, needle, cv2.TM_CCOEFF_NORMED)
+    kept = suppress_overlaps(find_peaks(res, 0.95, needle.shape), needle.shape, 100)
+
+    assert get_positions(kept) == sorted(positions, key=lambda position: (position[1], position[0]))
+
+
+def test_matches_build_offset_locations():
+    matches = Matches(to_matches([1, 2], [3, 4], [0.9, 0.8]), offset_x=100, offset_y=200)
+
+    assert len(matches) == 2
+    assert [(location.x, location.y) for location in matches.to_list()] == [(101, 203), (102, 204)]
+    assert (matches[1].x, matches[1].y) == (102, 204)
+    assert matches.scores == np.float32([0.9, 0.8]).tolist()
@@ -0,0 +1,143 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.util import json_utils, result_store
+from src.core.util.path_manager import PathManager
+from src.core.util.result_store import RESULT_STORE_FILE, RUN_FILE, ResultStore, export_unfinished_runs
+from src.core.util.run_index import RunIndex
+
+META = {'run_id': '20190101000000', 'start_time': 1000, 'end_time': None, 'locale': 'en-US',
+        'params': {'application': 'firefox'}}
+
+RESULTS = [('bookmarks/test_a', 'PASSED', 10, 1010.2), ('nav/back/test_b', 'FAILED', 20, 1030.7),
+           ('bookmarks/test_c', 'ERROR', 5, 1036.1), ('nav/test_d', 'SKIPPED', 0, 1036.2)]
+
+
+def get_test(path: str, result: str, duration: int) -> dict:
+    return {'name': path.split('/')[-1], 'result': result, 'time': duration}
+
+
+def add_results(store: ResultStore, monkeypatch):
+    for path, result, duration, finished in RESULTS:
+        monkeypatch.setattr(result_store, 'time', SimpleNamespace(time=lambda: finished))
+        store.add_result(path, get_test(path, result, duration))
+
+
+def create_run(runs_dir, run_id: str, monkeypatch, owner: bool = False) -> ResultStore:
+    run_dir = runs_dir / run_id
+    run_dir.mkdir(parents=True)
+    store = ResultStore(str(run_dir / RESULT_STORE_FILE), owner=owner)
+    store.set_meta(dict(META, run_id=run_id))
+    add_results(store, monkeypatch)
+    return store
+
+
+def read_run(runs_dir, run_id: str) -> dict:
+    return json.loads((runs_dir / run_id / RUN_FILE).read_text())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / RESULT_STORE_FILE))
+    yield store
+    store.close()
+
+
+def test_results_are_nested_by_directory(store, monkeypatch):
+    add_results(store, monkeypatch)
+
+    assert store.get_tree() == [
+        {'name': 'bookmarks', 'children': [get_test('test_a', 'PASSED', 10), get_test('test_c', 'ERROR', 5)]},
+        {'name': 'nav', 'children': [{'name': 'back', 'children': [get_test('test_b', 'FAILED', 20)]},
+                                     get_test('test_d', 'SKIPPED', 0)]}]
+    assert store.get_tree(only_failures=True) == [
+        {'name': 'nav', 'children': [{'name': 'back', 'children': [get_test('test_b', 'FAILED', 20)]}]},
+        {'name': 'bookmarks', 'children': [get_test('test_c', 'ERROR', 5)]}]
+    assert store.get_counts() == {'total': 4, 'passed': 1, 'failed': 1, 'skipped': 1, 'errors': 1}
+    assert store.get_results('nav/back/test_b') == [get_test('test_b', 'FAILED', 20)]
+    assert store.get_total_duration() == 35
+
+
+def test_finished_runs_keep_their_end_time(store, tmp_path, monkeypatch):
+    store.set_meta(dict(META, end_time=2000))
+    add_results(store, monkeypatch)
+    meta = store.export(str(tmp_path / RUN_FILE))
+
+    assert (meta['end_time'], meta['total_time']) == (2000, 1000)
+    assert json.loads((tmp_path / RUN_FILE).read_text())['meta'] == meta
+
+
+def test_crashed_runs_end_when_their_last_test_finished(store, tmp_path, monkeypatch):
+    store.set_meta(META)
+    add_results(store, monkeypatch)
+    meta = store.export(str(tmp_path / RUN_FILE))
+
+    assert (meta['end_time'], meta['total_time'], meta['failed'], meta['errors']) == (1036, 36, 1, 1)
+
+
+def test_runs_without_results_end_when_they_started(store, tmp_path):
+    store.set_meta(META)
+
+    assert store.export(str(tmp_path / RUN_FILE))['total_time'] == 0
+
+
+def test_stores_without_finish_times_are_upgraded(tmp_path):
+    path = str(tmp_path / RESULT_STORE_FILE)
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE tests (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, result TEXT, '
+                       'failed INTEGER, data TEXT)')
+    connection.execute('INSERT INTO tests (path, result, failed, data) VALUES (?, ?, ?, ?)',
+                       ('nav/test_d', 'PASSED', 0, json.dumps(get_test('test_d', 'PASSED', 3))))
+    connection.commit()
+    connection.close()
+
+    store = ResultStore(path)
+    try:
+        assert store.get_last_finish_time() is None
+        store.add_result('nav/test_e', get_test('test_e', 'PASSED', 4))
+        assert store.get_last_finish_time() is not None
+        assert store.get_counts()['total'] == 2
+    finally:
+        store.close()
+
+
+def test_only_crashed_runs_are_exported(tmp_path, monkeypatch):
+    runs_dir = tmp_path / 'runs'
+    create_run(runs_dir, '20190101000000', monkeypatch).close()
+    running = create_run(runs_dir, '20190102000000', monkeypatch, owner=True)
+    create_run(runs_dir, '20190103000000', monkeypatch).close()
+    (runs_dir / '20190103000000' / RUN_FILE).write_text('{}')
+    (runs_dir / '20190104000000').mkdir()
+    try:
+        exported = export_unfinished_runs(str(runs_dir))
+    finally:
+        running.close()
+
+    assert [(meta['run_id'], meta['end_time'], duration) for meta, duration in exported] == [
+        ('20190101000000', 1036, 35)]
+    assert read_run(runs_dir, '20190101000000')['meta']['total'] == 4
+    assert not (runs_dir / '20190102000000' / RUN_FILE).exists()
+    assert read_run(runs_dir, '20190103000000') == {}
+    assert export_unfinished_runs(str(runs_dir)) == [
+        (read_run(runs_dir, '20190102000000')['meta'], 35)]
+    assert export_unfinished_runs(str(tmp_path / 'missing')) == []
+
+
+def test_crashed_runs_are_added_to_the_run_index(tmp_path, monkeypatch):
+    index = RunIndex(str(tmp_path / 'data' / 'runs.jsonl'))
+    monkeypatch.setattr(json_utils, 'get_run_index', lambda: index)
+    monkeypatch.setattr(PathManager, 'get_working_dir', staticmethod(lambda: str(tmp_path)))
+    create_run(tmp_path / 'runs', '20190101000000', monkeypatch).close()
+
+    json_utils.recover_unfinished_runs()
+
+    assert index.get('20190101000000') == {'id': '20190101000000', 'target': 'firefox', 'locale': 'en-US',
+                                           'total': 4, 'failed': 2, 'duration': 35}
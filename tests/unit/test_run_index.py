@@ -0,0 +1,154 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+
+import pytest
+
+from src.control_center import commands
+from src.core.util import path_manager, run_index
+from src.core.util.path_manager import PathManager
+from src.core.util.run_index import RunIndex
+
+
+def get_run(run_id: str, failed: int = 0) -> dict:
+    return {'id': run_id, 'target': 'firefox', 'locale': 'en-US', 'total': 10, 'failed': failed, 'duration': 60}
+
+
+def get_ids(runs: list) -> list:
+    return [run['id'] for run in runs]
+
+
+def get_lines(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return tmp_path / 'data' / 'runs.jsonl'
+
+
+@pytest.fixture
+def index(index_path):
+    return RunIndex(str(index_path))
+
+
+def test_the_last_entry_of_a_run_wins(index, index_path):
+    index.put(get_run('20190101000000'))
+    index.put(get_run('20190102000000'))
+    index.put(get_run('20190101000000', failed=3))
+
+    assert index.count() == 2
+    assert index.get('20190101000000')['failed'] == 3
+    assert index.get('20190103000000') is None
+    assert len(get_lines(index_path)) == 3
+
+
+def test_deleted_runs_are_marked_in_the_index(index, index_path):
+    index.put(get_run('20190101000000'))
+
+    assert index.delete('20190101000000')
+    assert not index.delete('20190101000000')
+    assert index.get('20190101000000') is None
+    assert get_lines(index_path)[-1] == {'id': '20190101000000', 'deleted': True}
+
+
+def test_runs_are_paged_by_run_id(index):
+    for day in (3, 1, 4, 2, 5):
+        index.put(get_run('2019010%s000000' % day))
+
+    page = index.page(1, 2)
+    assert get_ids(page['runs']) == ['20190104000000', '20190103000000']
+    assert (page['total'], page['offset'], page['limit']) == (5, 1, 2)
+    assert get_ids(index.page(3, 10, newest_first=False)['runs']) == ['20190104000000', '20190105000000']
+    assert index.page(10, 10)['runs'] == []
+
+
+def test_readers_see_the_entries_of_other_writers(index, index_path):
+    reader = RunIndex(str(index_path))
+    assert reader.count() == 0
+
+    index.put(get_run('20190101000000'))
+    index.put(get_run('20190102000000'))
+    index.delete('20190101000000')
+    with open(str(index_path), 'ab') as f:
+        f.write(b'{"id": "20190103000000"')
+
+    assert get_ids(reader.page()['runs']) == ['20190102000000']
+
+
+def test_outdated_entries_are_compacted(index, index_path, monkeypatch):
+    monkeypatch.setattr(run_index, 'COMPACTION_MIN_RECORDS', 10)
+    reader = RunIndex(str(index_path))
+    for failed in range(3):
+        for day in range(1, 4):
+            index.put(get_run('2019010%s000000' % day, failed))
+    assert len(get_lines(index_path)) == 9
+    assert reader.count() == 3
+
+    index.put(get_run('20190101000000', 5))
+
+    assert [(run['id'], run['failed']) for run in get_lines(index_path)] == [
+        ('20190102000000', 2), ('20190103000000', 2), ('20190101000000', 5)]
+    assert reader.get('20190101000000')['failed'] == 5
+    assert reader.count() == 3
+
+
+def test_legacy_runs_are_imported_into_an_empty_index(index, tmp_path):
+    legacy_path = tmp_path / 'runs.json'
+    legacy_path.write_text(json.dumps({'runs': [get_run('20190101000000'), get_run('20190102000000')]}))
+
+    index.import_legacy(str(legacy_path))
+    index.import_legacy(str(legacy_path))
+    index.import_legacy(str(tmp_path / 'missing.json'))
+
+    assert index.count() == 2
+    assert get_ids(index.page()['runs']) == ['20190102000000', '20190101000000']
+
+
+def test_the_first_index_imports_the_legacy_runs(tmp_path, monkeypatch):
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'runs.json').write_text(json.dumps({'runs': [get_run('20190101000000')]}))
+    monkeypatch.setattr(run_index.parse_args(), 'workdir', str(tmp_path))
+    monkeypatch.setattr(run_index, '_run_index', None)
+
+    assert run_index.get_run_index().get('20190101000000') == get_run('20190101000000')
+    assert run_index.get_run_index() is run_index.get_run_index()
+
+
+def test_export_writes_the_newest_runs_oldest_first(index, tmp_path):
+    for day in range(1, 5):
+        index.put(get_run('2019010%s000000' % day))
+    export_path = tmp_path / 'runs.json'
+    index.export(str(export_path), limit=3)
+
+    assert get_ids(json.loads(export_path.read_text())['runs']) == ['20190102000000', '20190103000000',
+                                                                   '20190104000000']
+
+
+def test_the_delete_command_removes_the_run(index, tmp_path, monkeypatch):
+    monkeypatch.setattr(commands, 'get_run_index', lambda: index)
+    monkeypatch.setattr(PathManager, 'get_working_dir', staticmethod(lambda: str(tmp_path)))
+    index.put(get_run('20190101000000'))
+    index.put(get_run('20190102000000'))
+    (tmp_path / 'runs' / '20190101000000').mkdir(parents=True)
+
+    commands.delete('20190101000000')
+
+    assert not (tmp_path / 'runs' / '20190101000000').exists()
+    assert index.get('20190101000000') is None
+    assert get_ids(json.loads((tmp_path / 'data' / 'runs.json').read_text())['runs']) == ['20190102000000']
+
+
+def test_clearing_the_working_directory_deletes_the_run_index(index, index_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(path_manager.args, 'clear', True)
+    index.put(get_run('20190101000000'))
+    index.export(str(tmp_path / 'data' / 'runs.json'))
+    (tmp_path / 'data' / 'other.json').write_text('{}')
+
+    PathManager.create_working_directory(str(tmp_path))
+
+    assert sorted(path.name for path in (tmp_path / 'data').iterdir()) == ['other.json', 'runs.jsonl.lock']
+    assert index.count() == 0
@@ -0,0 +1,128 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import os
+
+from src.base import target
+from src.core.util import test_scheduler
+from src.core.util.path_manager import PathManager
+from src.core.util.test_scheduler import balance_shards, load_test_history, order_tests
+
+RUNS = [('20190103000000', {'bookmarks': {'test_a': ('PASSED', 10), 'test_b': ('FAILED', 40)},
+                            'history': {'test_c': ('PASSED', 20), 'test_d': ('SKIPPED', 0)}}),
+        ('20190102000000', {'bookmarks': {'test_a': ('PASSED', 30), 'test_b': ('PASSED', 60)},
+                            'history': {'test_c': ('FAILED', 20), 'test_d': ('PASSED', 5)}})]
+
+
+class Item:
+    """Collected pytest item of a Firefox test, identified by its run.json key."""
+
+    def __init__(self, key):
+        self.name = key
+        self.fspath = os.path.join(PathManager.get_module_dir(), 'tests', 'firefox', *key.split('/')) + '.py'
+
+
+class Hook:
+
+    def __init__(self):
+        self.deselected = []
+
+    def pytest_deselected(self, items):
+        self.deselected.extend(items)
+
+
+class Config:
+
+    def __init__(self):
+        self.hook = Hook()
+
+
+def get_test_tree(tests: dict) -> list:
+    return [{'name': directory,
+             'children': [{'name': name, 'result': result, 'time': duration}
+                          for name, (result, duration) in directory_tests.items()]}
+            for directory, directory_tests in tests.items()]
+
+
+def write_runs(workdir, runs):
+    for run_id, tests in runs:
+        run_dir = workdir / 'runs' / run_id
+        run_dir.mkdir(parents=True)
+        (run_dir / 'run.json').write_text(json.dumps({'tests': {'all_tests': get_test_tree(tests)}}))
+
+
+def get_history(tmp_path) -> test_scheduler.TestHistory:
+    write_runs(tmp_path, RUNS)
+    return load_test_history(str(tmp_path))
+
+
+def get_names(items) -> list:
+    return [item.name for item in items]
+
+
+def test_history_averages_the_durations_of_the_runs(tmp_path):
+    history = get_history(tmp_path)
+
+    assert history.run_count == 2
+    assert history.get_duration('bookmarks/test_a') == 20
+    assert history.get_duration('bookmarks/test_b') == 50
+    assert history.get_duration('history/test_d') == 5
+    assert history.get_duration('history/test_new') == (20 + 50 + 20 + 5) / 4
+    assert history.failed_recently('bookmarks/test_b')
+    assert not history.failed_recently('history/test_c')
+
+
+def test_history_skips_unreadable_runs_and_the_current_run(tmp_path):
+    write_runs(tmp_path, RUNS + [(PathManager.get_run_id(), {'bookmarks': {'test_a': ('PASSED', 1000)}})])
+    (tmp_path / 'runs' / '20190101000000').mkdir()
+    (tmp_path / 'runs' / '20190101000000' / 'run.json').write_text('{')
+    history = load_test_history(str(tmp_path), max_runs=1)
+
+    assert history.run_count == 1
+    assert history.get_duration('bookmarks/test_a') == 10
+    assert load_test_history(str(tmp_path / 'missing')).run_count == 0
+
+
+def test_tests_are_ordered_longest_first(tmp_path):
+    history = get_history(tmp_path)
+    items = [Item(key) for key in ('history/test_d', 'bookmarks/test_a', 'history/test_c', 'bookmarks/test_b')]
+
+    assert get_names(order_tests(items, history)) == ['bookmarks/test_b', 'bookmarks/test_a', 'history/test_c',
+                                                      'history/test_d']
+    assert get_names(order_tests(items, history, fail_first=True))[0] == 'bookmarks/test_b'
+    assert get_names(order_tests(items, test_scheduler.TestHistory())) == get_names(items)
+
+
+def test_shards_split_the_tests_by_expected_duration(tmp_path):
+    history = get_history(tmp_path)
+    items = order_tests([Item(key) for key in ('bookmarks/test_a', 'bookmarks/test_b', 'history/test_c',
+                                               'history/test_d')], history)
+    shards = balance_shards(items, history, 2)
+
+    assert [get_names(shard) for shard in shards] == [['bookmarks/test_b'],
+                                                      ['bookmarks/test_a', 'history/test_c', 'history/test_d']]
+    assert balance_shards(items, history, 1) == [items]
+    assert balance_shards(items[:1], history, 3)[1:] == [[], []]
+
+
+def test_shard_workers_deselect_the_tests_of_the_other_shards(tmp_path, monkeypatch):
+    write_runs(tmp_path, RUNS)
+    monkeypatch.setattr(PathManager, 'get_root_working_dir', staticmethod(lambda: str(tmp_path)))
+    monkeypatch.setattr(target.args, 'shards', 2)
+    monkeypatch.setattr(target.args, 'fail_first', False)
+    keys = ('bookmarks/test_a', 'bookmarks/test_b', 'history/test_c', 'history/test_d')
+    selected = []
+    deselected = []
+    for shard in range(2):
+        monkeypatch.setattr(target.args, 'shard', shard)
+        items = [Item(key) for key in keys]
+        config = Config()
+        target.BaseTarget().pytest_collection_modifyitems(None, config, items)
+        selected.append(get_names(items))
+        deselected.append(get_names(config.hook.deselected))
+
+    assert selected == [['bookmarks/test_b'], ['bookmarks/test_a', 'history/test_c', 'history/test_d']]
+    assert deselected == [selected[1], selected[0]]
@@ -0,0 +1,99 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import importlib
+from collections import namedtuple
+
+import pytest
+
+from src.configuration import config_parser
+from targets.firefox.testrail.api_client import APIClient
+from targets.firefox.testrail.fake_server import FakeTestRailServer
+
+PROJECT_ID = 1
+SUITE_ID = 11
+SUITE_NAME = 'Bookmarks'
+
+CONFIG = '''[Test_rail]
+test_rail_url = %s
+username = iris
+password = secret
+
+[Test_Rail_Suites]
+suite_dictionary = {'%s': %s}
+'''
+
+Step = namedtuple('Step', ['outcome', 'message', 'expected', 'actual'])
+
+
+@pytest.fixture
+def server():
+    with FakeTestRailServer(suites={PROJECT_ID: [{'id': SUITE_ID, 'name': SUITE_NAME}]}) as fake:
+        yield fake
+
+
+@pytest.fixture
+def testrail_client(server, tmp_path, monkeypatch):
+    """Returns the testrail_client module, configured for the fake server."""
+    config_file = tmp_path / 'config.ini'
+    config_file.write_text(CONFIG % (server.url, SUITE_NAME, SUITE_ID))
+    monkeypatch.setattr(config_parser, 'config_file', str(config_file))
+    # The suite dictionary is read when testcase_results is imported.
+    return importlib.import_module('targets.firefox.testrail.testrail_client')
+
+
+def get_test_results(testrail_client, count):
+    results = importlib.import_module('targets.firefox.testrail.testcase_results')
+    return [results.TestRailTests('test_%s' % index, SUITE_ID, '', index,
+                                  [Step('FAILED' if index % 10 == 0 else 'PASSED', 'message', 'expected', 'actual')])
+            for index in range(count)]
+
+
+def get_posts(server, name):
+    return [payload for method, endpoint, payload in server.requests if method == 'POST' and endpoint.startswith(name)]
+
+
+def test_rate_limited_requests_are_retried(server):
+    server.rate_limited = 2
+    client = APIClient(server.url)
+
+    assert client.send_get('get_projects') == server.projects
+    assert len(server.requests) == 3
+    assert client.request_counts['retried'] == 2
+
+
+def test_requests_reuse_the_thread_connection(server):
+    client = APIClient(server.url)
+    for _ in range(5):
+        client.send_get('get_suites/%s' % PROJECT_ID)
+
+    assert len(server.connections) == 5
+    assert len(set(server.connections)) == 1
+
+
+def test_results_are_sent_in_concurrent_chunks(server, testrail_client):
+    report = testrail_client.TestRail()
+    report.create_test_plan('20190101000000', '65.0', get_test_results(testrail_client, 250))
+
+    chunks = get_posts(server, 'add_results_for_cases')
+    assert sorted(len(chunk['results']) for chunk in chunks) == [50, 100, 100]
+    assert testrail_client.RESULTS_CHUNK_SIZE == 100
+    run_id, = server.results
+    results = server.results[run_id]
+    assert sorted(result['case_id'] for result in results) == list(range(250))
+    assert sum(result['status_id'] == 5 for result in results) == 25
+
+    post_connections = [port for (method, _, _), port in zip(server.requests, server.connections) if method == 'POST']
+    assert len(set(post_connections)) <= 1 + testrail_client.RESULTS_WORKERS
+
+
+def test_dry_run_counts_requests_without_posting(server, testrail_client):
+    report = testrail_client.TestRail(dry_run=True)
+    report.create_test_plan('20190101000000', '65.0', get_test_results(testrail_client, 250))
+
+    assert get_posts(server, '') == []
+    assert server.runs == {}
+    assert report.client.request_counts['POST'] == 4
+    assert report.client.request_counts['GET'] == 1
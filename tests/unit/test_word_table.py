@@ -0,0 +1,107 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import difflib
+import random
+
+import pytest
+
+from src.core.api.finder import word_table
+from src.core.api.finder.word_table import WordTable, get_word_cutoff, is_similar
+
+WORDS = ['Bookmarks', 'History', 'Preferences', 'Downloads', 'Library', 'Private', 'Browsing', 'Settings', 'Search',
+         'Firefox', 'Privacy', 'Security', 'Content', 'Blocking', 'Customize', 'Toolbar', 'Restore', 'Session',
+         'Window', 'Tab', 'New', 'Open', 'Save', 'Page', 'Zoom', 'Reader', 'View', 'Add-ons', '100%', '12.5', '3,000',
+         'about:preferences']
+
+OCR_READS = [('Bookmarks', 'Bookrnarks'), ('Bookmarks', 'B0okmarks'), ('History', 'Hist0ry'), ('History', 'Histor'),
+             ('Preferences', 'Preferenccs'), ('Library', 'Librarv'), ('Private', 'Prlvate'), ('Settings', 'Setiings'),
+             ('Search', 'Search.'), ('Firefox', 'Firef0x'), ('Toolbar', 'TooIbar'), ('Window', 'Wind0w'),
+             ('Tab', 'Tab'), ('Tab', 'Tap'), ('New', 'Now'), ('Open', 'Opem'), ('Zoom', 'Z00m'), ('100%', '100'),
+             ('12.5', '12,5'), ('3,000', '3.000'), ('3,000', '8,000'), ('Add-ons', 'Addons'),
+             ('about:preferences', 'about:preterences'), ('Bookmarks', 'History'), ('Privacy', 'Private'),
+             ('Security', 'Session'), ('Content', 'Customize'), ('Reader', 'Restore'), ('Save', 'Page')]
+
+OCR_CONFUSIONS = {'l': '1I|', 'o': '0', 'i': 'l1', 'm': 'rn', 'e': 'c', 'S': '5', 'B': '8', '.': ',', ',': '.'}
+
+
+def difflib_is_similar(word, candidate, cutoff):
+    """Similarity check of the difflib.get_close_matches based search."""
+    return len(difflib.get_close_matches(word, [candidate], n=1, cutoff=cutoff)) > 0
+
+
+def misread(word, rng):
+    for _ in range(rng.randint(0, 3)):
+        operation = rng.random()
+        confusions = [char for char in OCR_CONFUSIONS if char in word]
+        if operation < 0.4 and confusions:
+            char = rng.choice(confusions)
+            word = word.replace(char, rng.choice(OCR_CONFUSIONS[char]), 1)
+        elif operation < 0.6 and len(word) > 1:
+            index = rng.randrange(len(word))
+            word = word[:index] + word[index + 1:]
+        elif operation < 0.8:
+            index = rng.randrange(len(word) + 1)
+            word = word[:index] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[index:]
+        else:
+            word = word + rng.choice('.,:;')
+    return word
+
+
+def find_phrases(table, phrases):
+    return [[(rectangle.x, rectangle.y, rectangle.width, rectangle.height)
+             for rectangle in table.find_phrase(phrase, multiple)] for phrase in phrases for multiple in (False, True)]
+
+
+def get_rows(lines, scale=1):
+    """Returns Tesseract data rows for lines of (text, x, y) words, one OCR line per input line, in an image resized by
+    scale."""
+    rows = []
+    for line_index, words in enumerate(lines):
+        for word_index, (text, x, y) in enumerate(words):
+            rows.append(['5', '1', '1', '1', str(line_index + 1), str(word_index + 1),
+                         str(x * scale), str(y * scale), str(10 * len(text) * scale), str(12 * scale), '90', text])
+    return rows
+
+
+@pytest.mark.parametrize('word, candidate', OCR_READS)
+def test_is_similar_agrees_with_difflib(word, candidate):
+    for cutoff in (get_word_cutoff(word), 0.7, 0.75, 0.8, 0.9):
+        assert is_similar(word, candidate, cutoff) == difflib_is_similar(word, candidate, cutoff)
+
+
+def test_is_similar_accepts_the_difflib_matches():
+    rng = random.Random(0)
+    for word in WORDS:
+        for _ in range(100):
+            candidate = misread(word, rng)
+            cutoff = get_word_cutoff(word)
+            if difflib_is_similar(word, candidate, cutoff):
+                assert is_similar(word, candidate, cutoff)
+
+
+def test_is_similar_rejects_words_of_different_lengths():
+    assert not is_similar('Preferences', 'Pref', 0.7)
+    assert not is_similar('Tab', '', 0.7)
+    assert is_similar('', '', 0.7)
+
+
+def test_find_phrase_matches_difflib_search(monkeypatch):
+    lines = [[('Bookrnarks', 10, 10), ('Toolbar', 120, 11), ('Settings', 220, 10)],
+             [('Hist0ry', 10, 40), ('Librarv', 100, 40), ('Z00m', 200, 41)],
+             [('Open', 10, 70), ('New', 60, 70), ('Prlvate', 100, 70), ('Window', 180, 72)],
+             [('about:preterences', 10, 100), ('Privacy', 200, 100), ('&', 270, 100), ('Security', 290, 101)],
+             [('Open', 10, 130), ('New', 60, 130), ('Tab', 100, 130)]]
+    pages = [(1, get_rows(lines)), (2, get_rows(lines, 2))]
+    phrases = ['Bookmarks Toolbar', 'History Library Zoom', 'New Private Window', 'about:preferences',
+               'Privacy & Security', 'Open New Tab', 'Open New', 'Bookmarks Settings', 'Reader View']
+
+    table = WordTable(pages)
+    results = find_phrases(table, phrases)
+    monkeypatch.setattr(word_table, 'is_similar', difflib_is_similar)
+    assert results == find_phrases(table, phrases)
+
+    assert len(results[phrases.index('Open New') * 2 + 1]) == 2
+    assert results[phrases.index('Reader View') * 2] == []